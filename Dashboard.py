@@ -1,190 +1,250 @@
 import streamlit as st
 import pandas as pd
-import base64
 import logging
+import os
+
+from carregamento import MOEDA_EM_CENTAVOS, assinatura_arquivo, relatorio_memoria
+from ativos import IMAGEM_SIDEBAR, imagem_base64
+from atualizacao import construir_versao, obter_atualizador
+from sinistralidade import (COLUNA_DATA_OCORRENCIA, PERIODICIDADES,
+                            sinistralidade_por_periodo)
+from triangulos import (DIMENSOES_TRIANGULO, PERIODICIDADES_TRIANGULO,
+                        TIPOS_TRIANGULO)
+from uploads import MODO_UPLOAD, CacheLRU, gravar_upload
+from agregacoes import sinistro_por_cobertura
+from busca import LIMITE_SUGESTOES
+from cubo import DIMENSOES_CUBO, CuboSinistralidade
+from formatacao import (estilo_br, formatar_colunas_br, formatar_serie_br,
+                        formatar_valor_br)
+from exportacao import FORMATOS_EXPORTACAO, arquivo_exportado
+from paginacao import TAMANHO_PAGINA, pagina, pagina_valida, paginada, total_paginas
+from instrumentacao import (DEBUG_ATIVO, chamar_cacheado, etapa,
+                            execucao_rastreada, exportar_rastreio,
+                            finalizar_execucao, iniciar_execucao,
+                            marcar_execucao, resumo_latencias)
 
 # Caminho do arquivo Excel (ajuste conforme necessário para o ambiente de execução)
 # Nota: Em um ambiente de produção, considere usar st.file_uploader para permitir que o usuário faça upload do arquivo.
-arquivo_excel = r'C:\Users\lexus\Documents\Alseg\Cópia de Precificacao - Copia.xlsx'
+# Com DASHBOARD_PLANILHA pode ser também um diretório ou um padrão glob (ex.: 'dados/*.xlsx'),
+# com uma planilha por mês ou por filial, lidas em paralelo e combinadas.
+arquivo_excel = os.environ.get(
+    'DASHBOARD_PLANILHA', r'C:\Users\lexus\Documents\Alseg\Cópia de Precificacao - Copia.xlsx')
 
 # Configura a página para layout amplo
 st.set_page_config(layout='wide')
 
-# Dados agrupado de apólices e sinistros:
+# Rastreio desta execução do script (tempo, linhas e memória de cada etapa)
+iniciar_execucao('script')
 
+# Dados agrupado de apólices e base de sinistros:
 
-@st.cache_data
-def carregar_e_processar_dados(caminho_arquivo):
+
+@st.cache_resource
+@marcar_execucao
+def iniciar_atualizador(caminho_arquivo):
     """
-    Carrega e processa os dados do arquivo Excel.
-    Esta função é cacheada para evitar recarregar e reprocessar os dados
-    a cada interação do usuário, tornando a aplicação mais rápida.
+    Inicia, uma única vez por processo, o atualizador que carrega e processa
+    a planilha numa thread em segundo plano e troca os dados atomicamente
+    quando o arquivo muda. Todas as sessões leem a mesma versão dos dados,
+    sem copiá-los, e continuam servindo a versão anterior durante uma
+    recarga. Se o processo foi aquecido (aquecimento.py --servir), os dados
+    já estão carregados.
     """
-    try:
-        # Carrega a aba 'apolice_endosso'
-        aba_apolice_endosso = pd.read_excel(
-            caminho_arquivo, sheet_name='apolice_endosso')
-
-        # Fazer a soma dos prêmios agrupado por apólice:
-        soma_por_apolice = aba_apolice_endosso.groupby(
-            'cd_apolice')['vl_tarifario_pago'].sum().reset_index()
-        soma_por_apolice.rename(columns={
-                                'cd_apolice': 'N° Apólice', 'vl_tarifario_pago': 'Soma Prêmio Pago por Apolice'}, inplace=True)
-
-        # Dados adicionais dos dados das apólices:
-        colunas_adicionais = [
-            'cd_apolice', 'nm_tp_apolice', 'nm_tp_cobranca',
-            'nm_regiao_circulacao', 'nm_auto_utilizacao', 'dt_ini_vig_apo',
-            'dt_fim_vig_apo', 'nm_uf_cliente', 'nm_cidade', 'nm_estipulante',
-            'nm_produto', 'nm_corretor', 'nm_representante'
-        ]
-
-        # Selecionar as colunas adicionais, eliminando duplicatas por 'cd_apolice'
-        dados_adicionais = aba_apolice_endosso[colunas_adicionais].drop_duplicates(
-            subset='cd_apolice')
-        dados_adicionais.rename(
-            columns={'cd_apolice': 'N° Apólice'}, inplace=True)
-
-        # Merge dos dados de prêmio com os dados adicionais
-        premio_com_dados = pd.merge(
-            soma_por_apolice, dados_adicionais, on='N° Apólice', how='left')
-
-        # Carrega a aba 'sinistro'
-        aba_sinistro = pd.read_excel(caminho_arquivo, sheet_name='sinistro')
-        aba_sinistro['Total Sinistro'] = aba_sinistro['vl_sinistro_total'] + aba_sinistro['vl_despesa_total'] + \
-            aba_sinistro['vl_honorario_total'] - \
-            aba_sinistro['vl_salvado_total']
-
-        # Soma dos sinistros por apólice:
-        soma_sinistro_por_apolice = aba_sinistro.groupby(
-            'cd_apolice')['Total Sinistro'].sum().reset_index()
-        soma_sinistro_por_apolice.rename(columns={
-                                         'cd_apolice': 'N° Apólice', 'Total Sinistro': 'Soma Sinistro Por Apolice'}, inplace=True)
-
-        # Merge dos resultados finais
-        resultado_final = pd.merge(
-            premio_com_dados,
-            soma_sinistro_por_apolice,
-            on='N° Apólice',
-            how='outer'
-        )
-
-        # Preenche valores NaN com 0
-        resultado_final = resultado_final.fillna(0)
-
-        return resultado_final
-    except FileNotFoundError:
-        st.error(
-            f"Erro: O arquivo '{caminho_arquivo}' não foi encontrado. Por favor, verifique o caminho.")
-        return pd.DataFrame()  # Retorna um DataFrame vazio em caso de erro
-    except Exception as e:
-        st.error(f"Ocorreu um erro ao carregar ou processar os dados: {e}")
-        return pd.DataFrame()
+    return obter_atualizador(caminho_arquivo)
 
 
-# DF com dados de Sinistros:
-@st.cache_data
-def carregar_e_processar_dados_sinistro(caminho_arquivo):
+@st.cache_resource
+@marcar_execucao
+def cache_uploads():
     """
-    Carrega e processa os dados da aba sinistro do arquivo Excel.
-    Esta função é cacheada para evitar recarregar e reprocessar os dados
-    a cada interação do usuário, tornando a aplicação mais rápida.
+    Cache LRU, compartilhado por todas as sessões, dos dados das planilhas
+    enviadas no modo de upload, indexado pelo hash do conteúdo.
     """
-    try:
-        # Carrega a aba 'sinistro'
-        aba_sinistro = pd.read_excel(caminho_arquivo, sheet_name='sinistro')
-        aba_sinistro['Total Sinistro'] = aba_sinistro['vl_sinistro_total'] + aba_sinistro['vl_despesa_total'] + \
-            aba_sinistro['vl_honorario_total'] - \
-            aba_sinistro['vl_salvado_total']
-
-        aba_sinistro.reset_index(drop=True, inplace=True)
-
-        # Soma dos sinistros por apólice:
-        dados_de_sinistro = aba_sinistro
-        dados_de_sinistro.rename(
-            columns={'cd_apolice': 'N° Apólice'}, inplace=True)
-
-        # Preenche valores NaN com 0
-        dados_de_sinistro = dados_de_sinistro.fillna(0)
-
-        return dados_de_sinistro
-    except FileNotFoundError:
-        st.error(
-            f"Erro: O arquivo '{caminho_arquivo}' não foi encontrado. Por favor, verifique o caminho.")
-        return pd.DataFrame()  # Retorna um DataFrame vazio em caso de erro
-    except Exception as e:
-        st.error(f"Ocorreu um erro ao carregar ou processar os dados: {e}")
-        return pd.DataFrame()
+    return CacheLRU()
 
-# Função de Formatação de Valores para o padrão Brasileiro
 
-
-def formatar_valor_br(valor):
+def carregar_upload(arquivo_enviado):
     """
-    Formata um valor numérico para o padrão monetário brasileiro (R$ X.XXX,XX).
-    Lida com valores NaN retornando uma string vazia.
+    Versão dos dados da planilha enviada. O hash do conteúdo é calculado uma
+    vez por arquivo enviado na sessão (guardado no session_state) e a versão
+    vem do cache compartilhado, processada só no primeiro envio daquele
+    conteúdo por qualquer sessão.
     """
-    if pd.isna(valor):
-        return ""
-    # Formata como float com 2 casas decimais e separador de milhar (padrão US)
-    valor_us_format = f"{valor:,.2f}"
-    # Inverte os separadores para o padrão brasileiro
-    valor_br_format = valor_us_format.replace(
-        ",", "X").replace(".", ",").replace("X", ".")
-    return valor_br_format
-
-
-# --- Aplicação Streamlit ---
-# Carrega e processa os dados (cacheado para performance)
-dados_calculados = carregar_e_processar_dados(arquivo_excel)
+    envio = st.session_state.get('planilha_enviada')
+    if envio is None or envio[0] != arquivo_enviado.file_id:
+        with etapa('gravar_upload'):
+            envio = (arquivo_enviado.file_id, *gravar_upload(arquivo_enviado))
+        st.session_state['planilha_enviada'] = envio
+    _, conteudo_hash, caminho = envio
+    cache = chamar_cacheado('cache_uploads', cache_uploads)
+    return cache.obter(conteudo_hash, lambda: construir_versao(
+        caminho, assinatura_arquivo(caminho)))
+
+
+# Colunas numéricas formatadas apenas no momento da exibição
+COLUNAS_MOEDA = ['Soma Prêmio Pago por Apolice', 'Soma Sinistro Por Apolice',
+                 'Total_Premio', 'Total_Sinistro', 'Prêmio Ganho', 'Sinistro Ocorrido']
+COLUNAS_PERCENTUAL = ['% Sin', '% Sinistralidade']
+
+# Colunas de valor da base de sinistros, formatadas em lote para exibição
+COLUNAS_VALOR_SINISTRO = [
+    'vl_sinistro_pago', 'vl_sinistro_pendente', 'vl_sinistro_total',
+    'vl_despesa_pago', 'vl_despesa_pendente', 'vl_despesa_total',
+    'vl_honorario_pago', 'vl_honorario_pendente', 'vl_honorario_total',
+    'vl_salvado_pago', 'vl_salvado_pendente', 'vl_salvado_total',
+    'Total Sinistro'
+]
+
+
+def exibir_tabela(df, **kwargs):
+    """
+    Exibe um DataFrame numérico aplicando a formatação brasileira via Styler.
+    O limite de células do Styler é ajustado ao tamanho da tabela exibida.
+    """
+    with etapa('st.dataframe', df), \
+            pd.option_context('styler.render.max_elements', max(df.size, 1)):
+        st.dataframe(estilo_br(df, COLUNAS_MOEDA, COLUNAS_PERCENTUAL,
+                               MOEDA_EM_CENTAVOS), **kwargs)
 
-# Verifica se os dados foram carregados com sucesso
-if dados_calculados.empty:
-    st.stop()  # Para a execução se não houver dados
 
-# Cria uma cópia para exibição e cálculos de porcentagem/formatação
-dados_exibicao = dados_calculados.copy()
+def exibir_dataframe(df, **kwargs):
+    """
+    Exibe um DataFrame já formatado, medindo a serialização do st.dataframe.
+    """
+    with etapa('st.dataframe', df):
+        st.dataframe(df, **kwargs)
 
-# Cria o percentual de sinistro, tratando divisão por zero
-dados_exibicao.loc[:, '% Sin'] = dados_exibicao.apply(
-    lambda row: '{:.2%}'.format(
-        row['Soma Sinistro Por Apolice'] / row['Soma Prêmio Pago por Apolice'])
-    if row['Soma Prêmio Pago por Apolice'] != 0 else '0.00%', axis=1
-)
 
-# Formata as colunas para exibição
-dados_exibicao.loc[:, 'Soma Prêmio Pago por Apolice'] = dados_exibicao['Soma Prêmio Pago por Apolice'].map(
-    formatar_valor_br)
-dados_exibicao.loc[:, 'Soma Sinistro Por Apolice'] = dados_exibicao['Soma Sinistro Por Apolice'].map(
-    formatar_valor_br)
+def formatar_tabela(df):
+    """
+    Formata as colunas de moeda e de percentual das tabelas numéricas.
+    """
+    return formatar_colunas_br(df, COLUNAS_MOEDA, COLUNAS_PERCENTUAL, MOEDA_EM_CENTAVOS)
 
-# Reordenar as colunas para que 'Soma Sinistro Por Apolice' e '% Sin' fiquem nas posições desejadas
-colunas = list(dados_exibicao.columns)
 
-# Remove as colunas que vamos inserir manualmente, se existirem
-for col in ['Soma Sinistro Por Apolice', '% Sin']:
-    if col in colunas:
-        colunas.remove(col)
+def formatar_sinistros(df):
+    """
+    Formata as colunas de valor da base de sinistros em lote (vetorizado).
+    """
+    return formatar_colunas_br(df, COLUNAS_VALOR_SINISTRO, em_centavos=MOEDA_EM_CENTAVOS)
 
-# Insere nas posições desejadas
-colunas.insert(2, 'Soma Sinistro Por Apolice')
-colunas.insert(3, '% Sin')
 
-# Reordena o DataFrame
-dados_exibicao = dados_exibicao[colunas]
+def exibir_paginado(df, chave, exibir=exibir_tabela, formatar=None, **kwargs):
+    """
+    Exibe um DataFrame ainda numérico em páginas de TAMANHO_PAGINA linhas:
+    a ordenação, o fatiamento e a formatação ('formatar', opcional) são
+    feitos no servidor só para a página visível. Uma tabela que cabe numa
+    página é exibida inteira. 'chave' distingue os widgets de cada tabela.
+    """
+    if not paginada(len(df)):
+        exibir(formatar(df) if formatar else df, **kwargs)
+        return
+
+    paginas = total_paginas(len(df))
+    chave_pagina = f'{chave}_pagina'
+    # A página guardada na sessão pode não existir no resultado atual
+    guardada = st.session_state.get(chave_pagina, 1)
+    if pagina_valida(guardada, len(df)) != guardada:
+        st.session_state[chave_pagina] = pagina_valida(guardada, len(df))
+
+    col_pagina, col_ordem, col_decrescente = st.columns([1, 2, 1])
+    with col_pagina:
+        numero = st.number_input('Página', min_value=1, max_value=paginas,
+                                 step=1, key=chave_pagina)
+    with col_ordem:
+        ordenar_por = st.selectbox(
+            'Ordenar por', [None, *df.columns], key=f'{chave}_ordem',
+            format_func=lambda coluna: 'Ordem original' if coluna is None else coluna)
+    with col_decrescente:
+        decrescente = st.toggle('Decrescente', key=f'{chave}_decrescente')
+
+    dados_pagina = pagina(df, numero, ordenar_por=ordenar_por, decrescente=decrescente)
+    exibir(formatar(dados_pagina) if formatar else dados_pagina, **kwargs)
+    inicio = (numero - 1) * TAMANHO_PAGINA
+    st.caption(f"Linhas {inicio + 1} a {inicio + len(dados_pagina)} de {len(df)} "
+               f"(página {numero} de {paginas})")
+
+
+def botao_exportar(df, nome_arquivo, chave, formatar=formatar_tabela):
+    """
+    Download do DataFrame numérico em CSV, Parquet ou XLSX, com os valores
+    crus ou no padrão BR ('formatar' aplicado bloco a bloco). O arquivo só
+    é gerado quando o usuário clica no botão, numa thread à parte do script.
+    """
+    with st.popover('Exportar'):
+        formato = st.radio('Formato', list(FORMATOS_EXPORTACAO), horizontal=True,
+                           key=f'{chave}_formato')
+        formatado = st.toggle('Valores no padrão BR', key=f'{chave}_br',
+                              help='Desligado, os valores saem numéricos'
+                                   + (' (em centavos).' if MOEDA_EM_CENTAVOS else '.'))
+        extensao, mime = FORMATOS_EXPORTACAO[formato]
+        st.download_button(
+            f"Baixar {len(df)} linha{'s' if len(df) != 1 else ''}", key=f'{chave}_download',
+            data=lambda: arquivo_exportado(df, formato, formatar if formatado else None),
+            file_name=nome_arquivo + extensao, mime=mime, on_click='ignore')
+
+
+def multiselect_com_busca(rotulo, rotulo_busca, campo, opcoes, restrito, busca, chave):
+    """
+    Multiselect da sidebar alimentado pelo índice de busca: o navegador
+    recebe só as sugestões para o texto digitado (até LIMITE_SUGESTOES), e
+    não a lista inteira de 'opcoes'. Com 'restrito' a cascata de filtros
+    limitou as opções, e só as que estão em 'opcoes' são sugeridas. Os
+    valores já selecionados continuam na lista enquanto forem válidos.
+    """
+    texto = st.sidebar.text_input(rotulo_busca, key=f'busca_{chave}',
+                                  placeholder=f'{len(opcoes)} opções')
+    if texto.strip():
+        sugestoes = busca.buscar(campo, texto, permitidos=opcoes if restrito else None)
+    else:
+        sugestoes = opcoes[:LIMITE_SUGESTOES]
+    validas = set(opcoes) if restrito else None
+    selecionados = [valor for valor in st.session_state.get(chave, [])
+                    if validas is None or valor in validas]
+    return st.sidebar.multiselect(
+        rotulo, options=list(dict.fromkeys([*selecionados, *sugestoes])), key=chave)
 
-# Ordenando por numero da apólice inicialmente
-dados_exibicao = dados_exibicao.sort_values('N° Apólice')
 
+# --- Aplicação Streamlit ---
+# Versão atual dos dados: agregado por apólice, índices e hierarquia dos
+# filtros, montados pelo atualizador em segundo plano. Só a primeira carga do
+# processo espera pelo processamento da planilha.
+# No modo de upload (DASHBOARD_UPLOAD=1) os dados vêm da planilha enviada
+# e não há atualização em segundo plano.
+atualizador = None
+if MODO_UPLOAD:
+    arquivo_enviado = st.sidebar.file_uploader(
+        'Planilha de dados', type=['xlsx', 'xlsm'])
+    if arquivo_enviado is None:
+        st.info("Envie a planilha de dados pela barra lateral para iniciar a análise.")
+        finalizar_execucao()
+        st.stop()
+    try:
+        versao_dados = carregar_upload(arquivo_enviado)
+    except Exception as e:
+        logging.exception("Falha ao processar a planilha enviada")
+        st.error(f"Ocorreu um erro ao carregar ou processar os dados: {e}")
+        finalizar_execucao()
+        st.stop()
+else:
+    atualizador = chamar_cacheado('iniciar_atualizador', iniciar_atualizador,
+                                  arquivo_excel)
+    versao_dados = atualizador.versao_atual()
 
-# Dados do sinistro
-df_sinistros = carregar_e_processar_dados_sinistro(arquivo_excel)
 # Verifica se os dados foram carregados com sucesso
-if df_sinistros.empty:
+if versao_dados is None:
+    if isinstance(atualizador.erro, FileNotFoundError):
+        st.error(
+            f"Erro: O arquivo '{arquivo_excel}' não foi encontrado. Por favor, verifique o caminho.")
+    else:
+        st.error(f"Ocorreu um erro ao carregar ou processar os dados: {atualizador.erro}")
+    finalizar_execucao()
     st.stop()  # Para a execução se não houver dados
 
-# copia do DF da base de sinistro para utilizar
-df_sinistro_utilizar = df_sinistros.copy()
+dados_exibicao = versao_dados.dados_exibicao
+indices = versao_dados.indices
+hierarquia_filtros = versao_dados.hierarquia_filtros
+busca = versao_dados.busca
 
 
 # '''
@@ -198,19 +258,8 @@ df_sinistro_utilizar = df_sinistros.copy()
 # '''
 
 
-def img_to_base64(image_path):
-    """Convert image to base64."""
-    try:
-        with open(image_path, "rb") as img_file:
-            return base64.b64encode(img_file.read()).decode()
-    except Exception as e:
-        logging.error(f"Error converting image to base64: {str(e)}")
-        return None
-
-
-# Load and display sidebar image
-img_path = r'C:\Users\lexus\Documents\Estudos_Programação\Dashboard_Allseg\image\lexus_hotoroom.png'
-img_base64 = img_to_base64(img_path)
+# Load and display sidebar image (lida e codificada uma vez por processo)
+img_base64 = imagem_base64(IMAGEM_SIDEBAR)
 if img_base64:
     st.sidebar.markdown(
         # essa função para colocar glowing effect na imagem
@@ -219,6 +268,16 @@ if img_base64:
         unsafe_allow_html=True,
     )
 
+# Data dos dados exibidos e situação da atualização em segundo plano
+st.sidebar.caption(
+    f"Dados da planilha de {versao_dados.modificado_em:%d/%m/%Y %H:%M}, "
+    f"carregados em {versao_dados.carregado_em:%d/%m/%Y %H:%M}")
+if atualizador is not None and atualizador.atualizando:
+    st.sidebar.caption("Atualizando os dados em segundo plano...")
+elif atualizador is not None and atualizador.erro is not None:
+    st.sidebar.warning(
+        f"Não foi possível atualizar os dados; exibindo a versão anterior. Erro: {atualizador.erro}")
+
 # colocar linha embaixo do logo
 # st.sidebar.markdown("---")
 
@@ -244,286 +303,238 @@ if img_base64:
 #
 # '''
 
-# --- Filtragem dados da Apólice ---
-st.sidebar.header('Filtro Apólice')
-
-# Filtro por Apólice - Obtém as apólices únicas
-apolices_filtro_apolice = sorted(dados_exibicao['N° Apólice'].unique())
-
-# Define o índice padrão para selectbox
-default_index_apolice = 0 if apolices_filtro_apolice else None
-
-apolices_selecionadas_filtro_apolice = st.sidebar.selectbox(
-    'Apólice',
-    options=apolices_filtro_apolice,
-    index=default_index_apolice  # Selecionar o primeiro registro por padrão
-)
-
-st.subheader(f'Dados Apólice - {apolices_selecionadas_filtro_apolice}')
-dados_filtrados_filtro_apolice = dados_exibicao.copy()
-if apolices_selecionadas_filtro_apolice:
-    dados_filtrados_filtro_apolice = dados_filtrados_filtro_apolice[
-        dados_filtrados_filtro_apolice['N° Apólice'] == apolices_selecionadas_filtro_apolice]
-
-st.sidebar.markdown("---")
-
-# Converte as colunas de volta para numérico para somar
-# É importante fazer isso em uma cópia para não afetar a exibição formatada
-df_para_filtro_apolice = dados_filtrados_filtro_apolice.copy()
-df_para_filtro_apolice['Soma Prêmio Pago por Apolice'] = df_para_filtro_apolice['Soma Prêmio Pago por Apolice'].str.replace(
-    '.', '').str.replace(',', '.').astype(float)
-df_para_filtro_apolice['Soma Sinistro Por Apolice'] = df_para_filtro_apolice['Soma Sinistro Por Apolice'].str.replace(
-    '.', '').str.replace(',', '.').astype(float)
-
-total_premio_filtro_apolice = df_para_filtro_apolice['Soma Prêmio Pago por Apolice'].sum(
-)
-total_sinistro_filtro_apolice = df_para_filtro_apolice['Soma Sinistro Por Apolice'].sum(
-)
-
-# Calcula o percentual de sinistro total
-percentual_sinistro_total_filtro_apolice = (
-    total_sinistro_filtro_apolice / total_premio_filtro_apolice) if total_premio_filtro_apolice != 0 else 0
-
-# criação do de DF com dados de sinistro de apólice selecionada.
-df_sinistro_apolice = df_sinistro_utilizar.loc[df_sinistro_utilizar['N° Apólice']
-                                               == apolices_selecionadas_filtro_apolice]
-
-# Quantidade de sinistros por apólice
-qtd_sinistros_apólice = df_sinistro_apolice['nr_sinistro'].nunique()
-
-
-# dados de sinistro por cobertura por apólice
-df_sinistro_apolice_cobertura = df_sinistro_apolice.groupby('Cobertura', as_index=False).agg(**{
-    'Total Sinistro': ('Total Sinistro', 'sum'),
-    'Qtd Sinistros': ('nr_sinistro', 'nunique')
-})
-
-df_sinistro_apolice_cobertura['Total Sinistro'] = (
-    df_sinistro_apolice_cobertura['Total Sinistro'].map(formatar_valor_br)
-)
-
-col_apl_1, col_apl_2, col_apl_3, col_apl_4 = st.columns(4)
-
-with col_apl_1:
-    st.metric(label="Total Prêmio Pago",
-              value=f"R$ {formatar_valor_br(total_premio_filtro_apolice)}")
-with col_apl_2:
-    st.metric(label="Total Sinistro",
-              value=f"R$ {formatar_valor_br(total_sinistro_filtro_apolice)}")
-with col_apl_3:
-    st.metric(label="% Sinistro Total",
-              value=f"{percentual_sinistro_total_filtro_apolice:.2%}")
-with col_apl_4:
-    st.metric(label='Qtd Sinistro', value=qtd_sinistros_apólice)
-
-
-# st.subheader('Segurado: ')
-# st.caption('Segurado: ')
-# st.write('Segurado: ')
-# st.text('Segurado: ')
-# st.markdown("**Segurado:**")
-
-col_seg_1, col_cor_2, col_rep_3, col_util_4 = st.columns(4)
-
-segurado = list(dados_filtrados_filtro_apolice['nm_estipulante'].unique())
-corretor = list(dados_filtrados_filtro_apolice['nm_corretor'].unique())
-representante = list(
-    dados_filtrados_filtro_apolice['nm_representante'].unique())
-utilização = list(
-    dados_filtrados_filtro_apolice['nm_auto_utilizacao'].unique())
-
-
-with col_seg_1:
-    st.markdown("<p style='margin-bottom: 0;'>Segurado</p>",
-                unsafe_allow_html=True)
-    st.markdown(
-        f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{segurado[0].title()}</h6>", unsafe_allow_html=True)
-with col_cor_2:
-    st.markdown("<p style='margin-bottom: 0;'>Corretor</p>",
-                unsafe_allow_html=True)
-    st.markdown(
-        f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{corretor[0].title()}</h6>", unsafe_allow_html=True)
-with col_rep_3:
-    st.markdown("<p style='margin-bottom: 0;'>Representante</p>",
-                unsafe_allow_html=True)
-    st.markdown(
-        f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{representante[0].title()}</h6>", unsafe_allow_html=True)
-with col_util_4:
-    st.markdown("<p style='margin-bottom: 0;'>Utilização</p>",
-                unsafe_allow_html=True)
-    st.markdown(
-        f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{utilização[0].title()}</h6>", unsafe_allow_html=True)
-
-st.text("Dados da Apólice")
-st.dataframe(dados_filtrados_filtro_apolice, hide_index=True)
-
-col_cob_sin_1, col_cob_sin_2 = st.columns(2)
-
-# Formatar como numero as colunas do df de dados da apólice
-df_sinistro_apolice['vl_sinistro_pago'] = (
-    df_sinistro_apolice['vl_sinistro_pago'].map(formatar_valor_br))
-df_sinistro_apolice['vl_sinistro_pendente'] = (
-    df_sinistro_apolice['vl_sinistro_pendente'].map(formatar_valor_br))
-df_sinistro_apolice['vl_sinistro_total'] = (
-    df_sinistro_apolice['vl_sinistro_total'].map(formatar_valor_br))
-df_sinistro_apolice['vl_despesa_pago'] = (
-    df_sinistro_apolice['vl_despesa_pago'].map(formatar_valor_br))
-df_sinistro_apolice['vl_despesa_pendente'] = (
-    df_sinistro_apolice['vl_despesa_pendente'].map(formatar_valor_br))
-df_sinistro_apolice['vl_despesa_total'] = (
-    df_sinistro_apolice['vl_despesa_total'].map(formatar_valor_br))
-df_sinistro_apolice['vl_honorario_pago'] = (
-    df_sinistro_apolice['vl_honorario_pago'].map(formatar_valor_br))
-df_sinistro_apolice['vl_honorario_pendente'] = (
-    df_sinistro_apolice['vl_honorario_pendente'].map(formatar_valor_br))
-df_sinistro_apolice['vl_honorario_total'] = (
-    df_sinistro_apolice['vl_honorario_total'].map(formatar_valor_br))
-df_sinistro_apolice['vl_salvado_pago'] = (
-    df_sinistro_apolice['vl_salvado_pago'].map(formatar_valor_br))
-df_sinistro_apolice['vl_salvado_pendente'] = (
-    df_sinistro_apolice['vl_salvado_pendente'].map(formatar_valor_br))
-df_sinistro_apolice['vl_salvado_total'] = (
-    df_sinistro_apolice['vl_salvado_total'].map(formatar_valor_br))
-df_sinistro_apolice['Total Sinistro'] = (
-    df_sinistro_apolice['Total Sinistro'].map(formatar_valor_br))
-
-with col_cob_sin_1:
-    st.text("Dados de Sinistro")
-    st.dataframe(df_sinistro_apolice, hide_index=True)
-with col_cob_sin_2:
-    st.text("Sinistro Por Cobertura")
-    st.dataframe(df_sinistro_apolice_cobertura, hide_index=True)
-
-
-#
-#
-#
-#
-# DADOS DO SEGURADO PARA APRESENTAÇÃO
-#
-#
-#
-#
-
-st.subheader(f'Dados do Segurado - {segurado[0]}')
-
-dados_apolices_segurado = dados_exibicao.copy()
-if apolices_selecionadas_filtro_apolice:
-    dados_apolices_segurado = dados_apolices_segurado[
-        dados_apolices_segurado['nm_estipulante'] == segurado[0]]
-
-
-df_pr_sin_segurado = dados_apolices_segurado.copy()
-
-df_pr_sin_segurado['Soma Prêmio Pago por Apolice'] = df_pr_sin_segurado['Soma Prêmio Pago por Apolice'].str.replace(
-    '.', '').str.replace(',', '.').astype(float)
-df_pr_sin_segurado['Soma Sinistro Por Apolice'] = df_pr_sin_segurado['Soma Sinistro Por Apolice'].str.replace(
-    '.', '').str.replace(',', '.').astype(float)
-
-# Dados de sinistro do segurado
-df_sinistro_segurado = df_sinistro_utilizar.loc[df_sinistro_utilizar['nm_cliente'] == segurado[0]]
 
+# Cada painel é um fragmento: interagir com os widgets de um painel (inclusive
+# os que ele escreve na sidebar) reexecuta apenas aquele painel, e não o
+# script inteiro. Cada reexecução isolada de um painel tem o seu próprio
+# rastreio de desempenho.
+@st.fragment
+@execucao_rastreada('painel_apolice_e_segurado')
+def painel_apolice_e_segurado(dados_exibicao, indices, busca):
+    """
+    Painel da apólice selecionada e do seu segurado.
+    Reexecutado sozinho quando a apólice selecionada muda.
+    """
+    # --- Filtragem dados da Apólice ---
+    st.sidebar.header('Filtro Apólice')
+
+    # Filtro por Apólice - as opções são as sugestões do índice de busca
+    # (pelo número da apólice, de um sinistro, do segurado ou do corretor),
+    # ou as primeiras apólices sem texto de busca
+    texto_busca_apolice = st.sidebar.text_input(
+        'Buscar apólice', key='busca_apolice',
+        placeholder='Nº da apólice ou do sinistro, segurado, corretor')
+    if texto_busca_apolice.strip():
+        apolices_filtro_apolice = busca.buscar_apolices(texto_busca_apolice)
+    else:
+        apolices_filtro_apolice = busca.primeiros('apolice')
+    if not apolices_filtro_apolice:
+        st.sidebar.info("Nenhuma apólice encontrada para a busca.")
+        return
+
+    # Define o índice padrão para selectbox
+    default_index_apolice = 0 if apolices_filtro_apolice else None
+
+    apolices_selecionadas_filtro_apolice = st.sidebar.selectbox(
+        'Apólice',
+        options=apolices_filtro_apolice,
+        index=default_index_apolice  # Selecionar o primeiro registro por padrão
+    )
 
-total_pr_segurado = df_pr_sin_segurado['Soma Prêmio Pago por Apolice'].sum()
-total_sinistro_segurado = df_pr_sin_segurado['Soma Sinistro Por Apolice'].sum()
-sinistralidade_segurado = (
-    total_sinistro_segurado / total_pr_segurado) if total_pr_segurado != 0 else 0
-qtd_apolice_segurado = df_pr_sin_segurado['N° Apólice'].nunique()
-qtd_sinistros_segurado = df_sinistro_segurado['nr_sinistro'].nunique()
-
-seg_apl_1, seg_apl_2, seg_apl_3, seg_apl_4, seg_apl_5 = st.columns(5)
-
-with seg_apl_1:
-    st.metric(label="Total Prêmio Pago",
-              value=f"R$ {formatar_valor_br(total_pr_segurado)}")
-with seg_apl_2:
-    st.metric(label="Total Sinistro",
-              value=f"R$ {formatar_valor_br(total_sinistro_segurado)}")
-with seg_apl_3:
-    st.metric(label="% Sinistro Total",
-              value=f"{sinistralidade_segurado:.2%}")
-with seg_apl_4:
-    st.metric(label='Qtd. Apolices', value=qtd_apolice_segurado)
-with seg_apl_5:
-    st.metric(label='Qtd Sinistros', value=qtd_sinistros_segurado)
-
-
-# dados_apolices_segurado
-
-#
-#
-#
-#
-# DADOS DO SEGURADO PARA APRESENTAÇÃO
-#
-#
-#
-#
+    st.subheader(f'Dados Apólice - {apolices_selecionadas_filtro_apolice}')
+    dados_filtrados_filtro_apolice = dados_exibicao
+    if apolices_selecionadas_filtro_apolice:
+        dados_filtrados_filtro_apolice = indices['apolice'].fatia(
+            apolices_selecionadas_filtro_apolice)
 
-#
-#
-#
-#
-# DADOS DE SINISTRO
-#
-#
-#
-#
+    st.sidebar.markdown("---")
 
-# dados de sinistro por cobertura por segurado
-df_sinistro_segurado_cobertura = df_sinistro_segurado.groupby('Cobertura', as_index=False).agg(**{
-    'Total Sinistro': ('Total Sinistro', 'sum'),
-    'Qtd Sinistros': ('nr_sinistro', 'nunique')
-})
+    total_premio_filtro_apolice = dados_filtrados_filtro_apolice['Soma Prêmio Pago por Apolice'].sum(
+    )
+    total_sinistro_filtro_apolice = dados_filtrados_filtro_apolice['Soma Sinistro Por Apolice'].sum(
+    )
 
-df_sinistro_segurado_cobertura['Total Sinistro'] = (
-    df_sinistro_segurado_cobertura['Total Sinistro'].map(formatar_valor_br)
-)
+    # Calcula o percentual de sinistro total
+    percentual_sinistro_total_filtro_apolice = (
+        total_sinistro_filtro_apolice / total_premio_filtro_apolice) if total_premio_filtro_apolice != 0 else 0
+
+    # criação do de DF com dados de sinistro de apólice selecionada.
+    df_sinistro_apolice = indices['sinistro_apolice'].fatia(
+        apolices_selecionadas_filtro_apolice)
+
+    # Quantidade de sinistros por apólice
+    qtd_sinistros_apólice = df_sinistro_apolice['nr_sinistro'].nunique()
+
+
+    # dados de sinistro por cobertura por apólice
+    df_sinistro_apolice_cobertura = sinistro_por_cobertura(df_sinistro_apolice)
+
+    df_sinistro_apolice_cobertura['Total Sinistro'] = formatar_serie_br(
+        df_sinistro_apolice_cobertura['Total Sinistro'], MOEDA_EM_CENTAVOS)
+
+    col_apl_1, col_apl_2, col_apl_3, col_apl_4 = st.columns(4)
+
+    with col_apl_1:
+        st.metric(label="Total Prêmio Pago",
+                  value=f"R$ {formatar_valor_br(total_premio_filtro_apolice, MOEDA_EM_CENTAVOS)}")
+    with col_apl_2:
+        st.metric(label="Total Sinistro",
+                  value=f"R$ {formatar_valor_br(total_sinistro_filtro_apolice, MOEDA_EM_CENTAVOS)}")
+    with col_apl_3:
+        st.metric(label="% Sinistro Total",
+                  value=f"{percentual_sinistro_total_filtro_apolice:.2%}")
+    with col_apl_4:
+        st.metric(label='Qtd Sinistro', value=qtd_sinistros_apólice)
+
+
+    # st.subheader('Segurado: ')
+    # st.caption('Segurado: ')
+    # st.write('Segurado: ')
+    # st.text('Segurado: ')
+    # st.markdown("**Segurado:**")
+
+    col_seg_1, col_cor_2, col_rep_3, col_util_4 = st.columns(4)
+
+    segurado = list(dados_filtrados_filtro_apolice['nm_estipulante'].unique())
+    corretor = list(dados_filtrados_filtro_apolice['nm_corretor'].unique())
+    representante = list(
+        dados_filtrados_filtro_apolice['nm_representante'].unique())
+    utilização = list(
+        dados_filtrados_filtro_apolice['nm_auto_utilizacao'].unique())
+
+
+    with col_seg_1:
+        st.markdown("<p style='margin-bottom: 0;'>Segurado</p>",
+                    unsafe_allow_html=True)
+        st.markdown(
+            f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{segurado[0].title()}</h6>", unsafe_allow_html=True)
+    with col_cor_2:
+        st.markdown("<p style='margin-bottom: 0;'>Corretor</p>",
+                    unsafe_allow_html=True)
+        st.markdown(
+            f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{corretor[0].title()}</h6>", unsafe_allow_html=True)
+    with col_rep_3:
+        st.markdown("<p style='margin-bottom: 0;'>Representante</p>",
+                    unsafe_allow_html=True)
+        st.markdown(
+            f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{representante[0].title()}</h6>", unsafe_allow_html=True)
+    with col_util_4:
+        st.markdown("<p style='margin-bottom: 0;'>Utilização</p>",
+                    unsafe_allow_html=True)
+        st.markdown(
+            f"<h6 style='margin-top: 0; margin-bottom: 0.2rem;'>{utilização[0].title()}</h6>", unsafe_allow_html=True)
+
+    st.text("Dados da Apólice")
+    exibir_paginado(dados_filtrados_filtro_apolice, 'tabela_apolice', hide_index=True)
+
+    col_cob_sin_1, col_cob_sin_2 = st.columns(2)
+
+    with col_cob_sin_1:
+        st.text("Dados de Sinistro")
+        # Só a página visível tem as colunas de valor formatadas
+        exibir_paginado(df_sinistro_apolice, 'sinistros_apolice', exibir_dataframe,
+                        formatar_sinistros, hide_index=True)
+        botao_exportar(df_sinistro_apolice,
+                       f'sinistros_apolice_{apolices_selecionadas_filtro_apolice}',
+                       'sinistros_apolice', formatar_sinistros)
+    with col_cob_sin_2:
+        st.text("Sinistro Por Cobertura")
+        exibir_dataframe(df_sinistro_apolice_cobertura, hide_index=True)
+
+
+    #
+    #
+    #
+    #
+    # DADOS DO SEGURADO PARA APRESENTAÇÃO
+    #
+    #
+    #
+    #
+
+    st.subheader(f'Dados do Segurado - {segurado[0]}')
+
+    dados_apolices_segurado = dados_exibicao
+    if apolices_selecionadas_filtro_apolice:
+        dados_apolices_segurado = indices['estipulante'].fatia(segurado[0])
+
+
+    df_pr_sin_segurado = dados_apolices_segurado
+
+    # Dados de sinistro do segurado
+    df_sinistro_segurado = indices['sinistro_cliente'].fatia(segurado[0])
+
+
+    total_pr_segurado = df_pr_sin_segurado['Soma Prêmio Pago por Apolice'].sum()
+    total_sinistro_segurado = df_pr_sin_segurado['Soma Sinistro Por Apolice'].sum()
+    sinistralidade_segurado = (
+        total_sinistro_segurado / total_pr_segurado) if total_pr_segurado != 0 else 0
+    qtd_apolice_segurado = df_pr_sin_segurado['N° Apólice'].nunique()
+    qtd_sinistros_segurado = df_sinistro_segurado['nr_sinistro'].nunique()
+
+    seg_apl_1, seg_apl_2, seg_apl_3, seg_apl_4, seg_apl_5 = st.columns(5)
+
+    with seg_apl_1:
+        st.metric(label="Total Prêmio Pago",
+                  value=f"R$ {formatar_valor_br(total_pr_segurado, MOEDA_EM_CENTAVOS)}")
+    with seg_apl_2:
+        st.metric(label="Total Sinistro",
+                  value=f"R$ {formatar_valor_br(total_sinistro_segurado, MOEDA_EM_CENTAVOS)}")
+    with seg_apl_3:
+        st.metric(label="% Sinistro Total",
+                  value=f"{sinistralidade_segurado:.2%}")
+    with seg_apl_4:
+        st.metric(label='Qtd. Apolices', value=qtd_apolice_segurado)
+    with seg_apl_5:
+        st.metric(label='Qtd Sinistros', value=qtd_sinistros_segurado)
+
+
+    # dados_apolices_segurado
+
+    #
+    #
+    #
+    #
+    # DADOS DO SEGURADO PARA APRESENTAÇÃO
+    #
+    #
+    #
+    #
+
+    #
+    #
+    #
+    #
+    # DADOS DE SINISTRO
+    #
+    #
+    #
+    #
+
+    # dados de sinistro por cobertura por segurado
+    df_sinistro_segurado_cobertura = sinistro_por_cobertura(df_sinistro_segurado)
+
+    df_sinistro_segurado_cobertura['Total Sinistro'] = formatar_serie_br(
+        df_sinistro_segurado_cobertura['Total Sinistro'], MOEDA_EM_CENTAVOS)
 
-df_pr_sin_segurado['Soma Prêmio Pago por Apolice'] = (
-    df_pr_sin_segurado['Soma Prêmio Pago por Apolice'].map(formatar_valor_br))
-df_pr_sin_segurado['Soma Sinistro Por Apolice'] = (
-    df_pr_sin_segurado['Soma Sinistro Por Apolice'].map(formatar_valor_br))
+    st.text('Dados das Apólices')
+    exibir_paginado(df_pr_sin_segurado, 'apolices_segurado', hide_index=True)
 
-st.text('Dados das Apólices')
-st.dataframe(df_pr_sin_segurado, hide_index=True)
+    col_segurado_sin_1, col_segurado_sin_2 = st.columns(2)
 
-col_segurado_sin_1, col_segurado_sin_2 = st.columns(2)
+    with col_segurado_sin_1:
+        st.text("Dados de Sinistro")
+        # Só a página visível tem as colunas de valor formatadas
+        exibir_paginado(df_sinistro_segurado, 'sinistros_segurado', exibir_dataframe,
+                        formatar_sinistros, hide_index=True)
+        botao_exportar(df_sinistro_segurado, 'sinistros_segurado',
+                       'sinistros_segurado', formatar_sinistros)
+    with col_segurado_sin_2:
+        st.text("Sinistro Por Cobertura")
+        exibir_dataframe(df_sinistro_segurado_cobertura, hide_index=True)
 
-# Formatar como numero as colunas do df de dados da apólice
-df_sinistro_segurado['vl_sinistro_pago'] = (
-    df_sinistro_segurado['vl_sinistro_pago'].map(formatar_valor_br))
-df_sinistro_segurado['vl_sinistro_pendente'] = (
-    df_sinistro_segurado['vl_sinistro_pendente'].map(formatar_valor_br))
-df_sinistro_segurado['vl_sinistro_total'] = (
-    df_sinistro_segurado['vl_sinistro_total'].map(formatar_valor_br))
-df_sinistro_segurado['vl_despesa_pago'] = (
-    df_sinistro_segurado['vl_despesa_pago'].map(formatar_valor_br))
-df_sinistro_segurado['vl_despesa_pendente'] = (
-    df_sinistro_segurado['vl_despesa_pendente'].map(formatar_valor_br))
-df_sinistro_segurado['vl_despesa_total'] = (
-    df_sinistro_segurado['vl_despesa_total'].map(formatar_valor_br))
-df_sinistro_segurado['vl_honorario_pago'] = (
-    df_sinistro_segurado['vl_honorario_pago'].map(formatar_valor_br))
-df_sinistro_segurado['vl_honorario_pendente'] = (
-    df_sinistro_segurado['vl_honorario_pendente'].map(formatar_valor_br))
-df_sinistro_segurado['vl_honorario_total'] = (
-    df_sinistro_segurado['vl_honorario_total'].map(formatar_valor_br))
-df_sinistro_segurado['vl_salvado_pago'] = (
-    df_sinistro_segurado['vl_salvado_pago'].map(formatar_valor_br))
-df_sinistro_segurado['vl_salvado_pendente'] = (
-    df_sinistro_segurado['vl_salvado_pendente'].map(formatar_valor_br))
-df_sinistro_segurado['vl_salvado_total'] = (
-    df_sinistro_segurado['vl_salvado_total'].map(formatar_valor_br))
-df_sinistro_segurado['Total Sinistro'] = (
-    df_sinistro_segurado['Total Sinistro'].map(formatar_valor_br))
 
-with col_segurado_sin_1:
-    st.text("Dados de Sinistro")
-    st.dataframe(df_sinistro_segurado, hide_index=True)
-with col_segurado_sin_2:
-    st.text("Sinistro Por Cobertura")
-    st.dataframe(df_sinistro_segurado_cobertura, hide_index=True)
+painel_apolice_e_segurado(dados_exibicao, indices, busca)
 
 
 #
@@ -549,160 +560,251 @@ st.divider()
 #
 # '''
 
-# --- Lógica de Filtragem Hierárquica na Sidebar ---
-st.sidebar.header('Filtros Dados Gerais')
-
-# 1. Filtro por Representante
-# Obtém os representantes únicos da base de dados completa, garantindo que sejam strings
-representantes_unicos = sorted(
-    dados_exibicao['nm_representante'].astype(str).unique())
-representantes_selecionados = st.sidebar.multiselect(
-    'Representante(s)',
-    options=representantes_unicos,
-    default=[]  # Nenhuma seleção padrão
-)
-
-# Aplica o filtro de Representante
-dados_filtrados_rep = dados_exibicao.copy()
-if representantes_selecionados:
-    dados_filtrados_rep = dados_filtrados_rep[dados_filtrados_rep['nm_representante'].astype(
-        str).isin(representantes_selecionados)]
-
-# 2. Filtro por Corretor (baseado nos dados já filtrados por Representante)
-# Obtém os corretores únicos dos dados filtrados por representante, garantindo que sejam strings
-corretores_unicos = sorted(
-    dados_filtrados_rep['nm_corretor'].astype(str).unique())
-corretores_selecionados = st.sidebar.multiselect(
-    'Corretor(es)',
-    options=corretores_unicos,
-    default=[]  # Nenhuma seleção padrão
-)
-
-# Aplica o filtro de Corretor
-dados_filtrados_corr = dados_filtrados_rep.copy()
-if corretores_selecionados:
-    dados_filtrados_corr = dados_filtrados_corr[dados_filtrados_corr['nm_corretor'].astype(
-        str).isin(corretores_selecionados)]
-
-
-# 3. Filtro por Segurado (baseado nos dados já filtrados por corretor)
-# Obtém os segurados únicos dos dados filtrados por corretor, garantindo que sejam strings
-segurados_unicos = sorted(
-    dados_filtrados_corr['nm_estipulante'].astype(str).unique())
-segurados_selecionados = st.sidebar.multiselect(
-    'Segurado(s)',
-    options=segurados_unicos,
-    default=[]  # Nenhuma seleção padrão
-)
-
-# Aplica o filtro de Segurado
-dados_filtrados_segurado = dados_filtrados_corr.copy()
-if segurados_selecionados:
-    dados_filtrados_segurado = dados_filtrados_segurado[dados_filtrados_segurado['nm_estipulante'].astype(
-        str).isin(segurados_selecionados)]
-
-
-# 4. Filtro por Apólice (baseado nos dados já filtrados por Representante e Corretor)
-# Obtém as apólices únicas dos dados filtrados por corretor
-apolices_unicas = sorted(dados_filtrados_segurado['N° Apólice'].unique())
-apolices_selecionadas = st.sidebar.multiselect(
-    'Apólice(s)',
-    options=apolices_unicas,
-    default=[]  # Nenhuma seleção padrão
-)
-
-# Aplica o filtro de Apólice
-resultado_final_filtrado = dados_filtrados_segurado.copy()
-if apolices_selecionadas:
-    resultado_final_filtrado = resultado_final_filtrado[resultado_final_filtrado['N° Apólice'].isin(
-        apolices_selecionadas)]
-
-# --- Indicadores Chave (KPIs) ---
-st.subheader("Dados Gerais")
-
-# Converte as colunas de volta para numérico para somar
-# É importante fazer isso em uma cópia para não afetar a exibição formatada
-df_para_soma = resultado_final_filtrado.copy()
-df_para_soma['Soma Prêmio Pago por Apolice'] = df_para_soma['Soma Prêmio Pago por Apolice'].str.replace(
-    '.', '').str.replace(',', '.').astype(float)
-df_para_soma['Soma Sinistro Por Apolice'] = df_para_soma['Soma Sinistro Por Apolice'].str.replace(
-    '.', '').str.replace(',', '.').astype(float)
-
-total_premio = df_para_soma['Soma Prêmio Pago por Apolice'].sum()
-total_sinistro = df_para_soma['Soma Sinistro Por Apolice'].sum()
-
-# Calcula o percentual de sinistro total
-percentual_sinistro_total = (
-    total_sinistro / total_premio) if total_premio != 0 else 0
-
-col1, col2, col3 = st.columns(3)
-
-with col1:
-    st.metric(label="Total Prêmio Pago",
-              value=f"R$ {formatar_valor_br(total_premio)}")
-with col2:
-    st.metric(label="Total Sinistro",
-              value=f"R$ {formatar_valor_br(total_sinistro)}")
-with col3:
-    st.metric(label="% Sinistro Total",
-              value=f"{percentual_sinistro_total:.2%}")
-
-
-# --- Exibição dos Resultados ---
-st.subheader("Dados de Sinistros e Prêmios")
-
-if not resultado_final_filtrado.empty:
-    st.dataframe(resultado_final_filtrado, hide_index=True)
-else:
-    st.info("Nenhum dado encontrado com os filtros selecionados.")
-
-
-# --- Dados de Prêmio e Sinistro por Utilização ---
-st.subheader("Dados de Prêmio e Sinistro por Utilização")
-
-if not resultado_final_filtrado.empty:
-    # Crie uma cópia do DataFrame filtrado para realizar os cálculos numéricos
-    # sem afetar a formatação da tabela principal.
-    df_para_groupby = resultado_final_filtrado.copy()
-
-    # Converta as colunas de prêmio e sinistro de volta para numérico (float)
-    # antes de realizar a soma, removendo os separadores de milhar e decimal.
-    df_para_groupby['Soma Prêmio Pago por Apolice'] = df_para_groupby['Soma Prêmio Pago por Apolice'].str.replace(
-        '.', '').str.replace(',', '.').astype(float)
-    df_para_groupby['Soma Sinistro Por Apolice'] = df_para_groupby['Soma Sinistro Por Apolice'].str.replace(
-        '.', '').str.replace(',', '.').astype(float)
-
-    # Agrupe por 'nm_auto_utilizacao' e some os valores numéricos
-    groupby_utilizacao = df_para_groupby.groupby('nm_auto_utilizacao').agg(
-        Total_Premio=('Soma Prêmio Pago por Apolice', 'sum'),
-        Total_Sinistro=('Soma Sinistro Por Apolice', 'sum')
-    ).reset_index()
-
-    # Calcule a % de Sinistralidade para cada grupo
-    groupby_utilizacao['% Sinistralidade'] = groupby_utilizacao.apply(
-        lambda row: '{:.2%}'.format(
-            row['Total_Sinistro'] / row['Total_Premio'])
-        if row['Total_Premio'] != 0 else '0.00%', axis=1
-    )
-
-    # Formate as colunas de valores para exibição no padrão BR
-    groupby_utilizacao['Total_Premio'] = groupby_utilizacao['Total_Premio'].map(
-        formatar_valor_br)
-    groupby_utilizacao['Total_Sinistro'] = groupby_utilizacao['Total_Sinistro'].map(
-        formatar_valor_br)
 
-    # Renomeie a coluna de agrupamento para melhor apresentação
-    groupby_utilizacao.rename(
-        columns={'nm_auto_utilizacao': 'Utilização'}, inplace=True)
+@st.fragment
+@execucao_rastreada('painel_dados_gerais')
+def painel_dados_gerais(hierarquia_filtros, sinistros_ocorrencia, cubo, busca):
+    """
+    Painel dos Dados Gerais com a filtragem hierárquica da sidebar.
+    Reexecutado sozinho quando um dos filtros muda. As quebras por dimensão
+    vêm do cubo pré-agregado da carga de dados e as opções de Corretor,
+    Segurado e Apólice, do índice de busca.
+    """
+    # --- Lógica de Filtragem Hierárquica na Sidebar ---
+    st.sidebar.header('Filtros Dados Gerais')
+
+    # 1. Filtro por Representante
+    # Obtém os representantes únicos da base de dados completa (como texto)
+    representantes_unicos = hierarquia_filtros.opcoes('nm_representante')
+    representantes_selecionados = st.sidebar.multiselect(
+        'Representante(s)',
+        options=representantes_unicos,
+        default=[]  # Nenhuma seleção padrão
+    )
 
-    # Ordene o DataFrame pelo 'Total_Premio' em ordem decrescente
-    groupby_utilizacao = groupby_utilizacao.sort_values(
-        by='Total_Premio', ascending=False)
+    # Aplica o filtro de Representante
+    linhas_filtradas_rep = hierarquia_filtros.aplicar(
+        'nm_representante', representantes_selecionados)
 
-    # Exiba o DataFrame agrupado
-    st.dataframe(groupby_utilizacao, hide_index=True)
-else:
-    st.info("Nenhum dado disponível para agrupar por Utilização.")
+    # 2. Filtro por Corretor (baseado nos dados já filtrados por Representante)
+    corretores_unicos = hierarquia_filtros.opcoes(
+        'nm_corretor', linhas_filtradas_rep)
+    corretores_selecionados = multiselect_com_busca(
+        'Corretor(es)', 'Buscar corretor', 'corretor', corretores_unicos,
+        linhas_filtradas_rep is not None, busca, 'corretores_dados_gerais')
+
+    # Aplica o filtro de Corretor
+    linhas_filtradas_corr = hierarquia_filtros.aplicar(
+        'nm_corretor', corretores_selecionados, linhas_filtradas_rep)
+
+
+    # 3. Filtro por Segurado (baseado nos dados já filtrados por corretor)
+    segurados_unicos = hierarquia_filtros.opcoes(
+        'nm_estipulante', linhas_filtradas_corr)
+    segurados_selecionados = multiselect_com_busca(
+        'Segurado(s)', 'Buscar segurado', 'segurado', segurados_unicos,
+        linhas_filtradas_corr is not None, busca, 'segurados_dados_gerais')
+
+    # Aplica o filtro de Segurado
+    linhas_filtradas_segurado = hierarquia_filtros.aplicar(
+        'nm_estipulante', segurados_selecionados, linhas_filtradas_corr)
+
+
+    # 4. Filtro por Apólice (baseado nos dados já filtrados por Representante, Corretor e Segurado)
+    apolices_unicas = hierarquia_filtros.opcoes(
+        'N° Apólice', linhas_filtradas_segurado)
+    apolices_selecionadas = multiselect_com_busca(
+        'Apólice(s)', 'Buscar apólice nos Dados Gerais', 'apolice', apolices_unicas,
+        linhas_filtradas_segurado is not None, busca, 'apolices_dados_gerais')
+
+    # Aplica o filtro de Apólice
+    linhas_filtradas_final = hierarquia_filtros.aplicar(
+        'N° Apólice', apolices_selecionadas, linhas_filtradas_segurado)
+    resultado_final_filtrado = hierarquia_filtros.dados_filtrados(
+        linhas_filtradas_final)
+
+    # --- Indicadores Chave (KPIs) ---
+    st.subheader("Dados Gerais")
+
+    total_premio = resultado_final_filtrado['Soma Prêmio Pago por Apolice'].sum()
+    total_sinistro = resultado_final_filtrado['Soma Sinistro Por Apolice'].sum()
+
+    # Calcula o percentual de sinistro total
+    percentual_sinistro_total = (
+        total_sinistro / total_premio) if total_premio != 0 else 0
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        st.metric(label="Total Prêmio Pago",
+                  value=f"R$ {formatar_valor_br(total_premio, MOEDA_EM_CENTAVOS)}")
+    with col2:
+        st.metric(label="Total Sinistro",
+                  value=f"R$ {formatar_valor_br(total_sinistro, MOEDA_EM_CENTAVOS)}")
+    with col3:
+        st.metric(label="% Sinistro Total",
+                  value=f"{percentual_sinistro_total:.2%}")
+
+
+    # --- Exibição dos Resultados ---
+    st.subheader("Dados de Sinistros e Prêmios")
+
+    if not resultado_final_filtrado.empty:
+        exibir_paginado(resultado_final_filtrado, 'dados_gerais', hide_index=True)
+        botao_exportar(resultado_final_filtrado, 'dados_gerais', 'dados_gerais')
+    else:
+        st.info("Nenhum dado encontrado com os filtros selecionados.")
+
+
+    # Representante e Corretor são dimensões do cubo: as quebras filtram as
+    # suas células. Segurado e Apólice não são, e com eles selecionados as
+    # quebras usam um cubo das poucas apólices filtradas.
+    if segurados_selecionados or apolices_selecionadas:
+        cubo = CuboSinistralidade(resultado_final_filtrado)
+        filtros_cubo = None
+    else:
+        filtros_cubo = {'nm_representante': representantes_selecionados,
+                        'nm_corretor': corretores_selecionados}
+
+
+    # --- Dados de Prêmio e Sinistro por Utilização ---
+    st.subheader("Dados de Prêmio e Sinistro por Utilização")
+
+    if not resultado_final_filtrado.empty:
+        # Agrupe por 'nm_auto_utilizacao', com a % de Sinistralidade de cada
+        # grupo, ordenado pelo 'Total_Premio' (numérico) em ordem decrescente
+        groupby_utilizacao = cubo.quebra(['nm_auto_utilizacao'], filtros_cubo)[
+            ['Utilização', 'Total_Premio', 'Total_Sinistro', '% Sinistralidade']]
+
+        # Exiba o DataFrame agrupado, formatado no padrão BR
+        exibir_tabela(groupby_utilizacao, hide_index=True)
+        botao_exportar(groupby_utilizacao, 'premio_sinistro_utilizacao', 'utilizacao')
+    else:
+        st.info("Nenhum dado disponível para agrupar por Utilização.")
+
+
+    # --- Prêmio e Sinistro por Dimensão ---
+    st.subheader("Prêmio e Sinistro por Dimensão")
+
+    if not resultado_final_filtrado.empty:
+        # As dimensões escolhidas, na ordem, formam o detalhamento da quebra
+        rotulos_dimensoes = {DIMENSOES_CUBO[d]: d for d in cubo.dimensoes}
+        dimensoes_quebra = st.multiselect(
+            'Quebrar por', options=list(rotulos_dimensoes),
+            default=['Produto'] if 'Produto' in rotulos_dimensoes else [],
+            key='dimensoes_quebra')
+        if dimensoes_quebra:
+            exibir_tabela(cubo.quebra(
+                [rotulos_dimensoes[rotulo] for rotulo in dimensoes_quebra],
+                filtros_cubo), hide_index=True)
+        else:
+            st.info("Escolha ao menos uma dimensão para a quebra.")
+    else:
+        st.info("Nenhum dado disponível para a quebra por dimensão.")
+
+
+    # --- Prêmio Ganho e Sinistralidade por Período ---
+    st.subheader("Prêmio Ganho e Sinistralidade por Período")
+
+    if sinistros_ocorrencia is None:
+        st.info(f"A base de sinistros não tem a coluna de data de ocorrência "
+                f"'{COLUNA_DATA_OCORRENCIA}' (DASHBOARD_COLUNA_OCORRENCIA).")
+    elif not resultado_final_filtrado.empty:
+        periodicidade = st.radio('Periodicidade', list(PERIODICIDADES),
+                                 horizontal=True, key='periodicidade_sinistralidade')
+        # Prêmio ganho pro rata da vigência e sinistro pela data de ocorrência
+        serie_periodo = sinistralidade_por_periodo(
+            resultado_final_filtrado, sinistros_ocorrencia,
+            PERIODICIDADES[periodicidade], MOEDA_EM_CENTAVOS)
+        serie_periodo['Período'] = serie_periodo['Período'].astype(str)
+        st.line_chart(serie_periodo, x='Período', y='% Sinistralidade')
+        exibir_tabela(serie_periodo, hide_index=True)
+    else:
+        st.info("Nenhum dado disponível para a série por período.")
+
+
+painel_dados_gerais(hierarquia_filtros, versao_dados.sinistros_ocorrencia,
+                    versao_dados.cubo, busca)
+
+
+@st.fragment
+@execucao_rastreada('painel_triangulos')
+def painel_triangulos(triangulos):
+    """
+    Triângulos de desenvolvimento dos sinistros (ocorrência x atraso do
+    aviso), com filtros próprios. Cada combinação de filtros é calculada uma
+    vez por carga de dados e reaproveitada por todas as sessões.
+    """
+    st.subheader("Triângulos de Desenvolvimento")
+
+    if triangulos is None:
+        st.info("A base de sinistros não tem as datas de ocorrência e de aviso "
+                "(DASHBOARD_COLUNA_OCORRENCIA e DASHBOARD_COLUNA_AVISO).")
+        return
+
+    colunas_filtro = st.columns(len(DIMENSOES_TRIANGULO) + 2)
+    filtros = {}
+    for coluna_tela, (rotulo, coluna) in zip(colunas_filtro, DIMENSOES_TRIANGULO.items()):
+        with coluna_tela:
+            filtros[coluna] = st.multiselect(
+                rotulo, options=triangulos.opcoes(coluna), default=[],
+                key=f'triangulo_{coluna}')
+    with colunas_filtro[-2]:
+        tipo = st.selectbox('Triângulo', TIPOS_TRIANGULO, key='triangulo_tipo')
+    with colunas_filtro[-1]:
+        periodicidade = st.selectbox('Periodicidade', list(PERIODICIDADES_TRIANGULO),
+                                     key='triangulo_periodicidade')
+
+    triangulo = triangulos.triangulos(
+        PERIODICIDADES_TRIANGULO[periodicidade], filtros)[tipo]
+    st.caption("Valores acumulados por período de ocorrência (linhas) e atraso "
+               "do aviso em períodos (colunas).")
+    if tipo == 'Quantidade':
+        exibir_dataframe(triangulo)
+    else:
+        tabela = triangulo.rename(columns=str)
+        exibir_dataframe(formatar_colunas_br(
+            tabela, tabela.columns, em_centavos=MOEDA_EM_CENTAVOS))
+
+
+painel_triangulos(versao_dados.triangulos)
+
+
+def exibir_painel_debug(rastreio):
+    """
+    Painel de diagnóstico na sidebar: etapas da última execução do script,
+    latências p50/p95 das execuções do processo (script e fragmentos) e
+    download do rastreio em JSON.
+    """
+    with st.sidebar.expander('Diagnóstico de desempenho'):
+        st.caption(f"Execução do script: {rastreio['tempo_ms']:.0f} ms")
+        etapas = pd.DataFrame(rastreio['etapas'])
+        if not etapas.empty:
+            etapas['etapa'] = ['  ' * nivel + nome for nivel, nome
+                               in zip(etapas.pop('nivel'), etapas['etapa'])]
+            st.dataframe(etapas, hide_index=True)
+        st.caption('Latência das execuções (ms)')
+        st.dataframe(pd.DataFrame(resumo_latencias()), hide_index=True)
+        if relatorio_memoria:
+            st.caption('Memória dos dados na última carga (esquema compacto)')
+            st.dataframe(pd.DataFrame(
+                [(nome, antes, depois) for nome, (antes, depois) in relatorio_memoria.items()],
+                columns=['dados', 'antes_mb', 'depois_mb']).round(1), hide_index=True)
+        if MODO_UPLOAD:
+            cache = cache_uploads()
+            st.caption(f"Cache de uploads: {len(cache)} planilhas, "
+                       f"{cache.memoria_mb():.0f} de {cache.limite_mb:.0f} MB, "
+                       f"{cache.acertos} acertos e {cache.falhas} falhas")
+        st.download_button('Baixar rastreio (JSON)', exportar_rastreio(),
+                           file_name='rastreio_dashboard.json',
+                           mime='application/json')
+
+
+# Conclui o rastreio da execução; o painel de diagnóstico só aparece com
+# DASHBOARD_DEBUG=1 (nunca por um parâmetro da URL)
+rastreio_execucao = finalizar_execucao()
+if rastreio_execucao and DEBUG_ATIVO:
+    exibir_painel_debug(rastreio_execucao)
 
 # Instruções para executar o Streamlit:
 # python -m streamlit run 1_dashboard_5_atual.py
@@ -712,3 +814,20 @@ else:
 # 2. Navegue até o diretório onde você salvou o arquivo.
 # 5. Execute o comando: `python -m streamlit run 1_dashboard_4_atual.py`
 # Se o Streamlit não estiver instalado, execute: `pip install streamlit pandas openpyxl`
+# Para o snapshot Parquet das abas (carregamento.py), instale também: `pip install pyarrow`
+# Motor de consulta DuckDB (opcional): `pip install duckdb pyarrow` e `DASHBOARD_MOTOR=duckdb`.
+# A planilha é verificada a cada 30 s (DASHBOARD_INTERVALO_ATUALIZACAO) e recarregada em segundo plano.
+# Upload da planilha pelo navegador: `DASHBOARD_UPLOAD=1` (orçamento do cache em DASHBOARD_CACHE_MB).
+# Várias planilhas (uma por mês ou filial): `DASHBOARD_PLANILHA=dados/` ou `DASHBOARD_PLANILHA="dados/2024-*.xlsx"`.
+# Tabelas paginadas no servidor com 100 linhas por página (DASHBOARD_TAMANHO_PAGINA; 0 exibe tudo).
+# Vários processos do Streamlit na mesma máquina: `DASHBOARD_COMPARTILHADO=1` publica os dados processados
+# em arquivos Arrow no diretório de snapshots, mapeados em memória (somente leitura) por todos os processos.
+# Aquecimento no deploy: `python aquecimento.py planilha.xlsx` grava os snapshots antes de subir os servidores;
+# `python aquecimento.py planilha.xlsx --servir -- <opções do streamlit>` carrega os dados e só então inicia o servidor.
+# Com `DASHBOARD_INCREMENTAL=1` a recarga reagrega só as apólices com linhas novas ou alteradas.
+# `DASHBOARD_MOTOR=duckdb`, `DASHBOARD_INCREMENTAL=1` e `DASHBOARD_COMPARTILHADO=1` são exclusivos (um de cada vez).
+# Série de sinistralidade por período: data de ocorrência na coluna `dt_ocorrencia` (DASHBOARD_COLUNA_OCORRENCIA);
+# os triângulos de desenvolvimento usam também a data de aviso `dt_aviso` (DASHBOARD_COLUNA_AVISO).
+# Diagnóstico de desempenho: `DASHBOARD_DEBUG=1` mostra o painel na sidebar;
+# `DASHBOARD_TRACE=rastreio.jsonl` grava o rastreio de cada execução (instrumentacao.py).
+# Sem nenhuma das duas o rastreio fica desligado e não custa nada por execução.
@@ -0,0 +1,129 @@
+"""
+Agregações dos dados de apólices e de sinistros usadas pelos painéis.
+
+Os dados de exibição (com o '% Sin'), o sinistro por cobertura e o prêmio e
+sinistro por utilização alimentam o dashboard; os KPIs por apólice e por
+segurado calculam para a carteira inteira os mesmos indicadores dos painéis
+da apólice e do segurado, usados pelo relatório em lote (relatorio.py).
+Todos os valores continuam numéricos; a formatação é só na exibição.
+"""
+from formatacao import calcular_percentual
+from instrumentacao import rastreado
+
+
+@rastreado('preparar_exibicao')
+def preparar_exibicao(dados_calculados):
+    """
+    Monta os dados de exibição a partir dos dados agrupados por apólice:
+    acrescenta o '% Sin', posiciona as colunas de sinistro logo após o prêmio
+    e ordena pelo número da apólice. Os valores continuam numéricos.
+    """
+    # Cria uma cópia para exibição e cálculo do percentual
+    dados_exibicao = dados_calculados.copy()
+
+    # Cria o percentual de sinistro, tratando divisão por zero
+    dados_exibicao['% Sin'] = calcular_percentual(
+        dados_exibicao['Soma Sinistro Por Apolice'], dados_exibicao['Soma Prêmio Pago por Apolice'])
+
+    # Reordenar as colunas para que 'Soma Sinistro Por Apolice' e '% Sin' fiquem nas posições desejadas
+    colunas = list(dados_exibicao.columns)
+
+    # Remove as colunas que vamos inserir manualmente, se existirem
+    for col in ['Soma Sinistro Por Apolice', '% Sin']:
+        if col in colunas:
+            colunas.remove(col)
+
+    # Insere nas posições desejadas
+    colunas.insert(2, 'Soma Sinistro Por Apolice')
+    colunas.insert(3, '% Sin')
+
+    # Reordena o DataFrame e ordena por numero da apólice inicialmente
+    return dados_exibicao[colunas].sort_values('N° Apólice')
+
+
+@rastreado('sinistro_por_cobertura')
+def sinistro_por_cobertura(df_sinistro, por=()):
+    """
+    Total de sinistro e quantidade de sinistros distintos por cobertura.
+    Com 'por' (lista de colunas), o agrupamento é feito também por elas,
+    por exemplo por apólice, numa única passada.
+    """
+    return df_sinistro.groupby([*por, 'Cobertura'], as_index=False, observed=True).agg(**{
+        'Total Sinistro': ('Total Sinistro', 'sum'),
+        'Qtd Sinistros': ('nr_sinistro', 'nunique')
+    })
+
+
+@rastreado('premio_sinistro_por_utilizacao')
+def premio_sinistro_por_utilizacao(dados_apolices):
+    """
+    Prêmio, sinistro e % de sinistralidade por utilização do veículo,
+    ordenado pelo prêmio (numérico) em ordem decrescente.
+    """
+    # Agrupe por 'nm_auto_utilizacao' e some os valores numéricos
+    groupby_utilizacao = dados_apolices.groupby('nm_auto_utilizacao', observed=True).agg(
+        Total_Premio=('Soma Prêmio Pago por Apolice', 'sum'),
+        Total_Sinistro=('Soma Sinistro Por Apolice', 'sum')
+    ).reset_index()
+
+    # Calcule a % de Sinistralidade para cada grupo
+    groupby_utilizacao['% Sinistralidade'] = calcular_percentual(
+        groupby_utilizacao['Total_Sinistro'], groupby_utilizacao['Total_Premio'])
+
+    # Renomeie a coluna de agrupamento para melhor apresentação
+    groupby_utilizacao.rename(
+        columns={'nm_auto_utilizacao': 'Utilização'}, inplace=True)
+
+    # Ordene o DataFrame pelo 'Total_Premio' em ordem decrescente
+    return groupby_utilizacao.sort_values(by='Total_Premio', ascending=False)
+
+
+def _qtd_sinistros_por(df_sinistro, coluna):
+    """
+    Quantidade de sinistros distintos para cada valor de 'coluna', com o
+    índice sem categorias (para o map sobre as chaves de outra tabela).
+    """
+    qtd = df_sinistro.groupby(coluna, observed=True)['nr_sinistro'].nunique()
+    qtd.index = qtd.index.astype(object)
+    return qtd
+
+
+@rastreado('kpis_por_apolice')
+def kpis_por_apolice(dados_apolices, df_sinistro):
+    """
+    KPIs do painel da apólice para todas as apólices de uma vez: prêmio,
+    sinistro, % de sinistro (0 sem prêmio) e quantidade de sinistros
+    distintos, com o segurado de cada apólice.
+    """
+    kpis = dados_apolices[[
+        'N° Apólice', 'nm_estipulante', 'Soma Prêmio Pago por Apolice',
+        'Soma Sinistro Por Apolice']].rename(columns={
+            'nm_estipulante': 'Segurado',
+            'Soma Prêmio Pago por Apolice': 'Total Prêmio Pago',
+            'Soma Sinistro Por Apolice': 'Total Sinistro'})
+    kpis['% Sinistro Total'] = calcular_percentual(
+        kpis['Total Sinistro'], kpis['Total Prêmio Pago'])
+    qtd = _qtd_sinistros_por(df_sinistro, 'N° Apólice')
+    kpis['Qtd Sinistros'] = kpis['N° Apólice'].map(qtd).fillna(0).astype('int64')
+    return kpis.sort_values('N° Apólice', ignore_index=True)
+
+
+@rastreado('kpis_por_segurado')
+def kpis_por_segurado(dados_apolices, df_sinistro):
+    """
+    KPIs do painel do segurado para todos os segurados (nm_estipulante) de
+    uma vez: prêmio e sinistro das suas apólices, % de sinistro, quantidade
+    de apólices e de sinistros distintos (pelo nm_cliente da base de
+    sinistros, como no painel).
+    """
+    kpis = dados_apolices.groupby('nm_estipulante', observed=True).agg(**{
+        'Total Prêmio Pago': ('Soma Prêmio Pago por Apolice', 'sum'),
+        'Total Sinistro': ('Soma Sinistro Por Apolice', 'sum'),
+        'Qtd Apólices': ('N° Apólice', 'nunique'),
+    }).reset_index().rename(columns={'nm_estipulante': 'Segurado'})
+    kpis['% Sinistro Total'] = calcular_percentual(
+        kpis['Total Sinistro'], kpis['Total Prêmio Pago'])
+    qtd = _qtd_sinistros_por(df_sinistro, 'nm_cliente')
+    kpis['Qtd Sinistros'] = kpis['Segurado'].astype(object).map(qtd).fillna(0).astype('int64')
+    return kpis[['Segurado', 'Total Prêmio Pago', 'Total Sinistro',
+                 '% Sinistro Total', 'Qtd Apólices', 'Qtd Sinistros']]
@@ -0,0 +1,98 @@
+"""
+Aquecimento do dashboard antes de o servidor receber tráfego.
+
+Sem --servir, é um passo do deploy: monta uma versão completa dos dados da
+planilha e deixa em disco tudo o que o servidor reaproveita (os snapshots
+Parquet das abas, que evitam a leitura do Excel, e, com
+DASHBOARD_COMPARTILHADO=1, os arquivos Arrow dos dados processados). Sai
+com código 1 se a planilha não puder ser carregada.
+
+Com --servir, a versão é carregada neste processo pelo mesmo atualizador
+que o dashboard usa, a imagem da sidebar é codificada, e só então o
+servidor Streamlit é iniciado no mesmo processo: a primeira sessão encontra
+tudo pronto, como as seguintes. Os argumentos depois de '--' vão para o
+'streamlit run'.
+
+Uso:
+    python aquecimento.py planilha.xlsx
+    python aquecimento.py planilha.xlsx --servir -- --server.port 8501
+"""
+import argparse
+import os
+import sys
+import time
+
+from ativos import IMAGEM_SIDEBAR, imagem_base64
+from atualizacao import construir_versao, obter_atualizador
+from carregamento import assinatura_origem
+from uploads import MODO_UPLOAD
+
+# Script do dashboard iniciado com --servir
+SCRIPT_DASHBOARD = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Dashboard.py')
+
+
+def aquecer(planilha):
+    """
+    Monta uma versão completa dos dados da planilha (gravando os snapshots
+    e arquivos compartilhados). Retorna a versão.
+    """
+    return construir_versao(planilha, assinatura_origem(planilha))
+
+
+def aquecer_processo(planilha):
+    """
+    Carrega os dados pelo atualizador do processo e a imagem da sidebar,
+    que o dashboard iniciado neste processo vai reaproveitar. Levanta o erro
+    da carga se ela falhar.
+    """
+    imagem_base64(IMAGEM_SIDEBAR)
+    if MODO_UPLOAD:
+        return None
+    atualizador = obter_atualizador(planilha)
+    versao = atualizador.versao_atual()
+    if versao is None:
+        raise atualizador.erro
+    return versao
+
+
+def main():
+    argumentos = sys.argv[1:]
+    argumentos_streamlit = []
+    if '--' in argumentos:
+        separador = argumentos.index('--')
+        argumentos, argumentos_streamlit = argumentos[:separador], argumentos[separador + 1:]
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('planilha', nargs='?', default=os.environ.get('DASHBOARD_PLANILHA'),
+                        help='Planilha, diretório ou padrão glob (padrão: DASHBOARD_PLANILHA)')
+    parser.add_argument('--servir', action='store_true',
+                        help='Inicia o servidor Streamlit neste processo depois do aquecimento')
+    args = parser.parse_args(argumentos)
+    if args.planilha is None and not (args.servir and MODO_UPLOAD):
+        parser.error('informe a planilha ou defina DASHBOARD_PLANILHA')
+
+    inicio = time.perf_counter()
+    try:
+        if args.servir:
+            # O dashboard lê a planilha de DASHBOARD_PLANILHA e encontra o
+            # atualizador já carregado para o mesmo caminho
+            if args.planilha is not None:
+                os.environ['DASHBOARD_PLANILHA'] = args.planilha
+            versao = aquecer_processo(args.planilha)
+        else:
+            versao = aquecer(args.planilha)
+    except Exception as e:
+        print(f'Falha no aquecimento: {e}', file=sys.stderr)
+        sys.exit(1)
+    if versao is not None:
+        print(f'{len(versao.dados_exibicao)} apólices carregadas de '
+              f"'{args.planilha}' em {time.perf_counter() - inicio:.2f} s")
+
+    if args.servir:
+        from streamlit.web import cli
+        sys.argv = ['streamlit', 'run', SCRIPT_DASHBOARD, *argumentos_streamlit]
+        sys.exit(cli.main())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,29 @@
+"""
+Arquivos estáticos do dashboard, lidos e codificados uma única vez por
+processo em vez de a cada rerun.
+"""
+import base64
+import functools
+import logging
+import os
+
+# Diretório das imagens, relativo ao código (funciona em qualquer máquina)
+DIRETORIO_IMAGENS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'image')
+
+# Imagem exibida no topo da sidebar
+IMAGEM_SIDEBAR = 'lexus_hotoroom.png'
+
+
+@functools.lru_cache(maxsize=None)
+def imagem_base64(nome):
+    """
+    Conteúdo da imagem 'nome' do diretório de imagens em base64, ou None se
+    ela não puder ser lida.
+    """
+    caminho = os.path.join(DIRETORIO_IMAGENS, nome)
+    try:
+        with open(caminho, 'rb') as arquivo:
+            return base64.b64encode(arquivo.read()).decode()
+    except OSError as e:
+        logging.error(f"Error converting image to base64: {str(e)}")
+        return None
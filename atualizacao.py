@@ -0,0 +1,254 @@
+"""
+Atualização dos dados em segundo plano.
+
+Uma thread acompanha a assinatura (mtime e tamanho) da planilha, ou de
+todas as planilhas de um diretório ou padrão glob, e, quando ela muda,
+reconstrói fora das requisições todos os dados do dashboard: agregado por
+apólice, base de sinistros, índices e hierarquia dos filtros.
+A nova versão só substitui a anterior quando está completa (troca de uma
+única referência), então as sessões continuam servindo a versão anterior
+durante a reconstrução e nenhuma requisição espera por uma recarga, exceto
+a primeira carga do processo.
+"""
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+
+from agregacoes import preparar_exibicao
+from busca import IndiceBusca
+from carregamento import (INGESTAO_INCREMENTAL, MOEDA_EM_CENTAVOS, assinatura_origem,
+                          carregar_planilha, carregar_planilha_incremental)
+from compartilhado import DADOS_COMPARTILHADOS, carregar_compartilhado
+from cubo import CuboSinistralidade
+from filtros import HierarquiaFiltros
+from indices import construir_indices
+from instrumentacao import etapa, finalizar_execucao, iniciar_execucao
+from motor_duckdb import (MOTOR_DUCKDB, FiltrosDuckDB, carregar_motor,
+                          construir_indices_duckdb)
+from sinistralidade import COLUNA_DATA_OCORRENCIA, sinistros_por_ocorrencia
+from triangulos import TriangulosSinistro, construir_triangulos
+
+# Intervalo (s) entre as verificações da planilha
+INTERVALO_ATUALIZACAO = float(os.environ.get('DASHBOARD_INTERVALO_ATUALIZACAO', '30'))
+
+# Espera (s) para confirmar que o arquivo parou de mudar antes de recarregar,
+# para não ler uma planilha que ainda está sendo gravada
+ESPERA_ESTABILIZACAO = 2.0
+
+# Modos de carga dos dados, mutuamente exclusivos (configuração -> ativo)
+MODOS_CARGA = {
+    'DASHBOARD_MOTOR=duckdb': MOTOR_DUCKDB,
+    'DASHBOARD_INCREMENTAL=1': INGESTAO_INCREMENTAL,
+    'DASHBOARD_COMPARTILHADO=1': DADOS_COMPARTILHADOS,
+}
+
+
+def verificar_modos_carga(modos=MODOS_CARGA):
+    """
+    Levanta ValueError se mais de um modo de carga estiver ativo: cada modo
+    monta os dados de um jeito e combiná-los não é suportado.
+    """
+    ativos = [configuracao for configuracao, ativo in modos.items() if ativo]
+    if len(ativos) > 1:
+        raise ValueError(
+            f"Modos de carga incompatíveis: {', '.join(ativos)}. Ative no máximo um deles.")
+
+
+# Rejeita a configuração conflitante já na inicialização do processo
+verificar_modos_carga()
+
+# Uma versão completa dos dados do dashboard. 'motor' é o MotorDuckDB no
+# modo DuckDB e None no modo pandas; 'estado_incremental' é o estado da
+# carga incremental (DASHBOARD_INCREMENTAL=1) ou None; 'sinistros_ocorrencia'
+# é a base da série de sinistralidade (None sem a coluna de ocorrência) e
+# 'triangulos' a dos triângulos de desenvolvimento (None sem as datas);
+# 'cubo' é o prêmio e sinistro pré-agregados por dimensão das apólices e
+# 'busca' o índice de busca dos seletores de apólice, segurado e corretor.
+VersaoDados = namedtuple('VersaoDados', [
+    'assinatura', 'modificado_em', 'carregado_em',
+    'dados_exibicao', 'indices', 'hierarquia_filtros', 'motor',
+    'estado_incremental', 'sinistros_ocorrencia', 'triangulos', 'cubo', 'busca'])
+
+
+def construir_versao(caminho_arquivo, assinatura, anterior=None,
+                     em_centavos=MOEDA_EM_CENTAVOS):
+    """
+    Carrega a planilha e monta todas as estruturas de uma versão dos dados.
+    Na carga incremental o agregado por apólice parte do estado da versão
+    'anterior'. Levanta FileNotFoundError se o arquivo não existir e
+    ValueError se não houver dados.
+    """
+    motor = None
+    estado_incremental = None
+    dados_exibicao = None
+    if MOTOR_DUCKDB:
+        # Só o agregado por apólice vem para o pandas; a base de sinistros
+        # é consultada direto do snapshot Parquet.
+        motor = carregar_motor(caminho_arquivo, em_centavos)
+        dados_calculados = motor.apolices
+    elif INGESTAO_INCREMENTAL:
+        dados_calculados, df_sinistros, estado_incremental = carregar_planilha_incremental(
+            caminho_arquivo, anterior.estado_incremental if anterior else None, em_centavos)
+    elif DADOS_COMPARTILHADOS:
+        # Dados de exibição e base de sinistros mapeados dos arquivos Arrow
+        # publicados por este ou por outro processo do servidor
+        dados_exibicao, df_sinistros = carregar_compartilhado(
+            caminho_arquivo, assinatura, em_centavos)
+        dados_calculados = dados_exibicao
+    else:
+        dados_calculados, df_sinistros = carregar_planilha(caminho_arquivo, em_centavos)
+    if motor is None and df_sinistros.empty:
+        raise ValueError("A aba 'sinistro' da planilha está vazia.")
+    if dados_calculados.empty:
+        raise ValueError("A planilha não tem dados de apólices.")
+
+    # Dados de exibição com o '% Sin', colunas reordenadas e ordenados por
+    # apólice. Os valores continuam numéricos; a formatação é só na exibição.
+    if dados_exibicao is None:
+        dados_exibicao = preparar_exibicao(dados_calculados)
+
+    if motor is not None:
+        # Mesmas interfaces dos índices e da hierarquia, respondidas em SQL
+        indices = construir_indices_duckdb(dados_exibicao, motor)
+        hierarquia_filtros = FiltrosDuckDB(dados_exibicao, motor)
+        sinistros_ocorrencia = motor.sinistros_por_ocorrencia(COLUNA_DATA_OCORRENCIA)
+        celulas = motor.celulas_triangulos(dados_exibicao)
+        triangulos = TriangulosSinistro(*celulas) if celulas is not None else None
+        sinistros_busca = motor.sinistros_apolices()
+    else:
+        indices = construir_indices(dados_exibicao, df_sinistros)
+        with etapa('HierarquiaFiltros', dados_exibicao):
+            hierarquia_filtros = HierarquiaFiltros(dados_exibicao)
+        sinistros_ocorrencia = sinistros_por_ocorrencia(df_sinistros)
+        triangulos = construir_triangulos(df_sinistros, dados_exibicao)
+        sinistros_busca = df_sinistros
+    with etapa('CuboSinistralidade', dados_exibicao):
+        cubo = CuboSinistralidade(dados_exibicao)
+    with etapa('IndiceBusca', dados_exibicao):
+        busca = IndiceBusca(dados_exibicao, sinistros_busca)
+
+    return VersaoDados(
+        assinatura=assinatura,
+        modificado_em=datetime.fromtimestamp(assinatura[0] / 1e9),
+        carregado_em=datetime.now(),
+        dados_exibicao=dados_exibicao,
+        indices=indices,
+        hierarquia_filtros=hierarquia_filtros,
+        motor=motor,
+        estado_incremental=estado_incremental,
+        sinistros_ocorrencia=sinistros_ocorrencia,
+        triangulos=triangulos,
+        cubo=cubo,
+        busca=busca,
+    )
+
+
+class AtualizadorDados:
+    """
+    Mantém a versão atual dos dados de uma planilha e a reconstrói numa
+    thread em segundo plano quando o arquivo muda.
+
+    Se a reconstrução falhar, a versão anterior continua sendo servida e o
+    erro fica em 'erro' até a próxima mudança do arquivo.
+    """
+
+    def __init__(self, caminho_arquivo, intervalo=INTERVALO_ATUALIZACAO,
+                 construir=construir_versao):
+        self.caminho_arquivo = caminho_arquivo
+        self.intervalo = intervalo
+        self.erro = None
+        self.atualizando = False
+        self._construir = construir
+        self._versao = None
+        self._assinatura_com_erro = None
+        self._primeira_carga = threading.Event()
+        self._parar = threading.Event()
+        self._thread = threading.Thread(
+            target=self._executar, name='atualizador-dados', daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+
+    def versao_atual(self, timeout=None):
+        """
+        Retorna a versão atual dos dados, esperando a primeira carga do
+        processo. Retorna None se a primeira carga falhou.
+        """
+        self._primeira_carga.wait(timeout)
+        return self._versao
+
+    def atualizar_se_mudou(self):
+        """
+        Reconstrói os dados se a assinatura do arquivo mudou desde a versão
+        atual. Retorna True se uma reconstrução foi tentada.
+        """
+        assinatura = assinatura_origem(self.caminho_arquivo)
+        if assinatura is None:
+            if self._versao is None:
+                self.erro = FileNotFoundError(self.caminho_arquivo)
+            return False
+        atual = self._versao
+        if (atual is not None and atual.assinatura == assinatura) \
+                or assinatura == self._assinatura_com_erro:
+            return False
+
+        if atual is not None:
+            # Só recarrega depois que o arquivo parar de mudar
+            time.sleep(ESPERA_ESTABILIZACAO)
+            if assinatura_origem(self.caminho_arquivo) != assinatura:
+                return False
+
+        self.atualizando = True
+        iniciar_execucao('atualizacao')
+        try:
+            nova = self._construir(self.caminho_arquivo, assinatura, atual)
+        except Exception as e:
+            logging.exception(f"Falha ao atualizar os dados de '{self.caminho_arquivo}'")
+            self.erro = e
+            self._assinatura_com_erro = assinatura
+        else:
+            # Troca atômica: as sessões passam a ler a nova versão completa
+            self._versao = nova
+            self.erro = None
+            self._assinatura_com_erro = None
+            logging.info(f"Dados atualizados: '{self.caminho_arquivo}' de {nova.modificado_em}")
+        finally:
+            self.atualizando = False
+            finalizar_execucao()
+        return True
+
+    def _executar(self):
+        while True:
+            try:
+                self.atualizar_se_mudou()
+            finally:
+                self._primeira_carga.set()
+            if self._parar.wait(self.intervalo):
+                break
+
+
+# Atualizadores do processo, um por planilha (ver obter_atualizador)
+_atualizadores = {}
+_trava_atualizadores = threading.Lock()
+
+
+def obter_atualizador(caminho_arquivo):
+    """
+    Atualizador da planilha neste processo, iniciado na primeira chamada.
+    O dashboard e o aquecimento (aquecimento.py --servir) usam a mesma
+    instância, então a carga feita antes de o servidor aceitar conexões é
+    a que as sessões encontram.
+    """
+    with _trava_atualizadores:
+        atualizador = _atualizadores.get(caminho_arquivo)
+        if atualizador is None:
+            atualizador = AtualizadorDados(caminho_arquivo).iniciar()
+            _atualizadores[caminho_arquivo] = atualizador
+        return atualizador
@@ -0,0 +1,297 @@
+"""
+Benchmark das etapas do dashboard sobre dados sintéticos.
+
+Gera as abas com dados_sinteticos.gerar_dados em cada tamanho pedido e mede,
+sem o Streamlit, cada etapa do pipeline: carga, 'Total Sinistro',
+agrupamento por apólice, esquema compacto, dados de exibição, índices,
+cascata de filtros, fatias por apólice e por segurado, agrupamentos,
+cubo por dimensão, formatação e o relatório de KPIs da carteira. Para cada etapa são
+registrados a mediana e o mínimo das repetições; as etapas de consulta são
+medidas por operação. A memória dos dados de apólices e de sinistros antes e
+depois do esquema compacto também é registrada.
+
+Uso:
+    python benchmark.py --tamanhos 10000 100000 1000000 --saida resultado.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import carregamento
+from agregacoes import (preparar_exibicao, premio_sinistro_por_utilizacao,
+                        sinistro_por_cobertura)
+from carregamento import (calcular_total_sinistro, compactar_tipos,
+                          converter_datas, eh_coluna_moeda, ler_abas,
+                          memoria_mb, processar_abas)
+from cubo import CuboSinistralidade
+from dados_sinteticos import LIMITE_LINHAS_EXCEL, gerar_dados, salvar_dados
+from filtros import NIVEIS_FILTRO, HierarquiaFiltros
+from formatacao import formatar_colunas_br
+from indices import construir_indices
+from relatorio import gerar_relatorio
+
+# Quantidade de consultas (caminhos da cascata, apólices) por repetição
+CONSULTAS_POR_REPETICAO = 50
+
+
+def medir(funcao, repeticoes, preparar=tuple):
+    """
+    Executa 'funcao(*preparar())' 'repeticoes' vezes, medindo só a chamada
+    da função. Retorna a lista de tempos (s) e o resultado da última chamada.
+    """
+    tempos = []
+    resultado = None
+    for _ in range(repeticoes):
+        argumentos = preparar()
+        inicio = time.perf_counter()
+        resultado = funcao(*argumentos)
+        tempos.append(time.perf_counter() - inicio)
+    return tempos, resultado
+
+
+def _resumo(tempos, operacoes=1):
+    return {
+        'mediana_s': statistics.median(tempos) / operacoes,
+        'minimo_s': min(tempos) / operacoes,
+        'operacoes': operacoes,
+    }
+
+
+def _caminhos_cascata(hierarquia, quantidade, rng):
+    """
+    Sorteia caminhos da cascata de filtros: um valor por nível, escolhido
+    entre as opções que restam depois dos níveis anteriores.
+    """
+    caminhos = []
+    for _ in range(quantidade):
+        linhas = None
+        caminho = []
+        for coluna in NIVEIS_FILTRO:
+            opcoes = hierarquia.opcoes(coluna, linhas)
+            if not opcoes:
+                break
+            valor = opcoes[rng.integers(len(opcoes))]
+            caminho.append((coluna, [valor]))
+            linhas = hierarquia.aplicar(coluna, [valor], linhas)
+        caminhos.append(caminho)
+    return caminhos
+
+
+def _percorrer_cascata(hierarquia, caminhos):
+    for caminho in caminhos:
+        linhas = None
+        for coluna, selecionados in caminho:
+            hierarquia.opcoes(coluna, linhas)
+            linhas = hierarquia.aplicar(coluna, selecionados, linhas)
+        hierarquia.dados_filtrados(linhas)
+
+
+def _fatiar(indice_dados, indice_sinistros, chaves):
+    for chave in chaves:
+        indice_dados.fatia(chave)
+        indice_sinistros.fatia(chave)
+
+
+def _etapas_carga(aba_apolice_endosso, aba_sinistro, diretorio, repeticoes, limite_excel):
+    """
+    Mede a carga das abas. Até 'limite_excel' linhas grava uma planilha e
+    mede a leitura do Excel (com a gravação do snapshot) e a leitura do
+    snapshot; acima disso mede só a leitura dos arquivos Parquet.
+    """
+    etapas = {}
+    if len(aba_apolice_endosso) <= min(limite_excel, LIMITE_LINHAS_EXCEL):
+        planilha = os.path.join(diretorio, 'base.xlsx')
+        salvar_dados(aba_apolice_endosso, aba_sinistro, planilha)
+        # Os snapshots vão para o diretório temporário só durante a medição
+        diretorio_snapshot = carregamento.DIRETORIO_SNAPSHOT
+        carregamento.DIRETORIO_SNAPSHOT = os.path.join(diretorio, 'snapshot')
+
+        def sem_snapshot():
+            shutil.rmtree(carregamento.DIRETORIO_SNAPSHOT, ignore_errors=True)
+            return (planilha,)
+
+        try:
+            tempos, _ = medir(ler_abas, repeticoes, sem_snapshot)
+            etapas['carga_excel'] = _resumo(tempos)
+            tempos, _ = medir(ler_abas, repeticoes, lambda: (planilha,))
+            etapas['carga_snapshot'] = _resumo(tempos)
+        finally:
+            carregamento.DIRETORIO_SNAPSHOT = diretorio_snapshot
+    else:
+        arquivos = salvar_dados(aba_apolice_endosso, aba_sinistro,
+                                os.path.join(diretorio, 'base'))
+        tempos, _ = medir(lambda: [pd.read_parquet(a) for a in arquivos], repeticoes)
+        etapas['carga_parquet'] = _resumo(tempos)
+    return etapas
+
+
+def executar(linhas, repeticoes=3, em_centavos=False, semente=0, limite_excel=100_000):
+    """
+    Executa o benchmark completo para um tamanho da aba 'apolice_endosso'.
+    Retorna um dicionário com o tamanho dos dados e o resumo de cada etapa.
+    """
+    rng = np.random.default_rng(semente)
+    inicio = time.perf_counter()
+    aba_apolice_endosso, aba_sinistro = gerar_dados(linhas, semente)
+    geracao = time.perf_counter() - inicio
+
+    # A planilha real chega com textos (object), não com 'category'
+    for df in (aba_apolice_endosso, aba_sinistro):
+        for coluna in df.select_dtypes('category').columns:
+            df[coluna] = df[coluna].astype(object)
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        etapas = _etapas_carga(aba_apolice_endosso, aba_sinistro, diretorio,
+                               repeticoes, limite_excel)
+
+    tempos, _ = medir(calcular_total_sinistro, repeticoes,
+                      lambda: (aba_sinistro.copy(),))
+    etapas['total_sinistro'] = _resumo(tempos)
+
+    tempos, (resultado_final, df_sinistros) = medir(
+        processar_abas, repeticoes,
+        lambda: (converter_datas(aba_apolice_endosso.copy()), aba_sinistro.copy(), em_centavos))
+    etapas['agrupamento_por_apolice'] = _resumo(tempos)
+
+    tempos, _ = medir(lambda a, b: (compactar_tipos(a), compactar_tipos(b)), repeticoes,
+                      lambda: (resultado_final.copy(), df_sinistros.copy()))
+    etapas['esquema_compacto'] = _resumo(tempos)
+    memoria = {}
+    for nome, df in (('apolices', resultado_final), ('sinistros', df_sinistros)):
+        antes = memoria_mb(df)
+        compactar_tipos(df)
+        memoria[nome] = {'antes_mb': antes, 'depois_mb': memoria_mb(df)}
+
+    tempos, dados_exibicao = medir(preparar_exibicao, repeticoes,
+                                   lambda: (resultado_final,))
+    etapas['dados_exibicao'] = _resumo(tempos)
+
+    tempos, indices = medir(construir_indices, repeticoes,
+                            lambda: (dados_exibicao, df_sinistros))
+    etapas['indices'] = _resumo(tempos)
+
+    tempos, hierarquia = medir(HierarquiaFiltros, repeticoes,
+                               lambda: (dados_exibicao,))
+    etapas['hierarquia_filtros'] = _resumo(tempos)
+
+    caminhos = _caminhos_cascata(hierarquia, CONSULTAS_POR_REPETICAO, rng)
+    tempos, _ = medir(_percorrer_cascata, repeticoes, lambda: (hierarquia, caminhos))
+    etapas['cascata_filtros'] = _resumo(tempos, len(caminhos))
+
+    apolices = rng.choice(dados_exibicao['N° Apólice'].to_numpy(), CONSULTAS_POR_REPETICAO)
+    tempos, _ = medir(_fatiar, repeticoes, lambda: (
+        indices['apolice'], indices['sinistro_apolice'], apolices))
+    etapas['fatia_apolice'] = _resumo(tempos, len(apolices))
+
+    # Segurados sorteados entre os que têm sinistro, incluindo o maior deles
+    clientes = df_sinistros['nm_cliente'].value_counts()
+    clientes = clientes[clientes > 0]
+    segurados = [clientes.index[0]] + list(rng.choice(
+        clientes.index.to_numpy(), CONSULTAS_POR_REPETICAO - 1))
+    tempos, _ = medir(_fatiar, repeticoes, lambda: (
+        indices['estipulante'], indices['sinistro_cliente'], segurados))
+    etapas['fatia_segurado'] = _resumo(tempos, len(segurados))
+
+    maior_segurado = indices['sinistro_cliente'].fatia(segurados[0])
+    tempos, _ = medir(sinistro_por_cobertura, repeticoes, lambda: (maior_segurado,))
+    etapas['cobertura_maior_segurado'] = _resumo(tempos)
+
+    tempos, _ = medir(sinistro_por_cobertura, repeticoes, lambda: (df_sinistros,))
+    etapas['cobertura_total'] = _resumo(tempos)
+
+    tempos, _ = medir(premio_sinistro_por_utilizacao, repeticoes,
+                      lambda: (dados_exibicao,))
+    etapas['utilizacao'] = _resumo(tempos)
+
+    tempos, cubo = medir(CuboSinistralidade, repeticoes, lambda: (dados_exibicao,))
+    etapas['cubo'] = _resumo(tempos)
+
+    # Quebra por utilização respondida pelo cubo, filtrada por um representante
+    representante = [hierarquia.opcoes('nm_representante')[0]]
+    tempos, _ = medir(cubo.quebra, repeticoes, lambda: (
+        ['nm_auto_utilizacao'], {'nm_representante': representante}))
+    etapas['utilizacao_cubo'] = _resumo(tempos)
+
+    colunas_valor = [c for c in df_sinistros.columns if eh_coluna_moeda(c)]
+    tempos, _ = medir(formatar_colunas_br, repeticoes, lambda: (
+        maior_segurado, colunas_valor, (), em_centavos))
+    etapas['formatacao_maior_segurado'] = _resumo(tempos)
+
+    tempos, _ = medir(formatar_colunas_br, repeticoes, lambda: (
+        df_sinistros, colunas_valor, (), em_centavos))
+    etapas['formatacao_sinistros'] = _resumo(tempos)
+
+    tempos, _ = medir(gerar_relatorio, repeticoes, lambda: (dados_exibicao, df_sinistros))
+    etapas['relatorio_carteira'] = _resumo(tempos)
+
+    return {
+        'linhas_apolice_endosso': len(aba_apolice_endosso),
+        'linhas_sinistro': len(aba_sinistro),
+        'apolices': len(dados_exibicao),
+        'geracao_s': geracao,
+        'memoria_mb': memoria,
+        'etapas': etapas,
+    }
+
+
+def ambiente():
+    """
+    Informações da máquina e das versões, para comparar execuções.
+    """
+    return {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'plataforma': platform.platform(),
+        'processador': platform.processor() or platform.machine(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tamanhos', type=int, nargs='+', default=[10_000, 100_000],
+                        help="Linhas da aba 'apolice_endosso' em cada execução")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--centavos', action='store_true',
+                        help='Valores monetários em centavos (int64)')
+    parser.add_argument('--limite-excel', type=int, default=100_000,
+                        help='Maior tamanho em que a carga do Excel é medida')
+    parser.add_argument('--saida', help='Arquivo JSON com os resultados')
+    args = parser.parse_args()
+
+    resultados = []
+    for linhas in args.tamanhos:
+        resultado = executar(linhas, args.repeticoes, args.centavos,
+                             args.semente, args.limite_excel)
+        resultados.append(resultado)
+        print(f"\n{linhas} linhas de endosso, {resultado['linhas_sinistro']} de sinistro, "
+              f"{resultado['apolices']} apólices")
+        for nome, memoria in resultado['memoria_mb'].items():
+            print(f"  memória {nome:20s} {memoria['antes_mb']:10.1f} MB -> "
+                  f"{memoria['depois_mb']:.1f} MB (esquema compacto)")
+        for etapa, resumo in resultado['etapas'].items():
+            por = ' por operação' if resumo['operacoes'] > 1 else ''
+            print(f"  {etapa:28s} {resumo['mediana_s'] * 1000:10.3f} ms "
+                  f"(mín. {resumo['minimo_s'] * 1000:.3f} ms){por}")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({'ambiente': ambiente(), 'centavos': args.centavos,
+                       'resultados': resultados}, arquivo, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+"""
+Índice de busca (typeahead) dos seletores de apólice, segurado e corretor.
+
+Montado uma única vez por carga de dados sobre os números das apólices, os
+nomes dos segurados (nm_estipulante) e dos corretores e os números dos
+sinistros. Cada campo guarda as chaves de busca normalizadas (minúsculas e
+sem acentos) num array ordenado; a busca por prefixo são duas buscas
+binárias (searchsorted) e as sugestões saem da fatia entre elas, sem
+varrer nem reordenar os valores a cada rerun. Nos nomes, cada palavra
+também é início de chave: 'silva' encontra 'João da Silva'.
+
+Os seletores enviam ao navegador só as sugestões (até LIMITE_SUGESTOES) em
+vez da lista inteira de opções.
+"""
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import rastreado
+
+# Quantidade máxima de opções enviadas a cada seletor
+LIMITE_SUGESTOES = 100
+
+# Campos do índice (nome -> coluna). Os nomes são buscados também a partir
+# de cada palavra; os números, só pelo início.
+CAMPOS_BUSCA = {
+    'apolice': 'N° Apólice',
+    'segurado': 'nm_estipulante',
+    'corretor': 'nm_corretor',
+    'sinistro': 'nr_sinistro',
+}
+CAMPOS_POR_PALAVRA = ('segurado', 'corretor')
+
+# Maior caractere possível, para o limite superior de um prefixo
+_FIM_PREFIXO = '\U0010ffff'
+
+
+def normalizar(texto):
+    """
+    Texto em minúsculas, sem acentos e com espaços simples, para comparação.
+    """
+    sem_acentos = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(c for c in sem_acentos if not unicodedata.combining(c))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+def _normalizar_valores(valores):
+    """
+    normalizar aplicado a cada valor, como array de str. Os textos só com
+    letras e dígitos ASCII (como os números) só mudam de caixa.
+    """
+    textos = pd.Series(valores, dtype=object).astype(str)
+    simples = textos.str.fullmatch('[0-9A-Za-z]*').to_numpy(dtype=bool)
+    chaves = textos.str.lower().to_numpy(dtype=object)
+    chaves[~simples] = [normalizar(texto) for texto in textos[~simples]]
+    return chaves.astype(str)
+
+
+class _CampoBusca:
+    """
+    Valores distintos de um campo e as suas chaves de busca ordenadas, cada
+    uma com o código (posição) do valor de onde veio.
+    """
+
+    def __init__(self, valores, por_palavra):
+        self.valores = valores
+        self._indice_valores = pd.Index(valores)
+        if por_palavra:
+            chaves, codigos = [], []
+            for codigo, valor in enumerate(valores):
+                texto = normalizar(valor)
+                for inicio in [0, *(m.end() for m in re.finditer(' ', texto))]:
+                    chaves.append(texto[inicio:])
+                    codigos.append(codigo)
+            chaves = np.array(chaves, dtype=str)
+            codigos = np.array(codigos, dtype=np.intp)
+        else:
+            chaves = _normalizar_valores(valores)
+            codigos = np.arange(len(valores))
+        ordem = np.argsort(chaves, kind='stable')
+        self._chaves = chaves[ordem]
+        self._codigos = codigos[ordem]
+
+    def codigos(self, texto):
+        """
+        Códigos dos valores com uma chave que começa pelo texto, na ordem das
+        chaves (pode repetir um valor encontrado por mais de uma palavra).
+        """
+        prefixo = normalizar(texto)
+        inicio = np.searchsorted(self._chaves, prefixo, side='left')
+        fim = np.searchsorted(self._chaves, prefixo + _FIM_PREFIXO, side='left')
+        return self._codigos[inicio:fim]
+
+    def mascara(self, permitidos):
+        """
+        Máscara, por código, dos valores que estão em 'permitidos'.
+        """
+        mascara = np.zeros(len(self.valores), dtype=bool)
+        codigos = self._indice_valores.get_indexer(list(permitidos))
+        mascara[codigos[codigos >= 0]] = True
+        return mascara
+
+
+class IndiceBusca:
+    """
+    Índice de busca por prefixo dos campos de CAMPOS_BUSCA, com o mapa de
+    cada valor (segurado, corretor, sinistro) para as suas apólices.
+    """
+
+    def __init__(self, dados_apolices, df_sinistro=None):
+        self._campos = {}
+        self._apolices_por_valor = {}
+        apolices = dados_apolices['N° Apólice'].to_numpy()
+
+        ordenadas = np.sort(pd.unique(apolices))
+        self._campos['apolice'] = _CampoBusca(ordenadas, por_palavra=False)
+
+        for campo in CAMPOS_POR_PALAVRA:
+            coluna = CAMPOS_BUSCA[campo]
+            # Comparados como texto, como na hierarquia dos filtros
+            codigos, valores = pd.factorize(dados_apolices[coluna].astype(str), sort=True)
+            self._campos[campo] = _CampoBusca(list(valores), por_palavra=True)
+            self._apolices_por_valor[campo] = self._agrupar(codigos, apolices, len(valores))
+
+        if df_sinistro is not None and not df_sinistro.empty:
+            pares = df_sinistro[['nr_sinistro', 'N° Apólice']].dropna().drop_duplicates()
+            codigos, valores = pd.factorize(pares['nr_sinistro'], sort=True)
+            self._campos['sinistro'] = _CampoBusca(valores, por_palavra=False)
+            self._apolices_por_valor['sinistro'] = self._agrupar(
+                codigos, pares['N° Apólice'].to_numpy(), len(valores))
+
+    @staticmethod
+    def _agrupar(codigos, apolices, quantidade):
+        # Apólices de cada código, como fatias de um único array ordenado
+        ordem = np.argsort(codigos, kind='stable')
+        contagem = np.bincount(codigos[codigos >= 0], minlength=quantidade)
+        fins = np.cumsum(contagem) + np.count_nonzero(codigos < 0)
+        return apolices[ordem], fins - contagem, fins
+
+    def __contains__(self, campo):
+        return campo in self._campos
+
+    def primeiros(self, campo, limite=LIMITE_SUGESTOES):
+        """
+        Os primeiros valores do campo em ordem crescente (as sugestões sem
+        texto de busca).
+        """
+        return list(self._campos[campo].valores[:limite])
+
+    @rastreado('busca.buscar')
+    def buscar(self, campo, texto, limite=LIMITE_SUGESTOES, permitidos=None):
+        """
+        Valores do campo com uma chave que começa pelo texto, sem repetição,
+        até 'limite'. Com 'permitidos' (um conjunto) só entram os valores
+        que estão nele (as opções restantes da cascata de filtros).
+        """
+        indice = self._campos.get(campo)
+        if indice is None:
+            return []
+        codigos = indice.codigos(texto)
+        if permitidos is not None:
+            codigos = codigos[indice.mascara(permitidos)[codigos]]
+        encontrados = {}
+        for codigo in codigos:
+            encontrados.setdefault(codigo, None)
+            if len(encontrados) >= limite:
+                break
+        return [indice.valores[codigo] for codigo in encontrados]
+
+    @rastreado('busca.buscar_apolices')
+    def buscar_apolices(self, texto, limite=LIMITE_SUGESTOES):
+        """
+        Apólices encontradas pelo texto em qualquer campo: pelo número da
+        apólice, pelo número de um sinistro dela ou pelo nome do segurado ou
+        do corretor, nessa ordem de prioridade, sem repetição.
+        """
+        encontradas = dict.fromkeys(self.buscar('apolice', texto, limite))
+        for campo in ('sinistro', *CAMPOS_POR_PALAVRA):
+            if len(encontradas) >= limite or campo not in self._campos:
+                continue
+            ordenadas, inicios, fins = self._apolices_por_valor[campo]
+            for codigo in self._campos[campo].codigos(texto):
+                for apolice in ordenadas[inicios[codigo]:fins[codigo]]:
+                    encontradas.setdefault(apolice, None)
+                    if len(encontradas) >= limite:
+                        break
+                if len(encontradas) >= limite:
+                    break
+        return list(encontradas)
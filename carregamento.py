@@ -0,0 +1,779 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from itertools import repeat
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import rastreado
+
+# Diretório onde ficam os snapshots colunares das abas do Excel.
+# Pode ser alterado pela variável de ambiente DASHBOARD_SNAPSHOT.
+DIRETORIO_SNAPSHOT = os.environ.get(
+    'DASHBOARD_SNAPSHOT',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.snapshot'))
+
+# Com DASHBOARD_CENTAVOS=1 os valores monetários são carregados como inteiros
+# (int64) em centavos: todas as somas ficam exatas e os valores só são
+# convertidos para reais na exibição.
+MOEDA_EM_CENTAVOS = os.environ.get('DASHBOARD_CENTAVOS', '0') == '1'
+
+# Com DASHBOARD_INCREMENTAL=1 as recargas reaproveitam o agregado por apólice
+# da carga anterior e recalculam só as apólices com linhas novas ou alteradas.
+INGESTAO_INCREMENTAL = os.environ.get('DASHBOARD_INCREMENTAL', '0') == '1'
+
+# Acima desta fração de linhas em apólices alteradas, a carga incremental
+# recalcula tudo (o recálculo parcial deixaria de compensar).
+LIMITE_RECALCULO_PARCIAL = 0.5
+
+# Tamanho do bloco usado para calcular o hash do arquivo (1 MB)
+TAMANHO_BLOCO_HASH = 1024 * 1024
+
+# Colunas da aba 'apolice_endosso' usadas pelo dashboard
+COLUNAS_APOLICE_ENDOSSO = [
+    'cd_apolice', 'vl_tarifario_pago', 'nm_tp_apolice', 'nm_tp_cobranca',
+    'nm_regiao_circulacao', 'nm_auto_utilizacao', 'dt_ini_vig_apo',
+    'dt_fim_vig_apo', 'nm_uf_cliente', 'nm_cidade', 'nm_estipulante',
+    'nm_produto', 'nm_corretor', 'nm_representante'
+]
+
+# Abas lidas da planilha e as colunas de cada uma (None = todas as colunas).
+# A aba 'sinistro' é exibida por completo nas tabelas de sinistro.
+ABAS_PLANILHA = {
+    'apolice_endosso': COLUNAS_APOLICE_ENDOSSO,
+    'sinistro': None,
+}
+
+# Extensões consideradas planilhas quando a origem dos dados é um diretório
+EXTENSOES_PLANILHA = ('.xlsx', '.xlsm', '.xls')
+
+# Colunas que identificam um registro repetido entre arquivos, por aba. Um
+# sinistro tem uma linha por cobertura, então o registro é o par (sinistro,
+# cobertura): o par presente em mais de um arquivo vale pelo arquivo mais
+# recente (posição atualizada), e as coberturas de um mesmo sinistro que
+# estão em arquivos diferentes são todas mantidas. Nas abas sem chave (ou
+# sem alguma das colunas dela), só uma linha idêntica à de um arquivo
+# anterior é descartada.
+CHAVES_DEDUPLICACAO = {
+    'sinistro': ('nr_sinistro', 'Cobertura'),
+}
+
+# Esquema aplicado aos DataFrames carregados, para reduzir a memória dos
+# dados cacheados: dimensões de texto viram 'category', as datas de vigência
+# viram datetime64 e as colunas inteiras são reduzidas ao menor tipo possível.
+# Os valores monetários continuam float64 (float32 perderia centavos).
+COLUNAS_CATEGORIA = [
+    'nm_tp_apolice', 'nm_tp_cobranca', 'nm_regiao_circulacao',
+    'nm_auto_utilizacao', 'nm_uf_cliente', 'nm_cidade', 'nm_estipulante',
+    'nm_produto', 'nm_corretor', 'nm_representante', 'nm_cliente', 'Cobertura'
+]
+COLUNAS_DATA = ['dt_ini_vig_apo', 'dt_fim_vig_apo']
+
+# Colunas monetárias derivadas; as da planilha são as que começam com 'vl_'
+COLUNAS_MOEDA_DERIVADAS = [
+    'Total Sinistro', 'Soma Prêmio Pago por Apolice', 'Soma Sinistro Por Apolice'
+]
+
+# Componentes do 'Total Sinistro' (o salvado é subtraído)
+COMPONENTES_TOTAL_SINISTRO = [
+    'vl_sinistro_total', 'vl_despesa_total', 'vl_honorario_total', 'vl_salvado_total'
+]
+
+# Demais colunas de texto viram 'category' quando a proporção de valores
+# distintos em relação ao número de linhas é no máximo esta.
+LIMITE_CARDINALIDADE_CATEGORIA = 0.5
+
+logger = logging.getLogger(__name__)
+
+# Memória (MB) dos dados de apólices e de sinistros antes e depois do
+# esquema compacto na última carga do processo, exibida no painel de
+# diagnóstico: {nome: (antes, depois)}
+relatorio_memoria = {}
+
+
+def listar_planilhas(origem):
+    """
+    Planilhas de uma origem de dados: um arquivo, um diretório (todas as
+    planilhas dele) ou um padrão glob como 'dados/2024-*.xlsx'. Os arquivos
+    são ordenados pelo nome, que nos arquivos mensais segue a ordem dos
+    períodos. Levanta FileNotFoundError se o diretório ou o padrão não tiver
+    nenhuma planilha.
+    """
+    if os.path.isdir(origem):
+        caminhos = [
+            os.path.join(origem, nome) for nome in os.listdir(origem)
+            if nome.lower().endswith(EXTENSOES_PLANILHA) and not nome.startswith('~$')]
+    elif any(caractere in origem for caractere in '*?['):
+        caminhos = [caminho for caminho in glob(origem) if os.path.isfile(caminho)]
+    else:
+        return [origem]
+    if not caminhos:
+        raise FileNotFoundError(f"Nenhuma planilha encontrada em '{origem}'")
+    return sorted(caminhos)
+
+
+def assinatura_origem(origem):
+    """
+    Assinatura de uma origem de dados (ver listar_planilhas). Para um único
+    arquivo é a assinatura_arquivo; para vários, o maior mtime, o tamanho
+    total e a assinatura de cada arquivo, de modo que incluir, remover ou
+    alterar qualquer arquivo muda a assinatura. Retorna None se não houver
+    planilhas.
+    """
+    try:
+        caminhos = listar_planilhas(origem)
+    except FileNotFoundError:
+        return None
+    if caminhos == [origem]:
+        return assinatura_arquivo(origem)
+    assinaturas = [assinatura_arquivo(caminho) for caminho in caminhos]
+    if None in assinaturas:
+        return None
+    return (max(mtime for mtime, _ in assinaturas),
+            sum(tamanho for _, tamanho in assinaturas),
+            tuple(zip(caminhos, assinaturas)))
+
+
+def assinatura_arquivo(caminho_arquivo):
+    """
+    Retorna uma assinatura barata do arquivo (mtime em ns e tamanho).
+    Usada como parte da chave do cache do Streamlit, para que a troca do
+    arquivo invalide os dados cacheados. Retorna None se o arquivo não existir.
+    """
+    try:
+        info = os.stat(caminho_arquivo)
+    except OSError:
+        return None
+    return (info.st_mtime_ns, info.st_size)
+
+
+def hash_arquivo(caminho_arquivo):
+    """
+    Calcula o hash SHA-256 do conteúdo do arquivo, lendo em blocos.
+    """
+    sha = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b''):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _caminhos_snapshot(caminho_arquivo, aba):
+    """
+    Retorna os caminhos do arquivo Parquet e do arquivo de metadados do
+    snapshot de uma aba. O nome é derivado do caminho absoluto da planilha.
+    """
+    chave = hashlib.sha1(
+        os.path.abspath(caminho_arquivo).encode('utf-8')).hexdigest()[:16]
+    base = os.path.join(DIRETORIO_SNAPSHOT, f'{chave}_{aba}')
+    return base + '.parquet', base + '.json'
+
+
+def _ler_metadados(caminho_meta):
+    try:
+        with open(caminho_meta, encoding='utf-8') as arquivo:
+            return json.load(arquivo)
+    except (OSError, ValueError):
+        return None
+
+
+def gravar_atomico(caminho, escrever):
+    """
+    Grava em um arquivo temporário com 'escrever(caminho_temporario)' e
+    renomeia no final, para que leitores concorrentes (inclusive de outros
+    processos) nunca vejam um arquivo pela metade.
+    """
+    temporario = f'{caminho}.{os.getpid()}.tmp'
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+
+def _gravar_metadados(caminho_meta, metadados):
+    def escrever(destino):
+        with open(destino, 'w', encoding='utf-8') as arquivo:
+            json.dump(metadados, arquivo)
+    gravar_atomico(caminho_meta, escrever)
+
+
+def _ler_snapshot_valido(caminho_parquet, metadados, colunas):
+    """
+    Lê o snapshot Parquet se os metadados indicarem as mesmas colunas.
+    Retorna None se o snapshot não puder ser usado.
+    """
+    if metadados is None or metadados.get('colunas') != colunas \
+            or not os.path.exists(caminho_parquet):
+        return None
+    try:
+        return pd.read_parquet(caminho_parquet)
+    except Exception as e:
+        logger.warning(f"Snapshot '{caminho_parquet}' ilegível: {e}")
+        return None
+
+
+@rastreado('ler_abas')
+def ler_abas(caminho_arquivo, abas=ABAS_PLANILHA):
+    """
+    Lê as abas da planilha, abrindo o arquivo Excel no máximo uma vez.
+
+    Cada aba é servida pelo seu snapshot Parquet enquanto o mtime e o tamanho
+    do arquivo forem os mesmos. Se o mtime mudou mas o conteúdo (hash) é o
+    mesmo, o snapshot continua válido e apenas os metadados são atualizados.
+    As abas sem snapshot válido são lidas numa única abertura do Excel, só
+    com as colunas pedidas, e os seus snapshots são regravados.
+
+    Retorna um dicionário {nome da aba: DataFrame}.
+    """
+    info = os.stat(caminho_arquivo)  # Levanta FileNotFoundError se não existir
+    resultado = {}
+    pendentes = {}
+    conteudo_hash = None
+
+    for aba, colunas in abas.items():
+        caminho_parquet, caminho_meta = _caminhos_snapshot(caminho_arquivo, aba)
+        metadados = _ler_metadados(caminho_meta)
+        if metadados is not None and metadados.get('mtime_ns') == info.st_mtime_ns \
+                and metadados.get('tamanho') == info.st_size:
+            df = _ler_snapshot_valido(caminho_parquet, metadados, colunas)
+            if df is not None:
+                resultado[aba] = df
+                continue
+
+        if conteudo_hash is None:
+            conteudo_hash = hash_arquivo(caminho_arquivo)
+        if metadados is not None and metadados.get('hash') == conteudo_hash:
+            df = _ler_snapshot_valido(caminho_parquet, metadados, colunas)
+            if df is not None:
+                metadados.update(mtime_ns=info.st_mtime_ns, tamanho=info.st_size)
+                _gravar_metadados(caminho_meta, metadados)
+                resultado[aba] = df
+                continue
+
+        pendentes[aba] = colunas
+
+    if not pendentes:
+        return resultado
+
+    # Uma única abertura do arquivo para todas as abas pendentes
+    with pd.ExcelFile(caminho_arquivo) as planilha:
+        for aba, colunas in pendentes.items():
+            resultado[aba] = planilha.parse(aba, usecols=colunas)
+
+    try:
+        os.makedirs(DIRETORIO_SNAPSHOT, exist_ok=True)
+        for aba, colunas in pendentes.items():
+            caminho_parquet, caminho_meta = _caminhos_snapshot(
+                caminho_arquivo, aba)
+            df = resultado[aba]
+            gravar_atomico(caminho_parquet,
+                           lambda destino: df.to_parquet(destino, index=False))
+            _gravar_metadados(caminho_meta, {
+                'arquivo': os.path.abspath(caminho_arquivo),
+                'aba': aba,
+                'colunas': colunas,
+                'mtime_ns': info.st_mtime_ns,
+                'tamanho': info.st_size,
+                'hash': conteudo_hash,
+            })
+    except Exception as e:
+        # Sem pyarrow ou com colunas de tipos mistos o snapshot não é gravado,
+        # mas os dados lidos do Excel continuam válidos.
+        logger.warning(f"Não foi possível gravar o snapshot da planilha: {e}")
+
+    return resultado
+
+
+def _snapshots_atualizados(caminho_arquivo, abas=ABAS_PLANILHA):
+    """
+    Indica se todas as abas têm snapshot com o mtime, o tamanho e as colunas
+    atuais da planilha, ou seja, se ler_abas não vai abrir o Excel.
+    Levanta FileNotFoundError se a planilha não existir.
+    """
+    info = os.stat(caminho_arquivo)
+    for aba, colunas in abas.items():
+        caminho_parquet, caminho_meta = _caminhos_snapshot(caminho_arquivo, aba)
+        metadados = _ler_metadados(caminho_meta)
+        if metadados is None or metadados.get('mtime_ns') != info.st_mtime_ns \
+                or metadados.get('tamanho') != info.st_size \
+                or metadados.get('colunas') != colunas \
+                or not os.path.exists(caminho_parquet):
+            return False
+    return True
+
+
+def preparar_snapshots(caminho_arquivo, abas=ABAS_PLANILHA):
+    """
+    Garante que os snapshots Parquet das abas estejam atualizados, sem
+    carregar os dados quando já estão (a leitura fica para quem consulta os
+    arquivos, como o motor DuckDB). Retorna {nome da aba: caminho Parquet}.
+    Levanta FileNotFoundError se a planilha não existir e OSError se os
+    snapshots não puderem ser gravados.
+    """
+    if not _snapshots_atualizados(caminho_arquivo, abas):
+        # ler_abas valida pelo hash e regrava os snapshots desatualizados
+        ler_abas(caminho_arquivo, abas)
+
+    caminhos = {aba: _caminhos_snapshot(caminho_arquivo, aba) for aba in abas}
+    for caminho_parquet, caminho_meta in caminhos.values():
+        if not os.path.exists(caminho_parquet):
+            raise OSError(f"Snapshot '{caminho_parquet}' não disponível (o pyarrow está instalado?)")
+    return {aba: caminho_parquet for aba, (caminho_parquet, _) in caminhos.items()}
+
+
+def _linhas_mantidas(df, arquivo, chave=None):
+    """
+    Máscara das linhas de 'df' (abas de vários arquivos concatenadas, com o
+    índice do arquivo de cada linha em 'arquivo') que ficam depois da
+    deduplicação entre arquivos. Com 'chave' (tupla de colunas), cada valor
+    da chave fica só com as linhas do último arquivo em que aparece; as
+    linhas com a chave incompleta (ou sem alguma das colunas) ficam só no
+    primeiro arquivo em que uma linha idêntica aparece. Repetições dentro de
+    um mesmo arquivo são mantidas.
+    """
+    arquivo = pd.Series(arquivo)
+    identidade = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    mantidas = (arquivo == arquivo.groupby(identidade).transform('min')).to_numpy()
+    if chave is not None and all(coluna in df.columns for coluna in chave):
+        colunas = df[list(chave)]
+        com_chave = colunas.notna().all(axis=1).to_numpy()
+        valores = pd.util.hash_pandas_object(colunas, index=False).to_numpy()
+        ultimo = arquivo.groupby(valores).transform('max').to_numpy()
+        mantidas = np.where(com_chave, arquivo.to_numpy() == ultimo, mantidas)
+    return mantidas
+
+
+@rastreado('combinar_abas')
+def combinar_abas(abas_por_arquivo):
+    """
+    Junta as abas lidas de vários arquivos (na ordem dos arquivos) numa
+    única tabela por aba, descartando os registros repetidos entre arquivos
+    conforme CHAVES_DEDUPLICACAO. Retorna {nome da aba: DataFrame}.
+    """
+    resultado = {}
+    for aba in abas_por_arquivo[0]:
+        partes = [abas[aba] for abas in abas_por_arquivo]
+        arquivo = np.repeat(np.arange(len(partes)), [len(parte) for parte in partes])
+        # Partes vazias não definem os tipos das colunas no concat
+        nao_vazias = [parte for parte in partes if not parte.empty] or partes[:1]
+        df = pd.concat(nao_vazias, ignore_index=True)
+        mantidas = _linhas_mantidas(df, arquivo, CHAVES_DEDUPLICACAO.get(aba))
+        resultado[aba] = df[mantidas].reset_index(drop=True)
+        descartadas = len(df) - int(mantidas.sum())
+        if descartadas:
+            logger.info(f"Aba '{aba}': {descartadas} linhas repetidas entre arquivos descartadas")
+    return resultado
+
+
+@rastreado('ler_origem')
+def ler_origem(origem, abas=ABAS_PLANILHA, processos=None):
+    """
+    Lê as abas de uma origem de dados (um arquivo, um diretório ou um padrão
+    glob; ver listar_planilhas) e as combina por combinar_abas.
+
+    Os arquivos com snapshot atualizado são lidos aqui mesmo (a leitura do
+    Parquet é rápida); os que precisam abrir o Excel são lidos em paralelo,
+    um por processo, então o tempo fica próximo ao do maior arquivo e não ao
+    da soma deles. Retorna {nome da aba: DataFrame}, como ler_abas.
+    """
+    caminhos = listar_planilhas(origem)
+    if len(caminhos) == 1:
+        return ler_abas(caminhos[0], abas)
+
+    pendentes = [caminho for caminho in caminhos
+                 if not _snapshots_atualizados(caminho, abas)]
+    processos = min(len(pendentes), processos or os.cpu_count() or 1)
+    lidas = {}
+    if processos > 1:
+        # 'spawn' porque o fork de um processo com threads (servidor do
+        # Streamlit, atualizador) não é seguro; é também o padrão no Windows
+        contexto = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(processos, mp_context=contexto) as executor:
+            lidas = dict(zip(pendentes, executor.map(ler_abas, pendentes, repeat(abas))))
+    abas_por_arquivo = [lidas[caminho] if caminho in lidas else ler_abas(caminho, abas)
+                        for caminho in caminhos]
+    return combinar_abas(abas_por_arquivo)
+
+
+def memoria_mb(df):
+    """
+    Memória ocupada pelo DataFrame em MB, incluindo o conteúdo dos textos.
+    """
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+# Valores simples, contados pelo tamanho sem controle de repetição
+_TIPOS_SIMPLES = (str, bytes, int, float, bool, type(None), np.generic)
+_TIPOS_SIMPLES_EXATOS = frozenset(_TIPOS_SIMPLES[:-1])
+
+
+def _bytes_itens(itens, vistos):
+    # Valores simples, tuplas de valores simples e visões de um array já
+    # contado são medidos direto, sem uma chamada por item
+    total = 0
+    for item in itens:
+        tipo = type(item)
+        if tipo in _TIPOS_SIMPLES_EXATOS:
+            total += sys.getsizeof(item)
+        elif tipo is tuple and _TIPOS_SIMPLES_EXATOS.issuperset(map(type, item)):
+            total += sys.getsizeof(item) + sum(map(sys.getsizeof, item))
+        elif tipo is np.ndarray and id(item.base) in vistos:
+            total += sys.getsizeof(item)
+        else:
+            total += _bytes_estrutura(item, vistos)
+    return total
+
+
+def _bytes_estrutura(objeto, vistos):
+    if isinstance(objeto, _TIPOS_SIMPLES):
+        return sys.getsizeof(objeto)
+    if id(objeto) in vistos:
+        return 0
+    vistos.add(id(objeto))
+    if isinstance(objeto, pd.DataFrame):
+        return int(objeto.memory_usage(deep=True).sum())
+    if isinstance(objeto, (pd.Series, pd.Index, pd.Categorical)):
+        return int(objeto.memory_usage(deep=True))
+    if isinstance(objeto, np.ndarray):
+        # Uma visão é contada pelo cabeçalho e pelo array de onde vem, este
+        # uma única vez
+        if isinstance(objeto.base, np.ndarray):
+            return sys.getsizeof(objeto) + _bytes_estrutura(objeto.base, vistos)
+        tamanho = objeto.nbytes
+        if objeto.dtype == object:
+            tamanho += sum(map(sys.getsizeof, objeto.ravel()))
+        return tamanho
+    tamanho = sys.getsizeof(objeto)
+    if isinstance(objeto, dict):
+        return tamanho + _bytes_itens(objeto.keys(), vistos) + _bytes_itens(objeto.values(), vistos)
+    if isinstance(objeto, (list, tuple, set, frozenset)):
+        return tamanho + _bytes_itens(objeto, vistos)
+    if hasattr(objeto, '__dict__') and not callable(objeto):
+        return tamanho + _bytes_estrutura(vars(objeto), vistos)
+    return tamanho
+
+
+def memoria_estrutura_mb(*objetos):
+    """
+    Memória estimada em MB de tudo o que é alcançável pelos objetos:
+    DataFrames (como memoria_mb), arrays numpy, listas, dicionários e os
+    atributos das classes, cada objeto contado uma única vez. Conexões e
+    outros objetos externos entram só pelo tamanho do objeto Python.
+    """
+    vistos = set()
+    return sum(_bytes_estrutura(objeto, vistos) for objeto in objetos) / (1024 * 1024)
+
+
+def eh_coluna_moeda(coluna):
+    """
+    Indica se a coluna guarda um valor monetário.
+    """
+    return str(coluna).startswith('vl_') or coluna in COLUNAS_MOEDA_DERIVADAS
+
+
+def converter_para_centavos(df):
+    """
+    Converte as colunas monetárias da planilha para int64 em centavos
+    (alterando o DataFrame no lugar). Valores nulos viram 0.
+    """
+    for coluna in df.columns:
+        if eh_coluna_moeda(coluna):
+            valores = pd.to_numeric(df[coluna], errors='coerce').fillna(0)
+            df[coluna] = np.rint(valores.to_numpy(dtype='float64') * 100).astype(np.int64)
+    return df
+
+
+def converter_datas(df, colunas=COLUNAS_DATA):
+    """
+    Converte as colunas de data para datetime64 (valores inválidos viram NaT).
+    """
+    for coluna in colunas:
+        if coluna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[coluna]):
+            df[coluna] = pd.to_datetime(df[coluna], errors='coerce')
+    return df
+
+
+@rastreado('compactar_tipos')
+def compactar_tipos(df, colunas_categoria=COLUNAS_CATEGORIA):
+    """
+    Aplica o esquema compacto ao DataFrame (alterando-o no lugar): colunas
+    de dimensão e textos de baixa cardinalidade viram 'category' e colunas
+    inteiras são reduzidas ao menor tipo inteiro que comporta os valores.
+    """
+    for coluna in df.columns:
+        serie = df[coluna]
+        if eh_coluna_moeda(coluna):
+            # Valores em centavos continuam int64, para as somas não estourarem
+            continue
+        if pd.api.types.is_integer_dtype(serie):
+            df[coluna] = pd.to_numeric(serie, downcast='integer')
+        elif serie.dtype == object:
+            if coluna in colunas_categoria or (
+                    len(serie) and serie.nunique(dropna=False) / len(serie) <= LIMITE_CARDINALIDADE_CATEGORIA):
+                df[coluna] = serie.astype('category')
+    return df
+
+
+def _preencher_nulos(df):
+    """
+    Preenche valores NaN com 0, exceto nas colunas de data (que ficam NaT,
+    para continuarem datetime64).
+    """
+    valores = {coluna: 0 for coluna in df.columns
+               if not pd.api.types.is_datetime64_any_dtype(df[coluna])}
+    return df.fillna(valores)
+
+
+@rastreado('calcular_total_sinistro')
+def calcular_total_sinistro(aba_sinistro, componente_nulo=None):
+    """
+    Acrescenta a coluna 'Total Sinistro' (sinistro + despesa + honorário -
+    salvado) à aba de sinistro. Com valores em centavos, 'componente_nulo'
+    indica as linhas que tinham algum componente nulo antes da conversão,
+    cujo total fica 0 (como o NaN do cálculo em float, que a soma ignora).
+    """
+    aba_sinistro['Total Sinistro'] = aba_sinistro['vl_sinistro_total'] + aba_sinistro['vl_despesa_total'] + \
+        aba_sinistro['vl_honorario_total'] - \
+        aba_sinistro['vl_salvado_total']
+    if componente_nulo is not None:
+        aba_sinistro.loc[componente_nulo, 'Total Sinistro'] = 0
+    return aba_sinistro
+
+
+def _preparar_abas(aba_apolice_endosso, aba_sinistro, em_centavos=False):
+    """
+    Converte os valores para centavos (se pedido) e calcula o 'Total
+    Sinistro' de cada linha, alterando as abas no lugar.
+    """
+    componente_nulo = None
+    if em_centavos:
+        # Sinistros com algum componente nulo têm 'Total Sinistro' nulo no
+        # cálculo em float (e somam 0); a mesma regra é mantida nos inteiros.
+        componente_nulo = aba_sinistro[COMPONENTES_TOTAL_SINISTRO].isna().any(axis=1)
+        converter_para_centavos(aba_apolice_endosso)
+        converter_para_centavos(aba_sinistro)
+    calcular_total_sinistro(aba_sinistro, componente_nulo)
+
+
+def _agregar_por_apolice(aba_apolice_endosso, aba_sinistro, em_centavos=False):
+    """
+    Agregado de prêmio e sinistro por apólice a partir das abas preparadas,
+    ordenado pelo número da apólice.
+    """
+    # Fazer a soma dos prêmios agrupado por apólice:
+    soma_por_apolice = aba_apolice_endosso.groupby(
+        'cd_apolice')['vl_tarifario_pago'].sum().reset_index()
+    soma_por_apolice.rename(columns={
+                            'cd_apolice': 'N° Apólice', 'vl_tarifario_pago': 'Soma Prêmio Pago por Apolice'}, inplace=True)
+
+    # Dados adicionais das apólices, eliminando duplicatas por 'cd_apolice'
+    colunas_adicionais = [
+        coluna for coluna in COLUNAS_APOLICE_ENDOSSO if coluna != 'vl_tarifario_pago']
+    dados_adicionais = aba_apolice_endosso[colunas_adicionais].drop_duplicates(
+        subset='cd_apolice')
+    dados_adicionais.rename(
+        columns={'cd_apolice': 'N° Apólice'}, inplace=True)
+
+    # Merge dos dados de prêmio com os dados adicionais
+    premio_com_dados = pd.merge(
+        soma_por_apolice, dados_adicionais, on='N° Apólice', how='left')
+
+    # Soma dos sinistros por apólice (antes do fillna, para que linhas sem
+    # 'cd_apolice' não virem uma apólice 0):
+    soma_sinistro_por_apolice = aba_sinistro.groupby(
+        'cd_apolice')['Total Sinistro'].sum().reset_index()
+    soma_sinistro_por_apolice.rename(columns={
+                                     'cd_apolice': 'N° Apólice', 'Total Sinistro': 'Soma Sinistro Por Apolice'}, inplace=True)
+
+    # Merge dos resultados finais e preenchimento de NaN com 0
+    resultado_final = _preencher_nulos(pd.merge(
+        premio_com_dados,
+        soma_sinistro_por_apolice,
+        on='N° Apólice',
+        how='outer'
+    ))
+
+    if em_centavos:
+        # O merge 'outer' transforma as somas em float por causa dos NaN
+        colunas_soma = ['Soma Prêmio Pago por Apolice', 'Soma Sinistro Por Apolice']
+        resultado_final[colunas_soma] = resultado_final[colunas_soma].astype(np.int64)
+
+    return resultado_final
+
+
+def _base_sinistros(aba_sinistro):
+    """
+    Base de sinistros exibida, reaproveitando o mesmo DataFrame em memória.
+    """
+    aba_sinistro.reset_index(drop=True, inplace=True)
+    aba_sinistro.rename(columns={'cd_apolice': 'N° Apólice'}, inplace=True)
+    return _preencher_nulos(aba_sinistro)
+
+
+@rastreado('processar_abas')
+def processar_abas(aba_apolice_endosso, aba_sinistro, em_centavos=False):
+    """
+    Deriva, a partir das abas já em memória, os dois conjuntos de dados do
+    dashboard: o agregado de prêmio e sinistro por apólice e a base de
+    sinistros. O 'Total Sinistro' é calculado uma única vez.
+
+    Com em_centavos=True os valores monetários são convertidos para int64
+    em centavos antes de qualquer soma, e todos os totais ficam inteiros.
+
+    Retorna a tupla (resultado_final, dados_de_sinistro).
+    """
+    _preparar_abas(aba_apolice_endosso, aba_sinistro, em_centavos)
+    resultado_final = _agregar_por_apolice(
+        aba_apolice_endosso, aba_sinistro, em_centavos)
+    return resultado_final, _base_sinistros(aba_sinistro)
+
+
+# Estado guardado entre as cargas incrementais: o hash e a apólice de cada
+# linha das duas abas, na ordem da planilha, e o agregado por apólice.
+EstadoIncremental = namedtuple('EstadoIncremental', [
+    'hashes_endosso', 'apolices_endosso', 'hashes_sinistro',
+    'apolices_sinistro', 'resultado_final'])
+
+
+def _hash_linhas(df, colunas):
+    return pd.util.hash_pandas_object(df[colunas], index=False).to_numpy()
+
+
+def _hash_endossos(aba_apolice_endosso):
+    """
+    Hash de cada linha de endosso considerando só o que afeta o agregado:
+    apólice e prêmio em todas as linhas e os dados adicionais apenas na
+    primeira linha de cada apólice (a única usada). Evita o hash dos textos
+    das demais linhas, que é a parte cara.
+    """
+    hashes = _hash_linhas(aba_apolice_endosso, ['cd_apolice', 'vl_tarifario_pago'])
+    primeiras = np.flatnonzero(~aba_apolice_endosso['cd_apolice'].duplicated().to_numpy())
+    hashes[primeiras] ^= _hash_linhas(aba_apolice_endosso.iloc[primeiras], COLUNAS_APOLICE_ENDOSSO)
+    return hashes
+
+
+def _apolices_alteradas(hashes, apolices, hashes_anteriores, apolices_anteriores):
+    """
+    Apólices (com repetições) que têm linhas novas ou alteradas em relação à
+    carga anterior, cujo tamanho é a marca d'água: as linhas até ela são
+    comparadas posição a posição pelo hash e as linhas depois dela são
+    novas. Uma linha alterada marca a apólice antiga e a nova. Retorna None
+    se a aba ficou menor.
+    """
+    quantidade = len(hashes_anteriores)
+    if len(hashes) < quantidade:
+        return None
+    alteradas = np.flatnonzero(hashes[:quantidade] != hashes_anteriores)
+    return np.concatenate([
+        apolices[alteradas], apolices_anteriores[alteradas], apolices[quantidade:]])
+
+
+@rastreado('processar_abas_incremental')
+def processar_abas_incremental(aba_apolice_endosso, aba_sinistro, estado=None,
+                               em_centavos=False):
+    """
+    Versão incremental de processar_abas. Com o estado da carga anterior,
+    só as apólices com linhas novas ou alteradas (em qualquer das abas) são
+    reagregadas; as demais linhas do agregado são reaproveitadas. Cada
+    apólice recalculada usa as mesmas linhas, na mesma ordem, de uma carga
+    completa, então o resultado é idêntico ao de processar_abas.
+
+    Sem estado, com linhas removidas ou com alterações demais, faz a carga
+    completa. Retorna a tupla (resultado_final, dados_de_sinistro, estado).
+    """
+    hashes_endosso = _hash_endossos(aba_apolice_endosso)
+    # Da aba de sinistro só a apólice e os componentes do total afetam o agregado
+    hashes_sinistro = _hash_linhas(aba_sinistro, ['cd_apolice'] + COMPONENTES_TOTAL_SINISTRO)
+    apolices_endosso = aba_apolice_endosso['cd_apolice'].to_numpy()
+    apolices_sinistro = aba_sinistro['cd_apolice'].to_numpy()
+
+    alteradas = None
+    if estado is not None:
+        endosso = _apolices_alteradas(hashes_endosso, apolices_endosso,
+                                      estado.hashes_endosso, estado.apolices_endosso)
+        sinistro = _apolices_alteradas(hashes_sinistro, apolices_sinistro,
+                                       estado.hashes_sinistro, estado.apolices_sinistro)
+        if endosso is not None and sinistro is not None:
+            alteradas = pd.unique(pd.Series(np.concatenate([endosso, sinistro])).dropna())
+
+    _preparar_abas(aba_apolice_endosso, aba_sinistro, em_centavos)
+
+    if alteradas is not None:
+        linhas_endosso = aba_apolice_endosso['cd_apolice'].isin(alteradas)
+        linhas_sinistro = aba_sinistro['cd_apolice'].isin(alteradas)
+        total = len(aba_apolice_endosso) + len(aba_sinistro)
+        if linhas_endosso.sum() + linhas_sinistro.sum() > LIMITE_RECALCULO_PARCIAL * total:
+            alteradas = None
+
+    if alteradas is None:
+        resultado_final = _agregar_por_apolice(
+            aba_apolice_endosso, aba_sinistro, em_centavos)
+    else:
+        logger.info(f"Carga incremental: {len(alteradas)} apólices recalculadas")
+        parcial = _agregar_por_apolice(
+            aba_apolice_endosso[linhas_endosso], aba_sinistro[linhas_sinistro], em_centavos)
+        anterior = estado.resultado_final
+        mantidas = anterior[~anterior['N° Apólice'].isin(alteradas)]
+        partes = [df for df in (mantidas, parcial) if not df.empty] or [parcial]
+        resultado_final = pd.concat(partes, ignore_index=True).sort_values(
+            'N° Apólice', ignore_index=True)
+
+    novo_estado = EstadoIncremental(
+        hashes_endosso, apolices_endosso, hashes_sinistro, apolices_sinistro,
+        resultado_final)
+    return resultado_final, _base_sinistros(aba_sinistro), novo_estado
+
+
+def _compactar_resultados(resultado_final, dados_de_sinistro):
+    """
+    Esquema compacto, com o relatório de memória antes e depois (no log e
+    em relatorio_memoria).
+    """
+    for nome, df in (('apólices', resultado_final), ('sinistros', dados_de_sinistro)):
+        antes = memoria_mb(df)
+        compactar_tipos(df)
+        depois = memoria_mb(df)
+        relatorio_memoria[nome] = (antes, depois)
+        logger.info(f"Memória dos dados de {nome}: {antes:.1f} MB -> {depois:.1f} MB")
+
+
+def carregar_planilha(caminho_arquivo, em_centavos=MOEDA_EM_CENTAVOS):
+    """
+    Estágio único de carregamento: lê as abas da planilha numa só passada e
+    deriva o agregado por apólice e a base de sinistros. 'caminho_arquivo'
+    também pode ser um diretório ou um padrão glob de planilhas (ver
+    ler_origem).
+    """
+    abas = ler_origem(caminho_arquivo)
+    aba_apolice_endosso = converter_datas(abas.pop('apolice_endosso'))
+    resultado_final, dados_de_sinistro = processar_abas(
+        aba_apolice_endosso, abas.pop('sinistro'), em_centavos)
+    _compactar_resultados(resultado_final, dados_de_sinistro)
+    return resultado_final, dados_de_sinistro
+
+
+def carregar_planilha_incremental(caminho_arquivo, estado=None,
+                                  em_centavos=MOEDA_EM_CENTAVOS):
+    """
+    Como carregar_planilha, mas reaproveitando o agregado por apólice da
+    carga anterior (ver processar_abas_incremental). A leitura das abas
+    continua completa; o que passa a depender só das linhas novas ou
+    alteradas é a agregação por apólice.
+    Retorna a tupla (resultado_final, dados_de_sinistro, estado).
+    """
+    abas = ler_origem(caminho_arquivo)
+    aba_apolice_endosso = converter_datas(abas.pop('apolice_endosso'))
+    resultado_final, dados_de_sinistro, estado = processar_abas_incremental(
+        aba_apolice_endosso, abas.pop('sinistro'), estado, em_centavos)
+    # O estado guarda o mesmo DataFrame, já compactado, para a próxima carga
+    _compactar_resultados(resultado_final, dados_de_sinistro)
+    return resultado_final, dados_de_sinistro, estado
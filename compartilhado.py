@@ -0,0 +1,106 @@
+"""
+Dados processados compartilhados entre processos (DASHBOARD_COMPARTILHADO=1).
+
+Com vários servidores Streamlit atrás de um balanceador na mesma máquina,
+cada processo guardaria a sua cópia dos dados de exibição e da base de
+sinistros. Neste modo o primeiro processo que carrega uma versão da
+planilha publica esses dois DataFrames como arquivos Arrow IPC (Feather v2,
+sem compressão) no diretório de snapshots, e todos os processos, inclusive
+ele, passam a mapear os arquivos em memória, somente leitura.
+
+As colunas numéricas e de data sem nulos viram arrays que apontam direto
+para as páginas do arquivo, mantidas uma única vez na page cache do
+sistema operacional para todos os processos e sessões; só as colunas de
+texto e de categoria são materializadas em cada processo. Os arquivos são
+nomeados pela assinatura da planilha, então uma versão nova é publicada ao
+lado da anterior, que continua válida para quem ainda a mapeia.
+
+As demais estruturas da versão (índices, hierarquia dos filtros, cubo,
+índice de busca, séries e triângulos) continuam sendo montadas em cada
+processo a partir dos dados mapeados.
+"""
+import glob
+import hashlib
+import logging
+import os
+
+from agregacoes import preparar_exibicao
+from carregamento import (DIRETORIO_SNAPSHOT, MOEDA_EM_CENTAVOS, carregar_planilha,
+                          gravar_atomico)
+from instrumentacao import rastreado
+
+# Com DASHBOARD_COMPARTILHADO=1 os dados processados são publicados e
+# mapeados em memória a partir de arquivos Arrow
+DADOS_COMPARTILHADOS = os.environ.get('DASHBOARD_COMPARTILHADO', '0') == '1'
+
+# DataFrames publicados de cada versão, na ordem devolvida
+TABELAS_COMPARTILHADAS = ('exibicao', 'sinistros')
+
+
+def _prefixo(origem, em_centavos):
+    chave = hashlib.sha1(os.path.abspath(origem).encode('utf-8')).hexdigest()[:16]
+    unidade = 'centavos' if em_centavos else 'reais'
+    return os.path.join(DIRETORIO_SNAPSHOT, f'{chave}_compartilhado_{unidade}')
+
+
+def _caminhos_versao(origem, assinatura, em_centavos):
+    """
+    Caminhos dos arquivos Arrow de uma versão: o nome combina a origem, a
+    unidade monetária e a assinatura da planilha.
+    """
+    versao = hashlib.sha1(repr(assinatura).encode('utf-8')).hexdigest()[:16]
+    return {nome: f'{_prefixo(origem, em_centavos)}_{versao}_{nome}.arrow'
+            for nome in TABELAS_COMPARTILHADAS}
+
+
+def publicar(tabelas, caminhos):
+    """
+    Grava cada DataFrame no seu arquivo Arrow, de forma atômica: os outros
+    processos nunca mapeiam um arquivo pela metade.
+    """
+    import pyarrow.feather as feather
+
+    os.makedirs(DIRETORIO_SNAPSHOT, exist_ok=True)
+    for nome, df in tabelas.items():
+        gravar_atomico(caminhos[nome], lambda destino, df=df: feather.write_feather(
+            df, destino, compression='uncompressed'))
+
+
+def mapear(caminho):
+    """
+    DataFrame lido de um arquivo Arrow mapeado em memória. Com split_blocks
+    cada coluna vira um bloco próprio e as colunas sem conversão apontam
+    para o mapeamento em vez de serem copiadas.
+    """
+    import pyarrow as pa
+
+    tabela = pa.ipc.open_file(pa.memory_map(caminho, 'r')).read_all()
+    return tabela.to_pandas(split_blocks=True)
+
+
+def _remover_versoes_antigas(origem, em_centavos, caminhos):
+    atuais = set(caminhos.values())
+    for caminho in glob.glob(f'{glob.escape(_prefixo(origem, em_centavos))}_*.arrow'):
+        if caminho in atuais:
+            continue
+        try:
+            # No Linux o mapeamento de quem ainda usa o arquivo continua válido
+            os.remove(caminho)
+        except OSError as e:
+            logging.info(f"Versão compartilhada '{caminho}' mantida: {e}")
+
+
+@rastreado('carregar_compartilhado')
+def carregar_compartilhado(origem, assinatura, em_centavos=MOEDA_EM_CENTAVOS):
+    """
+    Dados de exibição e base de sinistros de uma versão da planilha,
+    mapeados dos arquivos Arrow. Se a versão ainda não foi publicada por
+    nenhum processo, carrega a planilha e publica antes de mapear.
+    """
+    caminhos = _caminhos_versao(origem, assinatura, em_centavos)
+    if not all(os.path.exists(caminho) for caminho in caminhos.values()):
+        dados_calculados, df_sinistros = carregar_planilha(origem, em_centavos)
+        publicar({'exibicao': preparar_exibicao(dados_calculados),
+                  'sinistros': df_sinistros}, caminhos)
+        _remover_versoes_antigas(origem, em_centavos, caminhos)
+    return tuple(mapear(caminhos[nome]) for nome in TABELAS_COMPARTILHADAS)
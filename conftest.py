@@ -0,0 +1,83 @@
+import pytest
+
+from agregacoes import preparar_exibicao
+from carregamento import ABAS_PLANILHA, compactar_tipos, converter_datas, processar_abas
+from dados_sinteticos import gerar_dados
+
+
+@pytest.fixture(scope='session')
+def _abas_sinteticas():
+    aba_apolice_endosso, aba_sinistro = gerar_dados(3_000, semente=3)
+    # A planilha real chega com textos (object), não com 'category'
+    for df in (aba_apolice_endosso, aba_sinistro):
+        for coluna in df.select_dtypes('category').columns:
+            df[coluna] = df[coluna].astype(object)
+    return aba_apolice_endosso, aba_sinistro
+
+
+@pytest.fixture
+def abas(_abas_sinteticas):
+    """
+    Abas sintéticas (apolice_endosso, sinistro) como lidas da planilha,
+    copiadas a cada teste (o processamento altera as abas no lugar).
+    """
+    return tuple(df.copy() for df in _abas_sinteticas)
+
+
+def _carregar(abas_sinteticas, em_centavos):
+    aba_apolice_endosso, aba_sinistro = (df.copy() for df in abas_sinteticas)
+    resultado_final, df_sinistros = processar_abas(
+        converter_datas(aba_apolice_endosso), aba_sinistro, em_centavos)
+    compactar_tipos(resultado_final)
+    compactar_tipos(df_sinistros)
+    return preparar_exibicao(resultado_final), df_sinistros
+
+
+@pytest.fixture(scope='session')
+def dados(_abas_sinteticas):
+    """
+    Dados de exibição e base de sinistros, como carregados pelo dashboard.
+    Não devem ser alterados pelos testes.
+    """
+    return _carregar(_abas_sinteticas, em_centavos=False)
+
+
+@pytest.fixture(scope='session')
+def dados_centavos(_abas_sinteticas):
+    """
+    Como 'dados', com os valores monetários em centavos (int64).
+    """
+    return _carregar(_abas_sinteticas, em_centavos=True)
+
+
+@pytest.fixture(scope='session')
+def criar_motor(tmp_path_factory):
+    """
+    Cria um MotorDuckDB sobre abas (apolice_endosso, sinistro) gravadas em
+    Parquet: criar_motor(abas, em_centavos). Pulado sem o pacote duckdb.
+    """
+    duckdb = pytest.importorskip('duckdb')
+    import motor_duckdb
+
+    def criar(abas, em_centavos=False):
+        diretorio = tmp_path_factory.mktemp('snapshots')
+        caminhos = {}
+        for aba, df in zip(ABAS_PLANILHA, abas):
+            caminhos[aba] = str(diretorio / f'{aba}.parquet')
+            df.to_parquet(caminhos[aba], index=False)
+        return motor_duckdb.MotorDuckDB(caminhos, em_centavos)
+
+    with pytest.MonkeyPatch.context() as patch:
+        # O módulo só importa o pacote com DASHBOARD_MOTOR=duckdb
+        patch.setattr(motor_duckdb, 'duckdb', duckdb)
+        yield criar
+
+
+@pytest.fixture(scope='session')
+def motores(_abas_sinteticas, criar_motor):
+    """
+    Motores DuckDB sobre as abas sintéticas, em reais e em centavos
+    ({em_centavos: MotorDuckDB}).
+    """
+    return {em_centavos: criar_motor(_abas_sinteticas, em_centavos)
+            for em_centavos in (False, True)}
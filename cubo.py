@@ -0,0 +1,118 @@
+"""
+Cubo de prêmio e sinistro pré-agregado por dimensão das apólices.
+
+Montado uma única vez por carga de dados: cada dimensão é codificada em
+inteiros e as apólices são somadas por combinação de valores de todas as
+dimensões (uma célula por combinação presente na base). Qualquer quebra,
+detalhamento ou filtro sobre essas dimensões é respondido agrupando as
+células, cuja quantidade depende da variedade das dimensões e não do
+número de linhas: novas quebras não aumentam o custo de cada rerun.
+"""
+import numpy as np
+import pandas as pd
+
+from formatacao import calcular_percentual
+from instrumentacao import rastreado
+
+# Dimensões do cubo (coluna dos dados por apólice -> rótulo exibido)
+DIMENSOES_CUBO = {
+    'nm_auto_utilizacao': 'Utilização',
+    'nm_regiao_circulacao': 'Região de Circulação',
+    'nm_uf_cliente': 'UF',
+    'nm_produto': 'Produto',
+    'nm_tp_apolice': 'Tipo de Apólice',
+    'nm_tp_cobranca': 'Tipo de Cobrança',
+    'nm_corretor': 'Corretor',
+    'nm_representante': 'Representante',
+}
+
+# Medidas somadas em cada célula (coluna dos dados por apólice -> medida)
+MEDIDAS_CUBO = {
+    'Soma Prêmio Pago por Apolice': 'Total_Premio',
+    'Soma Sinistro Por Apolice': 'Total_Sinistro',
+}
+
+
+class CuboSinistralidade:
+    """
+    Prêmio, sinistro e quantidade de apólices somados por combinação das
+    dimensões presentes nos dados por apólice.
+
+    Cada dimensão guarda os valores ordenados e cada célula o código (posição
+    nessa lista) de cada dimensão, com -1 para valor nulo. Como no groupby,
+    as células com valor nulo numa dimensão da quebra ficam fora dela.
+    """
+
+    def __init__(self, dados_apolices, dimensoes=DIMENSOES_CUBO):
+        self.dimensoes = [d for d in dimensoes if d in dados_apolices.columns]
+        self._valores = {}
+        self._textos = {}
+        codigos = {}
+        for dimensao in self.dimensoes:
+            codigos[dimensao], valores = pd.factorize(dados_apolices[dimensao], sort=True)
+            self._valores[dimensao] = np.asarray(valores, dtype=object)
+            # Os filtros comparam os valores como texto, como a hierarquia
+            self._textos[dimensao] = np.array([str(valor) for valor in valores] + ['nan'])
+
+        celulas = pd.DataFrame(codigos)
+        for coluna, medida in MEDIDAS_CUBO.items():
+            celulas[medida] = dados_apolices[coluna].to_numpy()
+        celulas['Qtd Apólices'] = 1
+        celulas = celulas.groupby(self.dimensoes, sort=False).sum()
+        # Códigos e medidas das células como arrays, para as consultas em numpy
+        indice = celulas.index.to_frame(index=False)
+        self._codigos = {d: indice[d].to_numpy() for d in self.dimensoes}
+        self._medidas = {m: celulas[m].to_numpy() for m in celulas.columns}
+
+    def __len__(self):
+        return len(self._medidas['Qtd Apólices'])
+
+    def _mascara(self, filtros):
+        mascara = np.ones(len(self), dtype=bool)
+        for dimensao, selecionados in (filtros or {}).items():
+            if not selecionados:
+                continue
+            # O código -1 (nulo) indexa o último texto, 'nan'
+            textos = self._textos[dimensao][self._codigos[dimensao]]
+            mascara &= np.isin(textos, [str(valor) for valor in selecionados])
+        return mascara
+
+    @rastreado('cubo.quebra')
+    def quebra(self, dimensoes, filtros=None):
+        """
+        Prêmio, sinistro, quantidade de apólices e '% Sinistralidade' por
+        combinação das dimensões pedidas (na ordem do detalhamento), só das
+        células que atendem aos filtros. As dimensões saem com o rótulo de
+        DIMENSOES_CUBO, ordenadas pelo prêmio em ordem decrescente.
+        """
+        dimensoes = list(dimensoes)
+        mascara = self._mascara(filtros)
+        for dimensao in dimensoes:
+            mascara &= self._codigos[dimensao] >= 0
+        selecionadas = np.flatnonzero(mascara)
+
+        # Chave de grupo compactada a cada dimensão (posição entre as
+        # combinações distintas), em ordem lexicográfica dos códigos e sem
+        # risco de estouro com muitas dimensões
+        grupo = np.zeros(len(selecionadas), dtype=np.int64)
+        for dimensao in dimensoes:
+            grupo = grupo * len(self._valores[dimensao]) + self._codigos[dimensao][selecionadas]
+            _, grupo = np.unique(grupo, return_inverse=True)
+        _, primeira = np.unique(grupo, return_index=True)
+
+        resultado = pd.DataFrame({
+            DIMENSOES_CUBO[dimensao]: self._valores[dimensao][
+                self._codigos[dimensao][selecionadas[primeira]]]
+            for dimensao in dimensoes})
+        for medida, valores in self._medidas.items():
+            if valores.dtype.kind == 'f':
+                soma = np.bincount(grupo, weights=valores[selecionadas], minlength=len(primeira))
+            else:
+                # O bincount soma em float64; os inteiros (centavos e
+                # contagens) são somados em int64 para continuarem exatos
+                soma = np.zeros(len(primeira), dtype=np.int64)
+                np.add.at(soma, grupo, valores[selecionadas])
+            resultado[medida] = soma
+        resultado['% Sinistralidade'] = calcular_percentual(
+            resultado['Total_Sinistro'], resultado['Total_Premio'])
+        return resultado.sort_values(by='Total_Premio', ascending=False)
@@ -0,0 +1,203 @@
+"""
+Gerador de dados sintéticos no formato da planilha do dashboard.
+
+Produz as abas 'apolice_endosso' e 'sinistro' com os mesmos nomes de colunas
+da planilha real, cardinalidades proporcionais ao tamanho pedido e
+concentração (poucos segurados de frota com muitas apólices e sinistros,
+muitos segurados pequenos). Serve para medir o desempenho do dashboard sem
+a planilha privada.
+
+Uso:
+    python dados_sinteticos.py --linhas 100000 --saida base_sintetica.xlsx
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Limite de linhas de dados de uma aba do Excel (1.048.576 menos o cabeçalho)
+LIMITE_LINHAS_EXCEL = 1_048_575
+
+UTILIZACOES = ['URBANO', 'FRETAMENTO', 'ESCOLAR', 'RODOVIARIO', 'TURISMO']
+REGIOES = ['CAPITAL', 'REGIAO METROPOLITANA', 'INTERIOR']
+TIPOS_APOLICE = ['FROTA', 'INDIVIDUAL']
+TIPOS_COBRANCA = ['BOLETO', 'DEBITO EM CONTA', 'CARTAO']
+PRODUTOS = ['RC ONIBUS', 'RC ONIBUS FRETAMENTO', 'APP PASSAGEIROS']
+COBERTURAS = ['DANOS MATERIAIS', 'DANOS CORPORAIS', 'DANOS MORAIS', 'APP MORTE', 'APP INVALIDEZ']
+CIDADES_POR_UF = {
+    'SP': ['SAO PAULO', 'CAMPINAS', 'SANTOS', 'RIBEIRAO PRETO'],
+    'RJ': ['RIO DE JANEIRO', 'NITEROI', 'DUQUE DE CAXIAS'],
+    'MG': ['BELO HORIZONTE', 'UBERLANDIA', 'CONTAGEM'],
+    'PR': ['CURITIBA', 'LONDRINA'],
+    'RS': ['PORTO ALEGRE', 'CAXIAS DO SUL'],
+    'BA': ['SALVADOR', 'FEIRA DE SANTANA'],
+    'PE': ['RECIFE'],
+    'GO': ['GOIANIA'],
+}
+
+
+def _escolha_concentrada(rng, quantidade, tamanho, expoente=1.1):
+    """
+    Sorteia 'tamanho' índices em [0, quantidade) com pesos 1/k^expoente,
+    de modo que os primeiros índices concentram a maior parte dos sorteios.
+    """
+    pesos = 1.0 / np.arange(1, quantidade + 1) ** expoente
+    return rng.choice(quantidade, size=tamanho, p=pesos / pesos.sum())
+
+
+def _categorias(nomes, codigos):
+    return pd.Categorical.from_codes(codigos, categories=nomes)
+
+
+def gerar_dados(linhas_endosso=10_000, semente=0, proporcao_sinistros=0.4,
+                expoente=1.1):
+    """
+    Gera as abas sintéticas.
+
+    'linhas_endosso' é o número de linhas da aba 'apolice_endosso'; a aba
+    'sinistro' tem cerca de 'proporcao_sinistros' vezes esse número de
+    linhas. Retorna a tupla (aba_apolice_endosso, aba_sinistro).
+    """
+    rng = np.random.default_rng(semente)
+
+    # Cardinalidades proporcionais ao tamanho pedido
+    n_apolices = max(1, linhas_endosso // 3)
+    n_estipulantes = max(1, n_apolices // 5)
+    n_corretores = max(1, n_estipulantes // 20)
+    n_representantes = max(1, min(60, n_corretores // 10 + 1))
+
+    estipulantes = np.array([f'SEGURADO {i:07d}' for i in range(n_estipulantes)], dtype=object)
+    corretores = np.array([f'CORRETOR {i:05d}' for i in range(n_corretores)], dtype=object)
+    representantes = np.array([f'REPRESENTANTE {i:03d}' for i in range(n_representantes)], dtype=object)
+    ufs = np.array(list(CIDADES_POR_UF), dtype=object)
+    cidades = [(uf, cidade) for uf, lista in CIDADES_POR_UF.items() for cidade in lista]
+
+    # Atributos fixos de cada segurado: corretor, representante e cidade
+    corretor_do_estipulante = _escolha_concentrada(rng, n_corretores, n_estipulantes, expoente)
+    representante_do_corretor = _escolha_concentrada(rng, n_representantes, n_corretores, expoente)
+    cidade_do_estipulante = _escolha_concentrada(rng, len(cidades), n_estipulantes, 0.8)
+
+    # Apólices: poucos segurados de frota concentram muitas apólices
+    estipulante_da_apolice = _escolha_concentrada(rng, n_estipulantes, n_apolices, expoente)
+    inicio_vigencia = (np.datetime64('2019-01-01')
+                       + rng.integers(0, 6 * 365, n_apolices).astype('timedelta64[D]'))
+    duracao = np.where(rng.random(n_apolices) < 0.85, 365, 180).astype('timedelta64[D]')
+
+    # Endossos: toda apólice tem ao menos um; os demais são concentrados
+    extras = _escolha_concentrada(rng, n_apolices, max(0, linhas_endosso - n_apolices), 0.6)
+    apolice_do_endosso = np.sort(np.concatenate([np.arange(n_apolices), extras]))[:linhas_endosso]
+    estipulante = estipulante_da_apolice[apolice_do_endosso]
+    corretor = corretor_do_estipulante[estipulante]
+    cidade = cidade_do_estipulante[estipulante]
+    uf_da_cidade = np.array([list(CIDADES_POR_UF).index(uf) for uf, _ in cidades])
+
+    premio = np.round(rng.lognormal(8.0, 1.0, linhas_endosso), 2)
+    cancelamento = rng.random(linhas_endosso) < 0.02
+    premio[cancelamento] = -np.round(premio[cancelamento] * 0.5, 2)
+
+    aba_apolice_endosso = pd.DataFrame({
+        'cd_apolice': 1_000_000 + apolice_do_endosso,
+        'vl_tarifario_pago': premio,
+        'nm_tp_apolice': _categorias(TIPOS_APOLICE, rng.choice(2, n_apolices, p=[0.7, 0.3])[apolice_do_endosso]),
+        'nm_tp_cobranca': _categorias(TIPOS_COBRANCA, rng.choice(3, n_apolices, p=[0.6, 0.3, 0.1])[apolice_do_endosso]),
+        'nm_regiao_circulacao': _categorias(REGIOES, rng.choice(3, n_apolices)[apolice_do_endosso]),
+        'nm_auto_utilizacao': _categorias(UTILIZACOES, _escolha_concentrada(rng, len(UTILIZACOES), n_apolices, 1.0)[apolice_do_endosso]),
+        'dt_ini_vig_apo': inicio_vigencia[apolice_do_endosso],
+        'dt_fim_vig_apo': (inicio_vigencia + duracao)[apolice_do_endosso],
+        'nm_uf_cliente': _categorias(ufs, uf_da_cidade[cidade]),
+        'nm_cidade': _categorias(np.array([c for _, c in cidades], dtype=object), cidade),
+        'nm_estipulante': _categorias(estipulantes, estipulante),
+        'nm_produto': _categorias(PRODUTOS, rng.choice(3, n_apolices, p=[0.8, 0.15, 0.05])[apolice_do_endosso]),
+        'nm_corretor': _categorias(corretores, corretor),
+        'nm_representante': _categorias(representantes, representante_do_corretor[corretor]),
+    })
+
+    # Sinistros: cada sinistro tem de 1 a 3 linhas (uma por cobertura) e as
+    # apólices das frotas grandes concentram a maior parte deles
+    linhas_sinistro = int(linhas_endosso * proporcao_sinistros)
+    n_sinistros = max(1, int(linhas_sinistro / 1.5))
+    apolice_do_sinistro = _escolha_concentrada(rng, n_apolices, n_sinistros, 0.7)
+    sinistro_da_linha = np.sort(rng.integers(0, n_sinistros, linhas_sinistro))
+    apolice = apolice_do_sinistro[sinistro_da_linha]
+
+    aba_sinistro = pd.DataFrame({
+        'cd_apolice': 1_000_000 + apolice,
+        'nr_sinistro': 5_000_000 + sinistro_da_linha,
+        'nm_cliente': _categorias(estipulantes, estipulante_da_apolice[apolice]),
+        'Cobertura': _categorias(COBERTURAS, _escolha_concentrada(rng, len(COBERTURAS), linhas_sinistro, 1.0)),
+    })
+    for componente, media in (('sinistro', 8.5), ('despesa', 6.0), ('honorario', 6.5), ('salvado', 5.0)):
+        pago = np.round(rng.lognormal(media, 1.2, linhas_sinistro), 2)
+        pendente = np.round(np.where(rng.random(linhas_sinistro) < 0.3,
+                                     rng.lognormal(media, 1.0, linhas_sinistro), 0.0), 2)
+        if componente == 'salvado':
+            sem_salvado = rng.random(linhas_sinistro) < 0.8
+            pago[sem_salvado] = 0.0
+            pendente[sem_salvado] = 0.0
+        aba_sinistro[f'vl_{componente}_pago'] = pago
+        aba_sinistro[f'vl_{componente}_pendente'] = pendente
+        aba_sinistro[f'vl_{componente}_total'] = np.round(pago + pendente, 2)
+
+    # Algumas células vazias, como na planilha real
+    vazios = rng.random(linhas_sinistro) < 0.05
+    aba_sinistro.loc[vazios, 'vl_salvado_total'] = np.nan
+
+    # Data de ocorrência dentro da vigência da apólice (sorteada por último,
+    # para não alterar os demais valores de uma mesma semente)
+    dias_ocorrencia = (rng.random(n_sinistros) * duracao[apolice_do_sinistro].astype(np.int64)).astype('timedelta64[D]')
+    ocorrencia = inicio_vigencia[apolice_do_sinistro] + dias_ocorrencia
+    aba_sinistro.insert(4, 'dt_ocorrencia', ocorrencia[sinistro_da_linha])
+
+    # Aviso alguns dias depois da ocorrência, com uma cauda de avisos tardios
+    atraso = np.where(rng.random(n_sinistros) < 0.9, rng.exponential(20, n_sinistros),
+                      rng.exponential(180, n_sinistros)).astype('timedelta64[D]')
+    aba_sinistro.insert(5, 'dt_aviso', (ocorrencia + atraso)[sinistro_da_linha])
+
+    return aba_apolice_endosso, aba_sinistro
+
+
+def salvar_dados(aba_apolice_endosso, aba_sinistro, caminho):
+    """
+    Salva as abas geradas. Com extensão .xlsx grava uma planilha com as duas
+    abas (limitada a LIMITE_LINHAS_EXCEL linhas por aba); caso contrário
+    grava um arquivo Parquet por aba, '<caminho>_<aba>.parquet'.
+    Retorna a lista de arquivos gravados.
+    """
+    abas = {'apolice_endosso': aba_apolice_endosso, 'sinistro': aba_sinistro}
+    if caminho.lower().endswith('.xlsx'):
+        maior = max(len(df) for df in abas.values())
+        if maior > LIMITE_LINHAS_EXCEL:
+            raise ValueError(
+                f"O Excel comporta no máximo {LIMITE_LINHAS_EXCEL} linhas por aba ({maior} pedidas). "
+                "Use um caminho sem extensão .xlsx para gravar em Parquet.")
+        with pd.ExcelWriter(caminho) as planilha:
+            for aba, df in abas.items():
+                df.to_excel(planilha, sheet_name=aba, index=False)
+        return [caminho]
+
+    base = os.path.splitext(caminho)[0]
+    arquivos = []
+    for aba, df in abas.items():
+        destino = f'{base}_{aba}.parquet'
+        df.to_parquet(destino, index=False)
+        arquivos.append(destino)
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--linhas', type=int, default=10_000,
+                        help="Linhas da aba 'apolice_endosso' (padrão: 10000)")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--saida', default='base_sintetica.xlsx',
+                        help='Arquivo .xlsx ou prefixo dos arquivos Parquet')
+    args = parser.parse_args()
+
+    aba_apolice_endosso, aba_sinistro = gerar_dados(args.linhas, args.semente)
+    for arquivo in salvar_dados(aba_apolice_endosso, aba_sinistro, args.saida):
+        print(arquivo)
+
+
+if __name__ == '__main__':
+    main()
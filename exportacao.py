@@ -0,0 +1,121 @@
+"""
+Exportação dos resultados filtrados para CSV, Parquet e XLSX.
+
+O arquivo é escrito a partir do DataFrame numérico, em blocos de linhas,
+num arquivo temporário em disco. Na variante formatada (padrão BR) só o
+bloco da vez é formatado, então nenhuma cópia formatada da tabela inteira
+fica em memória. No dashboard a exportação só roda quando o usuário clica
+no botão de download, numa thread à parte do script.
+
+O st.download_button não envia o arquivo em partes: ele lê o arquivo
+temporário inteiro num único bytes, guardado no processo do servidor até a
+sessão descartá-lo. O pico de memória de uma exportação é, portanto, o
+tamanho do arquivo gerado (e não o de uma cópia formatada da tabela).
+"""
+import io
+import itertools
+import tempfile
+
+from instrumentacao import rastreado
+
+# Formatos de exportação (rótulo -> extensão e tipo MIME)
+FORMATOS_EXPORTACAO = {
+    'CSV': ('.csv', 'text/csv'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'XLSX': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+# Linhas escritas (e formatadas) de cada vez
+LINHAS_BLOCO_EXPORTACAO = 50_000
+
+# Linhas de dados por aba do XLSX (o limite do Excel menos o cabeçalho)
+LINHAS_POR_ABA_XLSX = 1_048_575
+
+
+def _blocos(df, formatar, tamanho):
+    for inicio in range(0, len(df), tamanho):
+        bloco = df.iloc[inicio:inicio + tamanho]
+        yield formatar(bloco) if formatar else bloco
+
+
+def _escrever_csv(df, blocos, destino, formatado):
+    # Com os valores no padrão BR (vírgula decimal) o separador é ';', como
+    # o Excel em português espera; o BOM faz o Excel reconhecer o UTF-8
+    separador = ';' if formatado else ','
+    texto = io.TextIOWrapper(destino, encoding='utf-8-sig', newline='')
+    df.head(0).to_csv(texto, sep=separador, index=False)
+    for bloco in blocos:
+        bloco.to_csv(texto, sep=separador, index=False, header=False)
+    texto.flush()
+    texto.detach()
+
+
+def _escrever_parquet(df, blocos, destino):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # O esquema vem do primeiro bloco (as colunas formatadas só têm tipo
+    # texto definido com valores) e os demais blocos são convertidos nele
+    primeiro = next(blocos, df.head(0))
+    esquema = pa.Schema.from_pandas(primeiro, preserve_index=False)
+    with pq.ParquetWriter(destino, esquema) as escritor:
+        for bloco in itertools.chain([primeiro], blocos):
+            escritor.write_table(
+                pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+
+
+def _escrever_xlsx(df, blocos, destino):
+    from openpyxl import Workbook
+
+    # No modo write_only as linhas vão direto para o arquivo, sem manter as
+    # células em memória; passando do limite do Excel abre-se outra aba
+    livro = Workbook(write_only=True)
+    aba, linhas_aba = None, LINHAS_POR_ABA_XLSX
+    for bloco in blocos:
+        valores = bloco.astype(object).where(bloco.notna(), None)
+        for linha in valores.itertuples(index=False, name=None):
+            if linhas_aba == LINHAS_POR_ABA_XLSX:
+                aba = livro.create_sheet(f'dados_{len(livro.worksheets) + 1}'
+                                         if livro.worksheets else 'dados')
+                aba.append(list(df.columns))
+                linhas_aba = 0
+            aba.append(linha)
+            linhas_aba += 1
+    if aba is None:
+        livro.create_sheet('dados').append(list(df.columns))
+    livro.save(destino)
+
+
+@rastreado('exportar')
+def exportar(df, formato, destino, formatar=None, tamanho_bloco=LINHAS_BLOCO_EXPORTACAO):
+    """
+    Escreve o DataFrame no formato pedido ('CSV', 'Parquet' ou 'XLSX') no
+    arquivo binário 'destino', em blocos de 'tamanho_bloco' linhas. Com
+    'formatar' (função que recebe e devolve um DataFrame) cada bloco é
+    formatado antes de ser escrito.
+    """
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValueError(f"Formato '{formato}' não suportado; use {', '.join(FORMATOS_EXPORTACAO)}.")
+    blocos = _blocos(df, formatar, tamanho_bloco)
+    if formato == 'CSV':
+        _escrever_csv(df, blocos, destino, formatar is not None)
+    elif formato == 'Parquet':
+        _escrever_parquet(df, blocos, destino)
+    else:
+        _escrever_xlsx(df, blocos, destino)
+
+
+def arquivo_exportado(df, formato, formatar=None):
+    """
+    Exporta o DataFrame para um arquivo temporário em disco (apagado quando
+    é fechado) e o devolve posicionado no início, pronto para o download.
+    O st.download_button lê o arquivo inteiro para a memória.
+    """
+    destino = tempfile.TemporaryFile()
+    try:
+        exportar(df, formato, destino, formatar)
+    except BaseException:
+        destino.close()
+        raise
+    destino.seek(0)
+    return destino
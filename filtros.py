@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+
+from instrumentacao import rastreado
+
+# Níveis da filtragem hierárquica dos Dados Gerais, na ordem da cascata.
+# O valor indica se a coluna é comparada como texto (astype(str)).
+NIVEIS_FILTRO = {
+    'nm_representante': True,
+    'nm_corretor': True,
+    'nm_estipulante': True,
+    'N° Apólice': False,
+}
+
+
+class HierarquiaFiltros:
+    """
+    Estrutura da filtragem em cascata Representante -> Corretor -> Segurado
+    -> Apólice, construída uma única vez por carga de dados.
+
+    Para cada nível guarda os valores ordenados, o código (posição nessa
+    lista) de cada linha e as posições das linhas ordenadas por código, com
+    o intervalo [início, fim) de cada código. As opções de cada nível e as
+    linhas filtradas são obtidas por união e interseção desses conjuntos de
+    posições, sem copiar nem varrer o DataFrame a cada interação. Posições
+    e intervalos ficam em arrays (um de cada por nível), sem uma visão ou
+    uma entrada de dicionário por valor.
+
+    Um conjunto de linhas é representado por um array ordenado de posições;
+    None significa "todas as linhas".
+    """
+
+    def __init__(self, df, niveis=NIVEIS_FILTRO):
+        self.dados = df
+        self._valores = {}
+        self._indice_valores = {}
+        self._codigos = {}
+        self._ordem = {}
+        self._inicios = {}
+        self._fins = {}
+
+        for coluna, como_texto in niveis.items():
+            serie = df[coluna].astype(str) if como_texto else df[coluna]
+            codigos, valores = pd.factorize(serie, sort=True)
+            contagem = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+            fins = np.cumsum(contagem) + np.count_nonzero(codigos < 0)
+
+            self._valores[coluna] = list(valores)
+            self._indice_valores[coluna] = pd.Index(valores)
+            self._codigos[coluna] = codigos.astype(np.int32)
+            self._ordem[coluna] = np.argsort(codigos, kind='stable')
+            self._inicios[coluna] = fins - contagem
+            self._fins[coluna] = fins
+
+    @rastreado('filtros.opcoes')
+    def opcoes(self, coluna, linhas=None):
+        """
+        Retorna os valores ordenados da coluna presentes nas linhas informadas.
+        """
+        if linhas is None:
+            return self._valores[coluna]
+        codigos = np.unique(self._codigos[coluna][linhas])
+        codigos = codigos[codigos >= 0]
+        valores = self._valores[coluna]
+        return [valores[codigo] for codigo in codigos]
+
+    @rastreado('filtros.aplicar')
+    def aplicar(self, coluna, selecionados, linhas=None):
+        """
+        Restringe o conjunto de linhas aos valores selecionados na coluna.
+        Sem seleção o conjunto é devolvido sem alteração.
+        """
+        if not selecionados:
+            return linhas
+        codigos = self._indice_valores[coluna].get_indexer(list(selecionados))
+        ordem, inicios, fins = self._ordem[coluna], self._inicios[coluna], self._fins[coluna]
+        partes = [ordem[inicios[codigo]:fins[codigo]] for codigo in codigos if codigo >= 0]
+        # Os conjuntos de valores diferentes de um mesmo nível são disjuntos
+        selecao = np.sort(np.concatenate(partes)) if partes else np.empty(0, dtype=np.intp)
+        if linhas is None:
+            return selecao
+        return np.intersect1d(linhas, selecao, assume_unique=True)
+
+    @rastreado('filtros.dados_filtrados')
+    def dados_filtrados(self, linhas=None):
+        """
+        Retorna as linhas do DataFrame no conjunto informado, na ordem original.
+        """
+        if linhas is None:
+            return self.dados
+        return self.dados.take(linhas)
@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+from instrumentacao import rastreado
+
+# Função de Formatação de Valores para o padrão Brasileiro
+
+
+def formatar_valor_br(valor, em_centavos=False):
+    """
+    Formata um valor numérico para o padrão monetário brasileiro (R$ X.XXX,XX).
+    Lida com valores NaN retornando uma string vazia.
+    Com em_centavos=True o valor é um inteiro em centavos e a conversão para
+    reais é exata.
+    """
+    if pd.isna(valor):
+        return ""
+    if em_centavos:
+        centavos = int(valor)
+        reais, resto = divmod(abs(centavos), 100)
+        sinal = "-" if centavos < 0 else ""
+        return f"{sinal}{reais:,}".replace(",", ".") + f",{resto:02d}"
+    # Formata como float com 2 casas decimais e separador de milhar (padrão US)
+    valor_us_format = f"{valor:,.2f}"
+    # Inverte os separadores para o padrão brasileiro
+    valor_br_format = valor_us_format.replace(
+        ",", "X").replace(".", ",").replace("X", ".")
+    return valor_br_format
+
+
+def formatar_percentual(valor):
+    """
+    Formata uma razão como percentual com 2 casas (0.1234 -> '12.34%').
+    Lida com valores NaN retornando uma string vazia.
+    """
+    if pd.isna(valor):
+        return ""
+    return '{:.2%}'.format(valor)
+
+
+def _formatar_vetorizado(valores, formato_python, separador_decimal,
+                         separador_milhar=None, sufixo='', em_centavos=False):
+    """
+    Formata um array de valores com 2 casas decimais usando só operações de
+    array: cada caractere é calculado como um byte numa matriz (linhas x
+    largura), que depois é lida como um array de strings de largura fixa.
+    Retorna um array de objetos (str), com string vazia onde o valor é nulo.
+    Os infinitos (um percentual com denominador zero, por exemplo) ficam
+    fora da matriz e são escritos com 'formato_python', como na formatação
+    célula a célula.
+
+    Os raros valores que ficam exatamente no meio do arredondamento depois da
+    multiplicação em ponto flutuante são refeitos com 'formato_python', para
+    que o resultado seja idêntico ao da formatação célula a célula.
+    Com em_centavos=True os valores já são inteiros em centavos.
+    """
+    numeros = pd.to_numeric(pd.Series(valores), errors='coerce')
+    quantidade = len(numeros)
+    nulos = numeros.isna().to_numpy()
+    como_float = numeros.to_numpy(dtype='float64', na_value=np.nan)
+    infinitos = np.isinf(como_float)
+    invalidos = nulos | infinitos
+
+    if em_centavos:
+        inteiros = numeros.mask(infinitos).fillna(0).to_numpy(dtype=np.int64)
+        negativos = inteiros < 0
+        centavos = np.abs(inteiros)
+    else:
+        numeros = np.where(invalidos, 0.0, numeros.to_numpy(dtype='float64'))
+        negativos = np.signbit(numeros) & ~invalidos
+        escalado = np.abs(numeros) * 100
+        centavos = np.rint(escalado).astype(np.int64)
+
+        duvidosos = np.flatnonzero(
+            np.abs(escalado - np.floor(escalado) - 0.5) < 1e-6)
+        for posicao in duvidosos:
+            texto = formato_python(abs(numeros[posicao]))
+            centavos[posicao] = int(''.join(c for c in texto if c.isdigit()))
+
+    inteiro = centavos // 100
+    centavos = centavos % 100
+
+    # Quantidade de dígitos da parte inteira de cada valor
+    digitos = np.ones(quantidade, dtype=np.int64)
+    maior = int(inteiro.max()) if quantidade else 0
+    max_digitos, potencia = 1, 10
+    while potencia <= maior:
+        digitos += inteiro >= potencia
+        potencia *= 10
+        max_digitos += 1
+
+    # Largura: sinal + dígitos + separadores de milhar + decimais + sufixo
+    pontos = (max_digitos - 1) // 3 if separador_milhar else 0
+    largura = 1 + max_digitos + pontos + 3 + len(sufixo)
+    matriz = np.full((quantidade, largura), ord(' '), dtype=np.uint8)
+
+    posicao = largura - 1
+    for caractere in reversed(sufixo):
+        matriz[:, posicao] = ord(caractere)
+        posicao -= 1
+    matriz[:, posicao] = ord('0') + centavos % 10
+    matriz[:, posicao - 1] = ord('0') + centavos // 10
+    matriz[:, posicao - 2] = ord(separador_decimal)
+    posicao -= 3
+
+    # Dígitos da parte inteira, da direita para a esquerda
+    coluna_digito = np.empty(max_digitos, dtype=np.int64)
+    restante = inteiro.copy()
+    for k in range(max_digitos):
+        if separador_milhar and k and k % 3 == 0:
+            matriz[:, posicao] = np.where(
+                digitos > k, ord(separador_milhar), ord(' '))
+            posicao -= 1
+        matriz[:, posicao] = np.where(
+            digitos > k, ord('0') + restante % 10, ord(' '))
+        coluna_digito[k] = posicao
+        posicao -= 1
+        restante //= 10
+
+    # Sinal imediatamente à esquerda do primeiro dígito
+    linhas = np.flatnonzero(negativos)
+    matriz[linhas, coluna_digito[digitos[linhas] - 1] - 1] = ord('-')
+
+    textos = np.char.lstrip(matriz.view(f'S{largura}').ravel())
+    textos = textos.astype('U').astype(object)
+    textos[nulos] = ''
+    for posicao in np.flatnonzero(infinitos):
+        textos[posicao] = formato_python(como_float[posicao]) + sufixo
+    return textos
+
+
+def _como_serie(valores, textos):
+    indice = valores.index if isinstance(valores, pd.Series) else None
+    return pd.Series(textos, index=indice, dtype=object)
+
+
+def formatar_serie_br(valores, em_centavos=False):
+    """
+    Versão vetorizada de formatar_valor_br: formata uma Series (ou array) de
+    valores no padrão monetário brasileiro (X.XXX,XX) com operações de
+    array, sem chamar uma função Python por célula. NaN vira string vazia.
+    """
+    textos = _formatar_vetorizado(
+        valores, lambda v: f"{v:,.2f}", ',', separador_milhar='.',
+        em_centavos=em_centavos)
+    return _como_serie(valores, textos)
+
+
+def formatar_percentual_serie(razoes):
+    """
+    Versão vetorizada de formatar_percentual: 0.1234 -> '12.34%'.
+    NaN vira string vazia.
+    """
+    percentuais = pd.to_numeric(pd.Series(razoes), errors='coerce') * 100
+    textos = _formatar_vetorizado(
+        percentuais, lambda v: f"{v:.2f}", '.', sufixo='%')
+    return _como_serie(razoes, textos)
+
+
+@rastreado('formatar_colunas_br')
+def formatar_colunas_br(df, colunas_moeda=(), colunas_percentual=(), em_centavos=False):
+    """
+    Retorna uma cópia do DataFrame com as colunas de moeda e de percentual
+    convertidas em texto formatado, coluna a coluna e de forma vetorizada.
+    """
+    formatadas = {c: formatar_serie_br(df[c], em_centavos)
+                  for c in colunas_moeda if c in df.columns}
+    formatadas.update({c: formatar_percentual_serie(df[c])
+                       for c in colunas_percentual if c in df.columns})
+    return df.assign(**formatadas)
+
+
+def calcular_percentual(numerador, denominador):
+    """
+    Calcula numerador / denominador coluna a coluna, retornando 0 onde o
+    denominador é zero (mesma regra do '% Sin' exibido no dashboard).
+    """
+    return numerador.div(denominador.where(denominador != 0)).fillna(0)
+
+
+def estilo_br(df, colunas_moeda=(), colunas_percentual=(), em_centavos=False):
+    """
+    Retorna um Styler que exibe as colunas de moeda no padrão brasileiro e as
+    colunas de percentual com 2 casas. Os dados continuam numéricos, então a
+    ordenação na tabela é feita pelos valores e não pelo texto formatado.
+    """
+    colunas_moeda = [c for c in colunas_moeda if c in df.columns]
+    colunas_percentual = [c for c in colunas_percentual if c in df.columns]
+    estilo = df.style
+    if colunas_moeda:
+        estilo = estilo.format(
+            lambda valor: formatar_valor_br(valor, em_centavos), subset=colunas_moeda)
+    if colunas_percentual:
+        estilo = estilo.format(formatar_percentual, subset=colunas_percentual)
+    return estilo
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa, rastreado
+
+
+class IndiceFatias:
+    """
+    Índice das linhas de um DataFrame agrupadas pelo valor de uma coluna.
+
+    As posições das linhas são ordenadas uma única vez pelo código de cada
+    valor (ordenação estável, que mantém a ordem original dentro do grupo), e
+    cada valor guarda o intervalo [início, fim) das suas posições. Assim a
+    fatia de um valor é obtida em tempo proporcional ao tamanho da fatia, sem
+    varrer a coluna inteira com uma comparação booleana.
+
+    O índice mantém a referência ao DataFrame usado na construção; ele não
+    deve ser alterado depois disso.
+    """
+
+    def __init__(self, df, coluna):
+        self.dados = df
+        self.coluna = coluna
+
+        # Valores nulos recebem o código -1 e nunca são encontrados,
+        # assim como acontece na comparação df[coluna] == valor.
+        codigos, valores = pd.factorize(df[coluna], sort=False)
+        self._ordem = np.argsort(codigos, kind='stable')
+        contagem = np.bincount(codigos[codigos >= 0], minlength=len(valores))
+        self._fins = np.cumsum(contagem) + np.count_nonzero(codigos < 0)
+        self._inicios = self._fins - contagem
+        # Os intervalos ficam em arrays e o código de um valor vem da tabela
+        # hash do Index, sem um dicionário com uma tupla por valor
+        self._valores = pd.Index(valores)
+
+    def _codigo(self, chave):
+        try:
+            codigo = self._valores.get_loc(chave)
+        except (KeyError, TypeError, pd.errors.InvalidIndexError):
+            return -1
+        return codigo if isinstance(codigo, (int, np.integer)) else -1
+
+    def __contains__(self, chave):
+        return self._codigo(chave) >= 0
+
+    def posicoes(self, chave):
+        """
+        Retorna as posições (iloc) das linhas cujo valor é igual a 'chave'.
+        """
+        codigo = self._codigo(chave)
+        if codigo < 0:
+            return self._ordem[:0]
+        return self._ordem[self._inicios[codigo]:self._fins[codigo]]
+
+    def fatia(self, chave):
+        """
+        Retorna as linhas cujo valor da coluna é igual a 'chave', na mesma
+        ordem em que aparecem no DataFrame (equivalente a
+        df.loc[df[coluna] == chave]).
+        """
+        with etapa(f'fatia {self.coluna}', self.dados) as registro:
+            return registro.saida(self.dados.take(self.posicoes(chave)))
+
+
+@rastreado('construir_indices')
+def construir_indices(dados_exibicao, df_sinistros):
+    """
+    Constrói os índices usados pelos painéis de apólice e de segurado:
+    por número da apólice e por estipulante nos dados das apólices, e por
+    número da apólice e por cliente na base de sinistros.
+    """
+    return {
+        'apolice': IndiceFatias(dados_exibicao, 'N° Apólice'),
+        'estipulante': IndiceFatias(dados_exibicao, 'nm_estipulante'),
+        'sinistro_apolice': IndiceFatias(df_sinistros, 'N° Apólice'),
+        'sinistro_cliente': IndiceFatias(df_sinistros, 'nm_cliente'),
+    }
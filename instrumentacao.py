@@ -0,0 +1,302 @@
+"""
+Instrumentação das execuções do dashboard.
+
+Cada execução do script (ou de um fragmento) é registrada como um rastreio
+com as etapas executadas: tempo de parede, linhas de entrada e de saída,
+variação da memória do processo e, para as funções cacheadas, se a chamada
+foi um acerto ou uma falha do cache. Os rastreios concluídos ficam num
+histórico do processo (para as latências p50/p95), são emitidos como log
+estruturado (JSON) no logger 'dashboard.rastreio' e, com a variável de
+ambiente DASHBOARD_TRACE, acrescentados a um arquivo JSON Lines.
+
+O rastreio só é ligado pelas variáveis de ambiente DASHBOARD_DEBUG ou
+DASHBOARD_TRACE. Desligado (o padrão em produção), nenhuma execução é
+aberta: as etapas não são registradas nem leem a memória do processo, e o
+custo é só o de uma consulta a uma variável da thread, como fora do
+dashboard (benchmark, scripts).
+"""
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # Sem psutil a memória é lida de /proc (Linux)
+    psutil = None
+
+# Com DASHBOARD_DEBUG=1 o painel de diagnóstico aparece na sidebar
+DEBUG_ATIVO = os.environ.get('DASHBOARD_DEBUG', '0') == '1'
+
+# Arquivo JSON Lines onde cada rastreio concluído é acrescentado (opcional)
+ARQUIVO_RASTREIO = os.environ.get('DASHBOARD_TRACE')
+
+# As execuções só são rastreadas quando alguém vai ver o resultado
+RASTREIO_ATIVO = DEBUG_ATIVO or bool(ARQUIVO_RASTREIO)
+
+# Quantidade de rastreios mantidos no histórico do processo
+TAMANHO_HISTORICO = 1000
+
+logger = logging.getLogger('dashboard.rastreio')
+
+historico = deque(maxlen=TAMANHO_HISTORICO)
+_trava = threading.Lock()
+_local = threading.local()
+
+
+def memoria_processo_mb():
+    """
+    Memória residente (RSS) do processo em MB, ou None se não disponível.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    try:
+        with open('/proc/self/statm') as arquivo:
+            paginas = int(arquivo.read().split()[1])
+        return paginas * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _contar_linhas(objeto):
+    """
+    Quantidade de linhas de um DataFrame, Series ou array (somada para uma
+    tupla deles). Retorna None para os demais objetos.
+    """
+    if isinstance(objeto, (tuple, list)):
+        contagens = [_contar_linhas(item) for item in objeto]
+        contagens = [c for c in contagens if c is not None]
+        return sum(contagens) if contagens else None
+    if hasattr(objeto, 'shape') and hasattr(objeto, '__len__'):
+        return len(objeto)
+    return None
+
+
+class Etapa:
+    """
+    Registro de uma etapa de uma execução.
+    """
+
+    def __init__(self, nome, nivel, entrada=None):
+        self.nome = nome
+        self.nivel = nivel
+        self.linhas_entrada = _contar_linhas(entrada)
+        self.linhas_saida = None
+        self.cache = None
+        self.tempo_ms = None
+        self.memoria_delta_mb = None
+
+    def saida(self, resultado):
+        """
+        Registra as linhas do resultado da etapa e o devolve sem alteração.
+        """
+        self.linhas_saida = _contar_linhas(resultado)
+        return resultado
+
+    def para_dict(self):
+        return {
+            'etapa': self.nome,
+            'nivel': self.nivel,
+            'tempo_ms': self.tempo_ms,
+            'linhas_entrada': self.linhas_entrada,
+            'linhas_saida': self.linhas_saida,
+            'memoria_delta_mb': self.memoria_delta_mb,
+            'cache': self.cache,
+        }
+
+
+class Execucao:
+    """
+    Rastreio de uma execução do script ou de um fragmento.
+    """
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.inicio = datetime.now().isoformat(timespec='milliseconds')
+        self.etapas = []
+        self.nivel = 0
+        self._relogio = time.perf_counter()
+        self._memoria = memoria_processo_mb()
+
+    def concluir(self):
+        memoria = memoria_processo_mb()
+        return {
+            'execucao': self.nome,
+            'inicio': self.inicio,
+            'tempo_ms': (time.perf_counter() - self._relogio) * 1000,
+            'memoria_mb': memoria,
+            'memoria_delta_mb': _delta(self._memoria, memoria),
+            'etapas': [etapa.para_dict() for etapa in self.etapas],
+        }
+
+
+def _delta(antes, depois):
+    if antes is None or depois is None:
+        return None
+    return depois - antes
+
+
+def execucao_atual():
+    return getattr(_local, 'execucao', None)
+
+
+@contextmanager
+def etapa(nome, entrada=None):
+    """
+    Mede uma etapa da execução atual. O objeto devolvido permite registrar
+    as linhas de saída com 'saida(resultado)'. Sem execução rastreada a
+    etapa não é registrada.
+    """
+    execucao = execucao_atual()
+    if execucao is None:
+        yield Etapa(nome, 0, None)
+        return
+
+    registro = Etapa(nome, execucao.nivel, entrada)
+    execucao.etapas.append(registro)
+    execucao.nivel += 1
+    memoria = memoria_processo_mb()
+    relogio = time.perf_counter()
+    try:
+        yield registro
+    finally:
+        registro.tempo_ms = (time.perf_counter() - relogio) * 1000
+        registro.memoria_delta_mb = _delta(memoria, memoria_processo_mb())
+        execucao.nivel -= 1
+
+
+def rastreado(nome):
+    """
+    Decorador que mede cada chamada da função como uma etapa. As linhas de
+    entrada são as do primeiro argumento tabular e as de saída as do
+    resultado.
+    """
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(*args, **kwargs):
+            if execucao_atual() is None:
+                return funcao(*args, **kwargs)
+            entrada = next((a for a in args if hasattr(a, 'shape')), None)
+            with etapa(nome, entrada) as registro:
+                return registro.saida(funcao(*args, **kwargs))
+        return envoltorio
+    return decorador
+
+
+def marcar_execucao(funcao):
+    """
+    Decorador aplicado sob st.cache_data/st.cache_resource: o corpo da função
+    só roda numa falha do cache, e é isso que 'chamar_cacheado' detecta.
+    """
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        _local.falhas_cache = getattr(_local, 'falhas_cache', 0) + 1
+        return funcao(*args, **kwargs)
+    return envoltorio
+
+
+def chamar_cacheado(nome, funcao, *args, **kwargs):
+    """
+    Chama uma função cacheada (decorada com marcar_execucao) registrando a
+    etapa como acerto ('hit') ou falha ('miss') do cache.
+    """
+    falhas = getattr(_local, 'falhas_cache', 0)
+    with etapa(f'cache {nome}') as registro:
+        resultado = registro.saida(funcao(*args, **kwargs))
+        registro.cache = 'miss' if getattr(_local, 'falhas_cache', 0) > falhas else 'hit'
+    return resultado
+
+
+def iniciar_execucao(nome):
+    """
+    Inicia o rastreio de uma execução na thread atual, se o rastreio está
+    ativo (RASTREIO_ATIVO). Um rastreio anterior não concluído (execução
+    interrompida por st.stop) é concluído antes.
+    """
+    if not RASTREIO_ATIVO:
+        return
+    if execucao_atual() is not None:
+        finalizar_execucao()
+    _local.execucao = Execucao(nome)
+
+
+def finalizar_execucao():
+    """
+    Conclui o rastreio da execução atual: guarda no histórico, emite o log
+    estruturado e grava no arquivo de rastreio, se configurado.
+    Retorna o rastreio (dict) ou None se não havia execução rastreada.
+    """
+    execucao = execucao_atual()
+    if execucao is None:
+        return None
+    _local.execucao = None
+
+    rastreio = execucao.concluir()
+    linha = json.dumps(rastreio, ensure_ascii=False, default=str)
+    with _trava:
+        historico.append(rastreio)
+        if ARQUIVO_RASTREIO:
+            try:
+                with open(ARQUIVO_RASTREIO, 'a', encoding='utf-8') as arquivo:
+                    arquivo.write(linha + '\n')
+            except OSError as e:
+                logging.warning(f"Não foi possível gravar o rastreio em '{ARQUIVO_RASTREIO}': {e}")
+    logger.info(linha)
+    return rastreio
+
+
+@contextmanager
+def execucao_rastreada(nome):
+    """
+    Gerenciador de contexto (ou decorador) para os fragmentos: numa
+    reexecução isolada do fragmento abre um rastreio próprio; dentro da
+    execução do script vira uma etapa dela.
+    """
+    if execucao_atual() is not None:
+        # Fragmento executado dentro da execução completa do script
+        with etapa(nome):
+            yield
+        return
+    iniciar_execucao(nome)
+    try:
+        yield
+    finally:
+        finalizar_execucao()
+
+
+def resumo_latencias():
+    """
+    Latências (ms) das execuções no histórico, por tipo de execução:
+    quantidade, p50, p95 e máximo.
+    """
+    with _trava:
+        rastreios = list(historico)
+    tempos = {}
+    for rastreio in rastreios:
+        tempos.setdefault(rastreio['execucao'], []).append(rastreio['tempo_ms'])
+    return [
+        {
+            'execucao': nome,
+            'quantidade': len(valores),
+            'p50_ms': float(np.percentile(valores, 50)),
+            'p95_ms': float(np.percentile(valores, 95)),
+            'max_ms': max(valores),
+        }
+        for nome, valores in tempos.items()
+    ]
+
+
+def exportar_rastreio():
+    """
+    Histórico de rastreios do processo como texto JSON.
+    """
+    with _trava:
+        rastreios = list(historico)
+    return json.dumps(rastreios, ensure_ascii=False, indent=2, default=str)
@@ -0,0 +1,431 @@
+"""
+Motor de consulta opcional em DuckDB.
+
+Com DASHBOARD_MOTOR=duckdb (e o pacote duckdb instalado) as abas são lidas
+direto dos snapshots Parquet por um banco DuckDB embutido, sem carregar a
+base de sinistros no pandas:
+
+- o agregado por apólice é calculado em SQL (GROUP BY e FULL JOIN, com as
+  mesmas regras de processar_abas) e só o resultado, uma linha por apólice,
+  vira DataFrame;
+- as fatias de sinistro por apólice e por cliente são consultas com o filtro
+  empurrado para a leitura do Parquet (só as linhas e colunas pedidas são
+  lidas), no lugar dos índices em memória;
+- a cascata de filtros dos Dados Gerais é respondida com SELECT DISTINCT e
+  WHERE sobre as colunas dos filtros;
+- os triângulos de desenvolvimento partem das células somadas em SQL, sem
+  nenhuma linha de sinistro no pandas.
+
+As classes têm a mesma interface de IndiceFatias e HierarquiaFiltros, então
+os painéis não mudam. O DuckDB usa todos os núcleos e pode descarregar para
+disco o que não couber na memória.
+"""
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from carregamento import (COLUNAS_APOLICE_ENDOSSO, COMPONENTES_TOTAL_SINISTRO,
+                          compactar_tipos, converter_datas, eh_coluna_moeda,
+                          listar_planilhas, preparar_snapshots)
+from filtros import NIVEIS_FILTRO
+from indices import IndiceFatias
+from instrumentacao import etapa, rastreado
+from sinistralidade import COLUNA_DATA_OCORRENCIA
+from triangulos import (COLUNA_COBERTURA, COLUNA_DATA_AVISO, COMPONENTES_PAGO,
+                        DIMENSOES_APOLICE, PERIODICIDADES_TRIANGULO)
+
+# Motor de consulta: 'pandas' (padrão) ou 'duckdb'
+MOTOR_CONSULTA = os.environ.get('DASHBOARD_MOTOR', 'pandas')
+
+# O pacote duckdb só é importado quando o motor é usado, para não pesar
+# na inicialização do modo pandas
+duckdb = None
+if MOTOR_CONSULTA == 'duckdb':
+    try:
+        import duckdb
+    except ImportError:  # O motor DuckDB é opcional
+        logging.warning(
+            "DASHBOARD_MOTOR=duckdb, mas o pacote duckdb não está instalado; usando o pandas.")
+
+MOTOR_DUCKDB = duckdb is not None
+
+
+def _nome(coluna):
+    """
+    Identificador SQL entre aspas (os nomes têm espaços e acentos).
+    """
+    return '"' + str(coluna).replace('"', '""') + '"'
+
+
+# Número ordinal do período de uma data, como o Period do pandas
+_ORDINAIS_SQL = {
+    'Y': "year({data}) - 1970",
+    'Q': "(year({data}) - 1970) * 4 + quarter({data}) - 1",
+    'M': "(year({data}) - 1970) * 12 + month({data}) - 1",
+}
+
+
+def _ordinal(data):
+    """
+    Expressão do ordinal do período de 'data' na periodicidade da linha.
+    """
+    casos = ' '.join(f"WHEN '{p}' THEN {_ORDINAIS_SQL[p].format(data=data)}"
+                     for p in PERIODICIDADES_TRIANGULO.values())
+    return f"CASE periodicidade {casos} END"
+
+
+def _escalar(valor):
+    """
+    Converte escalares do numpy para tipos Python, aceitos como parâmetro.
+    """
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+class MotorDuckDB:
+    """
+    Banco DuckDB em memória com as visões 'apolice_endosso' e 'sinistro'
+    sobre os snapshots Parquet da planilha e a base de sinistros já no
+    formato exibido pelo dashboard ('sinistros').
+
+    O atributo 'apolices' guarda o agregado por apólice (o mesmo resultado
+    de processar_abas). Cada consulta usa um cursor próprio, então o motor
+    pode ser compartilhado entre as sessões.
+    """
+
+    def __init__(self, caminhos_parquet, em_centavos=False):
+        self.em_centavos = em_centavos
+        self._conexao = duckdb.connect()
+        for aba, caminho in caminhos_parquet.items():
+            caminho_sql = caminho.replace("'", "''")
+            self._conexao.execute(
+                f"CREATE VIEW {aba} AS SELECT * FROM "
+                f"read_parquet('{caminho_sql}', file_row_number = true)")
+
+        self._tipos_sinistro = dict(self._conexao.execute(
+            "SELECT column_name, column_type FROM (DESCRIBE sinistro)").fetchall())
+        self._tipos_sinistro.pop('file_row_number', None)
+        self._conexao.execute(f"CREATE VIEW sinistros AS {self._sql_sinistros()}")
+
+        with etapa('duckdb apolices') as registro:
+            self.apolices = registro.saida(self._consultar_apolices())
+
+    def _moeda(self, expressao):
+        if self.em_centavos:
+            # Mesma conversão de converter_para_centavos (nulo vira 0)
+            return f"CAST(round_even(COALESCE(CAST({expressao} AS DOUBLE), 0) * 100, 0) AS BIGINT)"
+        return f"CAST({expressao} AS DOUBLE)"
+
+    def _soma(self, expressao):
+        # Em centavos a soma continua BIGINT (o DuckDB devolveria HUGEINT)
+        if self.em_centavos:
+            return f"CAST(SUM({expressao}) AS BIGINT)"
+        return f"SUM({expressao})"
+
+    def _total_sinistro(self):
+        """
+        Expressão do 'Total Sinistro': nula (e depois 0) quando algum
+        componente é nulo, como no cálculo em float.
+        """
+        sinistro, despesa, honorario, salvado = (
+            self._moeda(_nome(c)) for c in COMPONENTES_TOTAL_SINISTRO)
+        total = f"{sinistro} + {despesa} + {honorario} - {salvado}"
+        if self.em_centavos:
+            nulos = ' OR '.join(f"{_nome(c)} IS NULL" for c in COMPONENTES_TOTAL_SINISTRO)
+            return f"CASE WHEN {nulos} THEN 0 ELSE {total} END"
+        return total
+
+    def _sql_sinistros(self):
+        """
+        Base de sinistros como no pandas: 'cd_apolice' renomeada para
+        'N° Apólice', nulos preenchidos com 0 (exceto datas) e o
+        'Total Sinistro' no final, na ordem das linhas da planilha.
+        """
+        colunas = []
+        for coluna, tipo in self._tipos_sinistro.items():
+            nome = 'N° Apólice' if coluna == 'cd_apolice' else coluna
+            if eh_coluna_moeda(coluna):
+                expressao = f"COALESCE({self._moeda(_nome(coluna))}, 0)"
+            elif tipo.startswith(('TIMESTAMP', 'DATE')):
+                expressao = _nome(coluna)
+            elif tipo == 'VARCHAR':
+                expressao = f"COALESCE({_nome(coluna)}, '0')"
+            else:
+                expressao = f"COALESCE({_nome(coluna)}, 0)"
+            colunas.append(f"{expressao} AS {_nome(nome)}")
+        colunas.append(f"COALESCE({self._total_sinistro()}, 0) AS \"Total Sinistro\"")
+        colunas.append('file_row_number AS _linha')
+        return f"SELECT {', '.join(colunas)} FROM sinistro"
+
+    def _consultar_apolices(self):
+        """
+        Agregado por apólice em SQL: soma do prêmio, dados da primeira linha
+        de cada apólice e soma do 'Total Sinistro', unidos por FULL JOIN.
+        """
+        adicionais = [c for c in COLUNAS_APOLICE_ENDOSSO
+                      if c not in ('cd_apolice', 'vl_tarifario_pago')]
+        tipos = dict(self._conexao.execute(
+            "SELECT column_name, column_type FROM (DESCRIBE apolice_endosso)").fetchall())
+
+        def preenchida(coluna):
+            if tipos[coluna].startswith(('TIMESTAMP', 'DATE')):
+                return f"p.{_nome(coluna)}"
+            if tipos[coluna] == 'VARCHAR':
+                return f"COALESCE(p.{_nome(coluna)}, '0')"
+            return f"COALESCE(p.{_nome(coluna)}, 0)"
+
+        consulta = f"""
+            WITH premio AS (
+                SELECT cd_apolice,
+                       COALESCE({self._soma(self._moeda('vl_tarifario_pago'))}, 0) AS premio,
+                       {', '.join(f'arg_min_null({_nome(c)}, file_row_number) AS {_nome(c)}' for c in adicionais)}
+                FROM apolice_endosso
+                WHERE cd_apolice IS NOT NULL
+                GROUP BY cd_apolice
+            ),
+            sinistro_apolice AS (
+                SELECT cd_apolice, {self._soma(self._total_sinistro())} AS sinistro
+                FROM sinistro
+                WHERE cd_apolice IS NOT NULL
+                GROUP BY cd_apolice
+            )
+            SELECT COALESCE(p.cd_apolice, s.cd_apolice) AS "N° Apólice",
+                   COALESCE(p.premio, 0) AS "Soma Prêmio Pago por Apolice",
+                   {', '.join(f'{preenchida(c)} AS {_nome(c)}' for c in adicionais)},
+                   COALESCE(s.sinistro, 0) AS "Soma Sinistro Por Apolice"
+            FROM premio p
+            FULL JOIN sinistro_apolice s ON p.cd_apolice = s.cd_apolice
+            ORDER BY 1
+        """
+        apolices = self.consultar(consulta)
+        return compactar_tipos(converter_datas(apolices))
+
+    def sinistros_por_ocorrencia(self, coluna):
+        """
+        'Total Sinistro' somado por apólice e data de ocorrência, como
+        sinistralidade.sinistros_por_ocorrencia. Retorna None se a base de
+        sinistros não tiver a coluna.
+        """
+        if coluna not in self._tipos_sinistro:
+            return None
+        resultado = self.consultar(f"""
+            SELECT "N° Apólice", CAST(TRY_CAST({_nome(coluna)} AS TIMESTAMP) AS DATE) AS "Data Ocorrência",
+                   {self._soma('"Total Sinistro"')} AS "Total Sinistro"
+            FROM sinistros
+            GROUP BY ALL
+        """)
+        resultado['Data Ocorrência'] = pd.to_datetime(resultado['Data Ocorrência'])
+        return resultado
+
+    def celulas_triangulos(self, dados_apolices):
+        """
+        Células dos triângulos em SQL, como triangulos.celulas_triangulos:
+        a tupla (valores, quantidades), com as dimensões da apólice de cada
+        sinistro tiradas de 'dados_apolices'. Só as células vêm para o
+        pandas. Retorna None se a base de sinistros não tiver as datas.
+        """
+        if not {COLUNA_DATA_OCORRENCIA, COLUNA_DATA_AVISO} <= set(self._tipos_sinistro):
+            return None
+        pago = ' '.join(('- ' if c == 'vl_salvado_pago' else '+ ') + f"s.{_nome(c)}"
+                        for c in COMPONENTES_PAGO if c in self._tipos_sinistro)
+        dimensoes = ', '.join(_nome(c) for c in DIMENSOES_APOLICE)
+        periodicidades = ', '.join(f"('{p}')" for p in PERIODICIDADES_TRIANGULO.values())
+        linhas = f"""
+            WITH linhas AS (
+                SELECT s.nr_sinistro, s.{_nome(COLUNA_COBERTURA)},
+                       {', '.join(f'a.{_nome(c)}' for c in DIMENSOES_APOLICE)},
+                       0 {pago} AS "Pago", s."Total Sinistro" AS "Incorrido",
+                       CAST(TRY_CAST(s.{_nome(COLUNA_DATA_OCORRENCIA)} AS TIMESTAMP) AS DATE) AS ocorrencia,
+                       CAST(TRY_CAST(s.{_nome(COLUNA_DATA_AVISO)} AS TIMESTAMP) AS DATE) AS aviso
+                FROM sinistros s
+                LEFT JOIN apolices_triangulos a ON s."N° Apólice" = a."N° Apólice"
+            ),
+            periodos AS (
+                SELECT *, {_ordinal('ocorrencia')} AS origem,
+                       -- Aviso registrado antes da ocorrência conta como atraso zero
+                       greatest({_ordinal('aviso')} - {_ordinal('ocorrencia')}, 0) AS atraso
+                FROM linhas, (VALUES {periodicidades}) p(periodicidade)
+                WHERE ocorrencia IS NOT NULL AND aviso IS NOT NULL
+            )
+        """
+        tabelas = {'apolices_triangulos': dados_apolices[['N° Apólice', *DIMENSOES_APOLICE]]}
+        with etapa('duckdb triangulos') as registro:
+            valores = self.consultar(f"""
+                {linhas}
+                SELECT origem, atraso, {dimensoes}, {_nome(COLUNA_COBERTURA)},
+                       {self._soma('"Pago"')} AS "Pago", {self._soma('"Incorrido"')} AS "Incorrido",
+                       periodicidade
+                FROM periodos
+                GROUP BY ALL
+            """, tabelas=tabelas)
+            # Cada sinistro conta uma vez por célula, com o conjunto das suas coberturas
+            quantidades = self.consultar(f"""
+                {linhas}
+                SELECT origem, atraso, {dimensoes}, {_nome(COLUNA_COBERTURA)},
+                       CAST(COUNT(*) AS BIGINT) AS "Quantidade", periodicidade
+                FROM (
+                    SELECT periodicidade, origem, atraso, {dimensoes}, nr_sinistro,
+                           list(DISTINCT {_nome(COLUNA_COBERTURA)}) AS {_nome(COLUNA_COBERTURA)}
+                    FROM periodos
+                    WHERE nr_sinistro IS NOT NULL
+                    GROUP BY ALL
+                )
+                GROUP BY ALL
+            """, tabelas=tabelas)
+            quantidades[COLUNA_COBERTURA] = quantidades[COLUNA_COBERTURA].map(frozenset)
+            registro.saida(valores)
+        return valores, quantidades
+
+    def sinistros_apolices(self):
+        """
+        Pares distintos (nr_sinistro, N° Apólice) da base de sinistros, na
+        ordem em que aparecem na planilha: os únicos dados de sinistro usados
+        pelo índice de busca.
+        """
+        return self.consultar("""
+            SELECT nr_sinistro, "N° Apólice" FROM sinistros
+            WHERE nr_sinistro IS NOT NULL AND "N° Apólice" IS NOT NULL
+            GROUP BY ALL
+            ORDER BY MIN(_linha)
+        """)
+
+    def criar_tabela(self, nome, df):
+        """
+        Copia um DataFrame para uma tabela do banco, visível em todos os
+        cursores (um DataFrame apenas registrado só é visto pela conexão
+        que o registrou).
+        """
+        self._conexao.register('_origem', df)
+        try:
+            self._conexao.execute(f"CREATE OR REPLACE TABLE {_nome(nome)} AS SELECT * FROM _origem")
+        finally:
+            self._conexao.unregister('_origem')
+
+    def consultar(self, sql, parametros=None, tabelas=None):
+        """
+        Executa uma consulta num cursor próprio e devolve um DataFrame.
+        'tabelas' ({nome: DataFrame}) são registradas só nesse cursor.
+        """
+        cursor = self._conexao.cursor()
+        try:
+            for nome, df in (tabelas or {}).items():
+                cursor.register(nome, df)
+            return cursor.execute(sql, parametros or []).df()
+        finally:
+            cursor.close()
+
+
+class FatiasDuckDB:
+    """
+    Fatias da base de sinistros por uma coluna, consultadas no DuckDB.
+    Mesma interface de IndiceFatias (fatia e 'in').
+    """
+
+    def __init__(self, motor, coluna):
+        self.motor = motor
+        self.coluna = coluna
+
+    def __contains__(self, chave):
+        return not self.motor.consultar(
+            f"SELECT 1 FROM sinistros WHERE {_nome(self.coluna)} = ? LIMIT 1",
+            [_escalar(chave)]).empty
+
+    def fatia(self, chave):
+        """
+        Linhas de sinistro cujo valor da coluna é igual a 'chave', na ordem
+        da planilha.
+        """
+        with etapa(f'duckdb fatia {self.coluna}') as registro:
+            fatia = self.motor.consultar(
+                f"SELECT * EXCLUDE (_linha) FROM sinistros "
+                f"WHERE {_nome(self.coluna)} = ? ORDER BY _linha",
+                [_escalar(chave)])
+            return registro.saida(fatia)
+
+
+class FiltrosDuckDB:
+    """
+    Cascata de filtros dos Dados Gerais respondida pelo DuckDB, com a mesma
+    interface de HierarquiaFiltros. As colunas dos filtros (como texto, nos
+    níveis comparados como texto) e a posição de cada linha são registradas
+    no banco; um conjunto de linhas é a tupla dos filtros aplicados
+    ((coluna, valores), ...) e None significa "todas as linhas".
+    """
+
+    def __init__(self, df, motor, niveis=NIVEIS_FILTRO):
+        self.dados = df
+        self.motor = motor
+        self._tabela = f'filtros_{id(self):x}'
+        colunas = {coluna: df[coluna].astype(str) if como_texto else df[coluna]
+                   for coluna, como_texto in niveis.items()}
+        colunas['_posicao'] = np.arange(len(df))
+        motor.criar_tabela(self._tabela, pd.DataFrame(colunas))
+
+    def _onde(self, linhas):
+        if not linhas:
+            return '', []
+        condicoes, parametros = [], []
+        for coluna, selecionados in linhas:
+            condicoes.append(f"{_nome(coluna)} IN ({', '.join('?' * len(selecionados))})")
+            parametros.extend(_escalar(valor) for valor in selecionados)
+        return 'WHERE ' + ' AND '.join(condicoes), parametros
+
+    @rastreado('duckdb filtros.opcoes')
+    def opcoes(self, coluna, linhas=None):
+        """
+        Retorna os valores ordenados da coluna presentes nas linhas informadas.
+        """
+        onde, parametros = self._onde(linhas)
+        resultado = self.motor.consultar(
+            f"SELECT DISTINCT {_nome(coluna)} AS valor FROM {self._tabela} "
+            f"{onde} ORDER BY 1", parametros)
+        return resultado['valor'].dropna().tolist()
+
+    def aplicar(self, coluna, selecionados, linhas=None):
+        """
+        Acrescenta o filtro da coluna ao conjunto de linhas (sem consultar o
+        banco). Sem seleção o conjunto é devolvido sem alteração.
+        """
+        if not selecionados:
+            return linhas
+        return tuple(linhas or ()) + ((coluna, tuple(selecionados)),)
+
+    @rastreado('duckdb filtros.dados_filtrados')
+    def dados_filtrados(self, linhas=None):
+        """
+        Retorna as linhas do DataFrame no conjunto informado, na ordem original.
+        """
+        if linhas is None:
+            return self.dados
+        onde, parametros = self._onde(linhas)
+        posicoes = self.motor.consultar(
+            f"SELECT _posicao FROM {self._tabela} {onde} ORDER BY 1", parametros)
+        return self.dados.take(posicoes['_posicao'].to_numpy())
+
+
+@rastreado('carregar_motor_duckdb')
+def carregar_motor(caminho_arquivo, em_centavos=False):
+    """
+    Cria o motor DuckDB sobre os snapshots Parquet da planilha, gravando-os
+    antes se necessário. Aceita um único arquivo: a combinação de várias
+    planilhas (ler_origem) é feita só no modo pandas.
+    """
+    if len(listar_planilhas(caminho_arquivo)) > 1:
+        raise ValueError(
+            f"O motor DuckDB lê uma única planilha; '{caminho_arquivo}' tem várias.")
+    return MotorDuckDB(preparar_snapshots(caminho_arquivo), em_centavos)
+
+
+def construir_indices_duckdb(dados_exibicao, motor):
+    """
+    Índices dos painéis de apólice e de segurado: os dados por apólice
+    continuam em IndiceFatias (uma linha por apólice, já em memória) e as
+    fatias da base de sinistros são consultas ao DuckDB.
+    """
+    return {
+        'apolice': IndiceFatias(dados_exibicao, 'N° Apólice'),
+        'estipulante': IndiceFatias(dados_exibicao, 'nm_estipulante'),
+        'sinistro_apolice': FatiasDuckDB(motor, 'N° Apólice'),
+        'sinistro_cliente': FatiasDuckDB(motor, 'nm_cliente'),
+    }
@@ -0,0 +1,53 @@
+"""
+Paginação das tabelas no servidor.
+
+Em vez de enviar a tabela inteira ao navegador a cada rerun, o dashboard
+ordena e fatia no servidor só a página visível, e formata e serializa
+apenas as linhas dela: o volume enviado e o tempo de renderização dependem
+do tamanho da página, não do tamanho do resultado.
+"""
+import math
+import os
+
+from instrumentacao import rastreado
+
+# Linhas por página das tabelas paginadas (0 desliga a paginação)
+TAMANHO_PAGINA = int(os.environ.get('DASHBOARD_TAMANHO_PAGINA', '100'))
+
+
+def paginada(linhas, tamanho=TAMANHO_PAGINA):
+    """
+    Indica se uma tabela de 'linhas' linhas é exibida em páginas: a
+    paginação está ligada (tamanho > 0) e a tabela não cabe numa página.
+    """
+    return 0 < tamanho < linhas
+
+
+def total_paginas(linhas, tamanho=TAMANHO_PAGINA):
+    """
+    Quantidade de páginas para 'linhas' linhas (ao menos uma).
+    """
+    return max(1, math.ceil(linhas / tamanho))
+
+
+def pagina_valida(numero, linhas, tamanho=TAMANHO_PAGINA):
+    """
+    O número de página mais próximo de 'numero' que existe numa tabela de
+    'linhas' linhas (a página guardada pode ter sumido com os filtros).
+    """
+    return min(max(1, numero), total_paginas(linhas, tamanho))
+
+
+@rastreado('pagina')
+def pagina(df, numero, tamanho=TAMANHO_PAGINA, ordenar_por=None, decrescente=False):
+    """
+    Linhas da página 'numero' (a partir de 1). Com 'ordenar_por' a tabela é
+    ordenada por essa coluna (valores nulos no fim, empates na ordem
+    original) e só as posições da página são copiadas do DataFrame.
+    """
+    inicio = (numero - 1) * tamanho
+    if ordenar_por is None:
+        return df.iloc[inicio:inicio + tamanho]
+    ordem = df[ordenar_por].reset_index(drop=True).sort_values(
+        ascending=not decrescente, kind='stable', na_position='last').index
+    return df.take(ordem[inicio:inicio + tamanho])
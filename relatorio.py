@@ -0,0 +1,83 @@
+"""
+Relatório em lote dos KPIs de todas as apólices e de todos os segurados.
+
+Calcula, sem o Streamlit, os mesmos indicadores dos painéis da apólice e do
+segurado (Total Prêmio Pago, Total Sinistro, % Sinistro Total, Qtd
+Sinistros, Qtd Apólices e Sinistro Por Cobertura) para a carteira inteira,
+com alguns agrupamentos vetorizados em vez de uma seleção por vez, e grava
+cada tabela em Parquet ou CSV.
+
+Uso:
+    python relatorio.py planilha.xlsx --saida relatorio --formato parquet
+"""
+import argparse
+import os
+import time
+
+from agregacoes import (kpis_por_apolice, kpis_por_segurado,
+                        preparar_exibicao, sinistro_por_cobertura)
+from carregamento import MOEDA_EM_CENTAVOS, carregar_planilha
+
+FORMATOS = ('parquet', 'csv')
+
+
+def gerar_relatorio(dados_apolices, df_sinistro):
+    """
+    Tabelas do relatório a partir dos dados por apólice e da base de
+    sinistros. Retorna {nome da tabela: DataFrame}.
+    """
+    cobertura_segurado = sinistro_por_cobertura(df_sinistro, por=['nm_cliente'])
+    return {
+        'kpis_apolice': kpis_por_apolice(dados_apolices, df_sinistro),
+        'kpis_segurado': kpis_por_segurado(dados_apolices, df_sinistro),
+        'cobertura_apolice': sinistro_por_cobertura(df_sinistro, por=['N° Apólice']),
+        'cobertura_segurado': cobertura_segurado.rename(columns={'nm_cliente': 'Segurado'}),
+    }
+
+
+def salvar_relatorio(tabelas, diretorio, formato='parquet'):
+    """
+    Grava cada tabela em '<diretorio>/<nome>.<formato>'. Retorna a lista
+    dos arquivos gravados.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato '{formato}' não suportado; use {' ou '.join(FORMATOS)}.")
+    os.makedirs(diretorio, exist_ok=True)
+    arquivos = []
+    for nome, df in tabelas.items():
+        destino = os.path.join(diretorio, f'{nome}.{formato}')
+        if formato == 'parquet':
+            df.to_parquet(destino, index=False)
+        else:
+            df.to_csv(destino, index=False)
+        arquivos.append(destino)
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('planilha',
+                        help='Planilha, diretório ou padrão glob de planilhas')
+    parser.add_argument('--saida', default='relatorio',
+                        help='Diretório onde as tabelas são gravadas')
+    parser.add_argument('--formato', choices=FORMATOS, default='parquet')
+    parser.add_argument('--centavos', action='store_true', default=MOEDA_EM_CENTAVOS,
+                        help='Valores monetários em centavos (int64)')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    dados_calculados, df_sinistros = carregar_planilha(args.planilha, args.centavos)
+    carga = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    tabelas = gerar_relatorio(preparar_exibicao(dados_calculados), df_sinistros)
+    calculo = time.perf_counter() - inicio
+
+    for arquivo, df in zip(salvar_relatorio(tabelas, args.saida, args.formato),
+                           tabelas.values()):
+        print(f'{arquivo}: {len(df)} linhas')
+    print(f'Carga {carga:.2f} s, cálculo dos KPIs {calculo:.2f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Prêmio ganho e sinistralidade por período.
+
+O '% Sin' do dashboard divide o sinistro pelo prêmio pago inteiro. Aqui o
+prêmio de cada apólice é ganho pro rata die ao longo da vigência
+[dt_ini_vig_apo, dt_fim_vig_apo) e distribuído pelos períodos (mês,
+trimestre ou ano), e os sinistros entram no período da data de ocorrência,
+formando a série de sinistralidade de qualquer seleção de apólices.
+
+O prêmio ganho até uma data t é a função acumulada
+    G(t) = soma das apólices de taxa_diária * clip(t - início, 0, dias)
+e o ganho num período [a, b) é G(b) - G(a). Com as apólices ordenadas por
+início e por fim, G é calculada em todos os limites de período com somas
+acumuladas e searchsorted: nenhum laço por apólice nem uma linha por
+apólice e período.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from formatacao import calcular_percentual
+from instrumentacao import rastreado
+
+# Coluna da base de sinistros com a data de ocorrência do sinistro
+COLUNA_DATA_OCORRENCIA = os.environ.get('DASHBOARD_COLUNA_OCORRENCIA', 'dt_ocorrencia')
+
+# Periodicidades disponíveis (rótulo exibido -> frequência do pandas)
+PERIODICIDADES = {'Mês': 'M', 'Trimestre': 'Q', 'Ano': 'Y'}
+
+
+def _dias(datas):
+    """
+    Datas como número de dias desde 1970-01-01 (float, NaN onde nulo).
+    """
+    dias = pd.DatetimeIndex(datas).to_numpy().astype('datetime64[D]')
+    return np.where(np.isnat(dias), np.nan, dias.astype(np.int64))
+
+
+def _acumulada(limites, pontos, pesos, pesos_pontos):
+    """
+    soma de pesos_i * (t - pontos_i) para os pontos_i < t, em cada limite t.
+    'pontos' deve estar ordenado; 'pesos_pontos' é pesos * pontos.
+    """
+    quantidade = np.searchsorted(pontos, limites, side='left')
+    soma_pesos = np.concatenate([[0.0], np.cumsum(pesos)])[quantidade]
+    soma_pesos_pontos = np.concatenate([[0.0], np.cumsum(pesos_pontos)])[quantidade]
+    return limites * soma_pesos - soma_pesos_pontos
+
+
+def premio_ganho_acumulado(inicio, fim, premio, limites):
+    """
+    Prêmio ganho até cada limite (em dias), com o prêmio de cada apólice
+    distribuído uniformemente nos dias de [inicio, fim). Uma vigência sem
+    duração positiva é ganha inteira no dia de início.
+    """
+    dias = np.maximum(fim - inicio, 1)
+    fim = inicio + dias
+    taxa = premio / dias
+    ordem_inicio = np.argsort(inicio, kind='stable')
+    ordem_fim = np.argsort(fim, kind='stable')
+    ganho_inicio = _acumulada(limites, inicio[ordem_inicio], taxa[ordem_inicio],
+                              (taxa * inicio)[ordem_inicio])
+    ganho_fim = _acumulada(limites, fim[ordem_fim], taxa[ordem_fim],
+                           (taxa * fim)[ordem_fim])
+    return ganho_inicio - ganho_fim
+
+
+@rastreado('sinistros_por_ocorrencia')
+def sinistros_por_ocorrencia(df_sinistro, coluna=COLUNA_DATA_OCORRENCIA):
+    """
+    Base compacta para a série de sinistralidade: 'Total Sinistro' somado
+    por apólice e data de ocorrência. Retorna None se a base de sinistros
+    não tiver a coluna de ocorrência.
+    """
+    if coluna not in df_sinistro.columns:
+        return None
+    datas = pd.to_datetime(df_sinistro[coluna], errors='coerce').dt.normalize()
+    return df_sinistro.groupby(
+        [df_sinistro['N° Apólice'], datas.rename('Data Ocorrência')], observed=True
+    )['Total Sinistro'].sum().reset_index()
+
+
+@rastreado('sinistralidade_por_periodo')
+def sinistralidade_por_periodo(dados_apolices, sinistros_ocorrencia=None,
+                               periodicidade='M', em_centavos=False):
+    """
+    Série por período das apólices em 'dados_apolices': prêmio ganho,
+    sinistro ocorrido (das mesmas apólices, pela data de ocorrência) e
+    '% Sinistralidade' (0 sem prêmio ganho). Os períodos vão do primeiro
+    início de vigência ao último dia coberto ou de ocorrência. Apólices sem
+    as datas de vigência não entram no prêmio ganho.
+    """
+    inicio = _dias(dados_apolices['dt_ini_vig_apo'])
+    fim = _dias(dados_apolices['dt_fim_vig_apo'])
+    premio = dados_apolices['Soma Prêmio Pago por Apolice'].to_numpy(dtype=np.float64)
+    validas = ~(np.isnan(inicio) | np.isnan(fim))
+    inicio, fim, premio = inicio[validas], fim[validas], premio[validas]
+
+    sinistros = None
+    if sinistros_ocorrencia is not None:
+        sinistros = sinistros_ocorrencia[
+            sinistros_ocorrencia['N° Apólice'].isin(dados_apolices['N° Apólice'])
+            & sinistros_ocorrencia['Data Ocorrência'].notna()]
+
+    datas = []
+    if len(inicio):
+        datas += [inicio.min(), np.maximum(fim - 1, inicio).max()]
+    if sinistros is not None and not sinistros.empty:
+        datas += list(_dias(sinistros['Data Ocorrência'].agg(['min', 'max'])))
+    colunas = ['Período', 'Prêmio Ganho', 'Sinistro Ocorrido', '% Sinistralidade']
+    if not datas:
+        return pd.DataFrame(columns=colunas)
+
+    # Dias contados a partir do primeiro dia, para preservar a precisão
+    origem = min(datas)
+    periodos = pd.period_range(pd.Timestamp(min(datas), unit='D'),
+                               pd.Timestamp(max(datas), unit='D'), freq=periodicidade)
+    limites = _dias(list(periodos.start_time) + [(periodos[-1] + 1).start_time]) - origem
+
+    ganho = np.diff(premio_ganho_acumulado(inicio - origem, fim - origem, premio, limites))
+    if em_centavos:
+        ganho = np.round(ganho).astype(np.int64)
+    serie = pd.DataFrame({'Período': periodos, 'Prêmio Ganho': ganho})
+
+    ocorrido = pd.Series(0.0, index=periodos)
+    if sinistros is not None and not sinistros.empty:
+        por_periodo = sinistros.groupby(
+            sinistros['Data Ocorrência'].dt.to_period(periodicidade))['Total Sinistro'].sum()
+        ocorrido = ocorrido.add(por_periodo, fill_value=0)
+    if em_centavos:
+        ocorrido = ocorrido.round().astype(np.int64)
+    serie['Sinistro Ocorrido'] = ocorrido.to_numpy()
+    serie['% Sinistralidade'] = calcular_percentual(
+        serie['Sinistro Ocorrido'], serie['Prêmio Ganho'])
+    return serie[colunas]
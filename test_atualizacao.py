@@ -0,0 +1,10 @@
+import pytest
+
+from atualizacao import verificar_modos_carga
+
+
+def test_um_modo_de_carga_por_vez():
+    verificar_modos_carga({'A': False, 'B': False})
+    verificar_modos_carga({'A': True, 'B': False})
+    with pytest.raises(ValueError, match='A, B'):
+        verificar_modos_carga({'A': True, 'B': True, 'C': False})
@@ -0,0 +1,81 @@
+import pandas as pd
+
+from busca import IndiceBusca, normalizar
+
+
+def _indice():
+    apolices = pd.DataFrame({
+        'N° Apólice': [12, 120, 300, 400, 500],
+        'nm_estipulante': ['João da Silva', 'MARIA  SÃO PEDRO', 'Ana', '12 Transportes', 'Ana'],
+        'nm_corretor': ['Corretora A', 'Corretora A', 'Beta', 'Beta', '12 Seguros'],
+    })
+    sinistros = pd.DataFrame({
+        'nr_sinistro': ['1299', '1299', 'AÇÃO  7', None],
+        'N° Apólice': [300, 300, 400, 500],
+    })
+    return IndiceBusca(apolices, sinistros)
+
+
+def test_prefixo_e_meio_do_nome():
+    indice = _indice()
+    assert indice.buscar('segurado', 'jo') == ['João da Silva']
+    assert indice.buscar('segurado', 'silva') == ['João da Silva']
+    assert indice.buscar('segurado', 'da si') == ['João da Silva']
+    assert indice.buscar('segurado', 'ilva') == []
+    assert indice.buscar('apolice', '12') == [12, 120]
+
+
+def test_acentos_caixa_e_espacos():
+    indice = _indice()
+    assert indice.buscar('segurado', 'JOAO') == ['João da Silva']
+    assert indice.buscar('segurado', 'são pe') == ['MARIA  SÃO PEDRO']
+    assert indice.buscar('segurado', 'maria   sao') == ['MARIA  SÃO PEDRO']
+    # Campos sem busca por palavra usam a mesma normalização da consulta
+    assert indice.buscar('sinistro', 'AÇÃO  7') == ['AÇÃO  7']
+    assert indice.buscar('sinistro', 'acao 7') == ['AÇÃO  7']
+    assert normalizar(' Ação \t Já ') == 'acao ja'
+
+
+def test_permitidos_e_limite():
+    indice = _indice()
+    assert indice.buscar('corretor', '', permitidos={'Beta', 'Outro'}) == ['Beta']
+    assert indice.buscar('corretor', 'c', permitidos=set()) == []
+    assert indice.buscar('segurado', '', limite=2) == ['12 Transportes', 'Ana']
+    assert indice.buscar('inexistente', 'a') == []
+    assert indice.primeiros('apolice', 3) == [12, 120, 300]
+
+
+def test_prioridade_das_apolices():
+    indice = _indice()
+    # Número da apólice, sinistro, segurado e corretor, sem repetição
+    assert indice.buscar_apolices('12') == [12, 120, 300, 400, 500]
+    assert indice.buscar_apolices('12', limite=3) == [12, 120, 300]
+    assert indice.buscar_apolices('ana') == [300, 500]
+    assert indice.buscar_apolices('zzz') == []
+    assert 'sinistro' not in IndiceBusca(pd.DataFrame({
+        'N° Apólice': [1], 'nm_estipulante': ['A'], 'nm_corretor': ['B']}))
+
+
+def test_nomes_iguais_a_forca_bruta(dados):
+    dados_exibicao, df_sinistros = dados
+    indice = IndiceBusca(dados_exibicao, df_sinistros)
+    nomes = dados_exibicao['nm_estipulante'].astype(str).unique()
+    for texto in ('a', 'sil', 'transp', 'de ', 'zzz'):
+        esperado = {nome for nome in nomes
+                    if any(palavra.startswith(normalizar(texto))
+                           for palavra in _sufixos(normalizar(nome)))}
+        assert set(indice.buscar('segurado', texto, limite=len(nomes))) == esperado
+
+
+def _sufixos(texto):
+    palavras = texto.split(' ')
+    return [' '.join(palavras[i:]) for i in range(len(palavras))]
+
+
+def test_pares_do_duckdb_iguais_ao_pandas(dados, motores):
+    dados_exibicao, df_sinistros = dados
+    pandas = IndiceBusca(dados_exibicao, df_sinistros)
+    duckdb = IndiceBusca(dados_exibicao, motores[False].sinistros_apolices())
+    for texto in ('5', '50000', '5000012', '1'):
+        assert duckdb.buscar_apolices(texto) == pandas.buscar_apolices(texto)
+        assert duckdb.buscar('sinistro', texto) == pandas.buscar('sinistro', texto)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from carregamento import combinar_abas, processar_abas
+
+
+def _totais_por_sinistro(aba_sinistro):
+    return aba_sinistro.groupby('nr_sinistro')['vl_sinistro_total'].sum().sort_index()
+
+
+def test_coberturas_de_um_sinistro_em_arquivos_diferentes(abas):
+    aba_apolice_endosso, aba_sinistro = abas
+    # A primeira cobertura de cada sinistro fica no primeiro arquivo e as
+    # demais no segundo; os endossos estão repetidos nos dois
+    cobertura = aba_sinistro['Cobertura']
+    primeira = cobertura == cobertura.groupby(aba_sinistro['nr_sinistro']).transform('first')
+    assert (~primeira).any()
+    combinadas = combinar_abas([
+        {'apolice_endosso': aba_apolice_endosso, 'sinistro': aba_sinistro[primeira]},
+        {'apolice_endosso': aba_apolice_endosso, 'sinistro': aba_sinistro[~primeira]},
+    ])
+
+    assert len(combinadas['sinistro']) == len(aba_sinistro)
+    assert len(combinadas['apolice_endosso']) == len(aba_apolice_endosso)
+    pd.testing.assert_series_equal(_totais_por_sinistro(combinadas['sinistro']),
+                                   _totais_por_sinistro(aba_sinistro))
+
+    resultado, _ = processar_abas(combinadas['apolice_endosso'], combinadas['sinistro'])
+    esperado, _ = processar_abas(aba_apolice_endosso.copy(), aba_sinistro.copy())
+    np.testing.assert_allclose(resultado['Soma Sinistro Por Apolice'],
+                               esperado['Soma Sinistro Por Apolice'])
+
+
+def test_cobertura_repetida_vale_pelo_arquivo_mais_recente(abas):
+    _, aba_sinistro = abas
+    anterior = aba_sinistro.head(200)
+    atualizado = anterior.head(10).copy()
+    atualizado['vl_sinistro_total'] += 1.0
+    combinada = combinar_abas([{'sinistro': anterior}, {'sinistro': atualizado}])['sinistro']
+
+    chave = ['nr_sinistro', 'Cobertura']
+    pares_atualizados = atualizado[chave].astype(str).apply(tuple, axis=1)
+    do_anterior = ~anterior[chave].astype(str).apply(tuple, axis=1).isin(set(pares_atualizados))
+    assert len(combinada) == int(do_anterior.sum()) + len(atualizado)
+    assert combinada['vl_sinistro_total'].sum() == pytest.approx(
+        anterior.loc[do_anterior, 'vl_sinistro_total'].sum() + atualizado['vl_sinistro_total'].sum())
+
+
+def test_linhas_sem_cobertura_so_descartam_repeticoes_identicas(abas):
+    _, aba_sinistro = abas
+    sem_cobertura = aba_sinistro.head(20).copy()
+    sem_cobertura['Cobertura'] = np.nan
+    alterada = sem_cobertura.head(5).copy()
+    alterada['vl_sinistro_total'] += 1.0
+    combinada = combinar_abas([{'sinistro': sem_cobertura},
+                               {'sinistro': pd.concat([sem_cobertura, alterada])}])['sinistro']
+    assert len(combinada) == len(sem_cobertura) + len(alterada)
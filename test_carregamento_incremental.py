@@ -0,0 +1,71 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from carregamento import (compactar_tipos, converter_datas, processar_abas,
+                          processar_abas_incremental)
+
+
+def _carga_completa(aba_apolice_endosso, aba_sinistro, em_centavos):
+    resultado_final, _ = processar_abas(
+        converter_datas(aba_apolice_endosso.copy()), aba_sinistro.copy(), em_centavos)
+    return compactar_tipos(resultado_final)
+
+
+def _carga_incremental(aba_apolice_endosso, aba_sinistro, estado, em_centavos):
+    resultado_final, _, estado = processar_abas_incremental(
+        converter_datas(aba_apolice_endosso.copy()), aba_sinistro.copy(), estado, em_centavos)
+    # Como em carregar_planilha_incremental: o estado guarda o agregado compactado
+    compactar_tipos(resultado_final)
+    return resultado_final, estado
+
+
+def _versoes(aba_apolice_endosso, aba_sinistro):
+    """
+    Sequência de recargas: valores alterados, linhas novas de apólices
+    existentes e novas, e dados adicionais alterados na primeira linha.
+    """
+    rng = np.random.default_rng(7)
+    endosso, sinistro = aba_apolice_endosso, aba_sinistro
+
+    endosso = endosso.copy()
+    linhas = rng.choice(len(endosso), 20, replace=False)
+    endosso.loc[linhas, 'vl_tarifario_pago'] += 10.0
+    yield endosso, sinistro
+
+    sinistro = sinistro.copy()
+    sinistro.loc[rng.choice(len(sinistro), 10, replace=False), 'vl_despesa_total'] = np.nan
+    novas = sinistro.sample(15, random_state=1)
+    yield endosso, pd.concat([sinistro, novas], ignore_index=True)
+
+    sinistro = pd.concat([sinistro, novas], ignore_index=True)
+    nova_apolice = endosso.tail(3).assign(cd_apolice=endosso['cd_apolice'].max() + 1)
+    endosso = pd.concat([endosso, nova_apolice, endosso.head(2)], ignore_index=True)
+    yield endosso, sinistro
+
+    endosso = endosso.copy()
+    endosso.loc[0, 'nm_corretor'] = 'CORRETOR ALTERADO'
+    yield endosso, sinistro
+
+
+@pytest.mark.parametrize('em_centavos', [False, True])
+def test_recargas_iguais_a_carga_completa(abas, em_centavos, caplog):
+    aba_apolice_endosso, aba_sinistro = abas
+    _, estado = _carga_incremental(aba_apolice_endosso, aba_sinistro, None, em_centavos)
+    for endosso, sinistro in _versoes(aba_apolice_endosso, aba_sinistro):
+        caplog.clear()
+        with caplog.at_level(logging.INFO):
+            resultado, estado = _carga_incremental(endosso, sinistro, estado, em_centavos)
+        # O recálculo foi parcial
+        assert 'Carga incremental' in caplog.text
+        pd.testing.assert_frame_equal(resultado, _carga_completa(endosso, sinistro, em_centavos))
+
+
+def test_linhas_removidas_fazem_a_carga_completa(abas):
+    aba_apolice_endosso, aba_sinistro = abas
+    _, estado = _carga_incremental(aba_apolice_endosso, aba_sinistro, None, False)
+    menor = aba_sinistro.iloc[5:].reset_index(drop=True)
+    resultado, _ = _carga_incremental(aba_apolice_endosso, menor, estado, False)
+    pd.testing.assert_frame_equal(resultado, _carga_completa(aba_apolice_endosso, menor, False))
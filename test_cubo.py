@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cubo import DIMENSOES_CUBO, MEDIDAS_CUBO, CuboSinistralidade
+
+
+def _quebra_forca_bruta(dados_apolices, dimensoes, filtros):
+    mascara = pd.Series(True, index=dados_apolices.index)
+    for dimensao, selecionados in filtros.items():
+        mascara &= dados_apolices[dimensao].astype(str).isin([str(v) for v in selecionados])
+    grupos = dados_apolices[mascara].groupby(dimensoes, observed=True)
+    resultado = grupos.agg(**{medida: (coluna, 'sum') for coluna, medida in MEDIDAS_CUBO.items()},
+                           **{'Qtd Apólices': ('N° Apólice', 'size')}).reset_index()
+    return resultado.rename(columns=DIMENSOES_CUBO)
+
+
+def _ordenado(df, rotulos):
+    return df.sort_values(rotulos, ignore_index=True)
+
+
+@pytest.mark.parametrize('fixture', ['dados', 'dados_centavos'])
+def test_quebras_iguais_ao_groupby(fixture, request):
+    dados_exibicao, _ = request.getfixturevalue(fixture)
+    cubo = CuboSinistralidade(dados_exibicao)
+    rng = np.random.default_rng(4)
+    dimensoes_cubo = np.array(cubo.dimensoes, dtype=object)
+
+    for _ in range(25):
+        dimensoes = list(rng.choice(dimensoes_cubo, rng.integers(1, 4), replace=False))
+        filtros = {}
+        for dimensao in rng.choice(dimensoes_cubo, rng.integers(0, 3), replace=False):
+            valores = dados_exibicao[dimensao].dropna().unique()
+            filtros[dimensao] = list(rng.choice(valores, min(2, len(valores)), replace=False))
+
+        rotulos = [DIMENSOES_CUBO[d] for d in dimensoes]
+        obtido = cubo.quebra(dimensoes, filtros)
+        assert obtido['Total_Premio'].is_monotonic_decreasing
+        obtido = _ordenado(obtido, rotulos)
+        esperado = _ordenado(_quebra_forca_bruta(dados_exibicao, dimensoes, filtros), rotulos)
+
+        assert [list(obtido[r].astype(str)) for r in rotulos] == \
+            [list(esperado[r].astype(str)) for r in rotulos]
+        assert list(obtido['Qtd Apólices']) == list(esperado['Qtd Apólices'])
+        for medida in MEDIDAS_CUBO.values():
+            if fixture == 'dados_centavos':
+                assert obtido[medida].dtype == np.int64
+                assert list(obtido[medida]) == list(esperado[medida])
+            else:
+                np.testing.assert_allclose(obtido[medida], esperado[medida])
+
+
+def test_soma_de_centavos_exata_acima_da_precisao_do_float():
+    # 2**53 + 1 não é representável em float64
+    dados_apolices = pd.DataFrame({
+        'N° Apólice': [1, 2, 3],
+        'nm_produto': ['A', 'A', None],
+        'Soma Prêmio Pago por Apolice': np.array([2**53, 1, 5], dtype=np.int64),
+        'Soma Sinistro Por Apolice': np.array([1, 2**53, 0], dtype=np.int64),
+    })
+    quebra = CuboSinistralidade(dados_apolices).quebra(['nm_produto'])
+    assert list(quebra['Produto']) == ['A']
+    assert quebra['Total_Premio'].iloc[0] == 2**53 + 1
+    assert quebra['Total_Sinistro'].iloc[0] == 2**53 + 1
+    assert quebra['Qtd Apólices'].iloc[0] == 2
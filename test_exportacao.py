@@ -0,0 +1,107 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+import exportacao
+from exportacao import arquivo_exportado, exportar
+from formatacao import formatar_colunas_br
+
+
+def _tabela(linhas):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'N° Apólice': np.arange(linhas, dtype=np.int64) + 1_000_000,
+        'nm_estipulante': rng.choice(['João; Silva', 'Ação "Frota"', 'Maria'], linhas),
+        'Prêmio': np.round(rng.normal(1_000, 5_000, linhas), 2),
+        '% Sin': rng.random(linhas),
+        'dt_ini_vig_apo': pd.Timestamp('2024-01-01') + pd.to_timedelta(np.arange(linhas) % 365, 'D'),
+    })
+    df.loc[df.index[::5], 'Prêmio'] = np.nan
+    return df
+
+
+def _formatar(df):
+    return formatar_colunas_br(df, ['Prêmio'], ['% Sin'])
+
+
+def _exportado(df, formato, formatar=None, **kwargs):
+    destino = io.BytesIO()
+    exportar(df, formato, destino, formatar, **kwargs)
+    return destino.getvalue()
+
+
+def _como_texto(df):
+    # Como o to_csv escreve: datas sem horário e nulos vazios
+    df = df.apply(lambda c: c.dt.strftime('%Y-%m-%d') if c.dtype.kind == 'M' else c)
+    return df.astype(object).where(df.notna(), '').astype(str)
+
+
+@pytest.mark.parametrize('linhas', [0, 23, 120_001])
+def test_csv(linhas):
+    df = _tabela(linhas)
+    cru = _exportado(df, 'CSV')
+    assert cru.startswith(b'\xef\xbb\xbf')
+    lido = pd.read_csv(io.BytesIO(cru), encoding='utf-8-sig', parse_dates=['dt_ini_vig_apo'])
+    pd.testing.assert_frame_equal(lido, df, check_dtype=linhas > 0)
+
+    formatado = _exportado(df, 'CSV', _formatar)
+    assert formatado.startswith(b'\xef\xbb\xbf')
+    lido = pd.read_csv(io.BytesIO(formatado), sep=';', encoding='utf-8-sig',
+                       dtype=str, keep_default_na=False)
+    pd.testing.assert_frame_equal(lido, _como_texto(_formatar(df)), check_dtype=linhas > 0)
+
+
+@pytest.mark.parametrize('linhas', [0, 23, 120_001])
+def test_parquet(linhas):
+    df = _tabela(linhas)
+    lido = pd.read_parquet(io.BytesIO(_exportado(df, 'Parquet')))
+    pd.testing.assert_frame_equal(lido, df, check_dtype=linhas > 0)
+
+    lido = pd.read_parquet(io.BytesIO(_exportado(df, 'Parquet', _formatar)))
+    esperado = _formatar(df)
+    pd.testing.assert_frame_equal(lido, esperado, check_dtype=linhas > 0)
+    if linhas:
+        assert lido['Prêmio'].map(type).eq(str).all()
+
+
+def _abas(conteudo):
+    livro = load_workbook(io.BytesIO(conteudo), read_only=True)
+    return {aba.title: [list(linha) for linha in aba.iter_rows(values_only=True)]
+            for aba in livro.worksheets}
+
+
+@pytest.mark.parametrize('formatar', [None, _formatar], ids=['cru', 'br'])
+@pytest.mark.parametrize('linhas', [0, 23])
+def test_xlsx_em_varios_blocos(linhas, formatar):
+    df = _tabela(linhas)
+    abas = _abas(_exportado(df, 'XLSX', formatar, tamanho_bloco=5))
+    assert list(abas) == ['dados']
+    esperado = formatar(df) if formatar else df
+    assert abas['dados'][0] == list(df.columns)
+    lido = pd.DataFrame(abas['dados'][1:], columns=df.columns)
+    if formatar:
+        pd.testing.assert_frame_equal(_como_texto(lido), _como_texto(esperado), check_dtype=False)
+    else:
+        pd.testing.assert_frame_equal(lido, esperado, check_dtype=False)
+
+
+def test_xlsx_abre_outra_aba_no_limite_de_linhas(monkeypatch):
+    monkeypatch.setattr(exportacao, 'LINHAS_POR_ABA_XLSX', 10)
+    df = _tabela(25)
+    abas = _abas(_exportado(df, 'XLSX', tamanho_bloco=4))
+    assert list(abas) == ['dados', 'dados_2', 'dados_3']
+    assert [len(linhas) - 1 for linhas in abas.values()] == [10, 10, 5]
+    assert all(linhas[0] == list(df.columns) for linhas in abas.values())
+    apolices = [linha[0] for linhas in abas.values() for linha in linhas[1:]]
+    assert apolices == df['N° Apólice'].tolist()
+
+
+def test_arquivo_exportado_e_formato_invalido():
+    df = _tabela(3)
+    with arquivo_exportado(df, 'CSV') as arquivo:
+        assert arquivo.read() == _exportado(df, 'CSV')
+    with pytest.raises(ValueError):
+        exportar(df, 'JSON', io.BytesIO())
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from filtros import NIVEIS_FILTRO, HierarquiaFiltros
+
+
+def _mascara_forca_bruta(df, selecoes):
+    mascara = pd.Series(True, index=df.index)
+    for coluna, selecionados in selecoes.items():
+        if selecionados:
+            valores = df[coluna].astype(str) if NIVEIS_FILTRO[coluna] else df[coluna]
+            mascara &= valores.isin(selecionados)
+    return mascara
+
+
+def _opcoes_forca_bruta(df, coluna, mascara):
+    valores = df.loc[mascara, coluna]
+    valores = valores.astype(str) if NIVEIS_FILTRO[coluna] else valores
+    return sorted(valores.dropna().unique())
+
+
+def test_cascata_igual_a_forca_bruta(dados):
+    dados_exibicao, _ = dados
+    hierarquia = HierarquiaFiltros(dados_exibicao)
+    rng = np.random.default_rng(1)
+    colunas = list(NIVEIS_FILTRO)
+
+    for _ in range(40):
+        # Cada nível escolhe entre as opções que restam dos níveis anteriores,
+        # às vezes com um valor que não existe, às vezes sem seleção
+        selecoes, linhas = {}, None
+        for coluna in colunas:
+            opcoes = hierarquia.opcoes(coluna, linhas)
+            mascara = _mascara_forca_bruta(dados_exibicao, selecoes)
+            assert list(opcoes) == _opcoes_forca_bruta(dados_exibicao, coluna, mascara)
+            quantidade = rng.integers(0, min(3, len(opcoes)) + 1)
+            selecionados = list(rng.choice(np.array(opcoes, dtype=object), quantidade, replace=False))
+            if rng.random() < 0.2:
+                selecionados.append('inexistente')
+            selecoes[coluna] = selecionados
+            linhas = hierarquia.aplicar(coluna, selecionados, linhas)
+
+        esperado = dados_exibicao[_mascara_forca_bruta(dados_exibicao, selecoes)]
+        pd.testing.assert_frame_equal(hierarquia.dados_filtrados(linhas), esperado)
+
+
+def test_sem_selecao_devolve_todas_as_linhas(dados):
+    dados_exibicao, _ = dados
+    hierarquia = HierarquiaFiltros(dados_exibicao)
+    linhas = None
+    for coluna in NIVEIS_FILTRO:
+        linhas = hierarquia.aplicar(coluna, [], linhas)
+    assert linhas is None
+    assert hierarquia.dados_filtrados(linhas) is dados_exibicao
+
+
+def test_selecao_sem_linhas():
+    df = pd.DataFrame({coluna: ['x', 'y'] for coluna in NIVEIS_FILTRO})
+    df['N° Apólice'] = [1, 2]
+    hierarquia = HierarquiaFiltros(df)
+    linhas = hierarquia.aplicar('nm_representante', ['x'])
+    linhas = hierarquia.aplicar('nm_corretor', ['y'], linhas)
+    assert len(linhas) == 0
+    assert hierarquia.opcoes('nm_estipulante', linhas) == []
+    assert hierarquia.dados_filtrados(linhas).empty
@@ -0,0 +1,60 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from formatacao import (calcular_percentual, formatar_colunas_br,
+                        formatar_percentual, formatar_percentual_serie,
+                        formatar_serie_br, formatar_valor_br)
+
+
+@pytest.fixture(scope='module')
+def valores():
+    rng = np.random.default_rng(0)
+    aleatorios = np.round(rng.lognormal(8, 3, 20_000) * rng.choice([-1, 1], 20_000), 3)
+    # Valores no meio do arredondamento, zeros com sinal, nulos e extremos
+    especiais = [0.0, -0.0, 0.005, 0.015, 0.125, 2.675, 1.005, -1.005, 999.995,
+                 999_999.995, 1e15, -1e15, 0.1 + 0.2, np.nan, 12.345, -0.004]
+    return pd.Series(np.concatenate([aleatorios, especiais]))
+
+
+def test_moeda_igual_a_formatacao_celula_a_celula(valores):
+    assert list(formatar_serie_br(valores)) == [formatar_valor_br(v) for v in valores]
+
+
+def test_percentual_igual_a_formatacao_celula_a_celula(valores):
+    razoes = valores / 1e4
+    assert list(formatar_percentual_serie(razoes)) == [formatar_percentual(v) for v in razoes]
+
+
+def test_moeda_em_centavos():
+    centavos = pd.Series([0, 1, -1, 99, 100, -100, 123_456_789, -98_765_432_100, 10**15])
+    assert list(formatar_serie_br(centavos, em_centavos=True)) == \
+        [formatar_valor_br(v, em_centavos=True) for v in centavos]
+
+
+def test_infinitos_como_na_formatacao_celula_a_celula():
+    valores = pd.Series([np.inf, -np.inf, 1.5, np.nan])
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        moeda = list(formatar_serie_br(valores))
+        percentual = list(formatar_percentual_serie(valores))
+    assert moeda == [formatar_valor_br(v) for v in valores]
+    assert percentual == [formatar_percentual(v) for v in valores]
+
+
+def test_vazio_e_indice_preservado():
+    assert formatar_serie_br(pd.Series([], dtype='float64')).empty
+    serie = pd.Series([1.0, 2.0], index=[10, 20])
+    assert list(formatar_serie_br(serie).index) == [10, 20]
+
+
+def test_formatar_colunas_br_e_calcular_percentual():
+    df = pd.DataFrame({'premio': [100.0, 0.0], 'sinistro': [50.0, 10.0]})
+    df['% Sin'] = calcular_percentual(df['sinistro'], df['premio'])
+    assert list(df['% Sin']) == [0.5, 0.0]
+    formatado = formatar_colunas_br(df, ['premio', 'sinistro', 'ausente'], ['% Sin'])
+    assert list(formatado['premio']) == ['100,00', '0,00']
+    assert list(formatado['% Sin']) == ['50.00%', '0.00%']
+    assert df['premio'].dtype == 'float64'
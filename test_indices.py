@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+from indices import IndiceFatias, construir_indices
+
+
+def test_fatias_iguais_a_comparacao_booleana(dados):
+    dados_exibicao, df_sinistros = dados
+    indices = construir_indices(dados_exibicao, df_sinistros)
+    for nome, indice in indices.items():
+        coluna = indice.dados[indice.coluna]
+        chaves = coluna.dropna().unique()
+        # As chaves mais frequentes e uma amostra das demais
+        amostra = [*coluna.value_counts().index[:20], *chaves[::max(1, len(chaves) // 100)]]
+        for chave in amostra:
+            pd.testing.assert_frame_equal(
+                indice.fatia(chave), indice.dados.loc[coluna == chave], obj=nome)
+
+
+def test_nulos_e_chaves_ausentes_nao_sao_encontrados():
+    df = pd.DataFrame({'chave': ['a', None, 'b', 'a', np.nan, 'b', 'a'],
+                       'valor': range(7)})
+    indice = IndiceFatias(df, 'chave')
+    assert list(indice.fatia('a')['valor']) == [0, 3, 6]
+    assert list(indice.fatia('b')['valor']) == [2, 5]
+    assert indice.fatia('c').empty
+    assert 'c' not in indice and 'a' in indice
+
+
+def test_chaves_como_na_comparacao():
+    df = pd.DataFrame({'apolice': [10, 20, 10], 'valor': range(3)})
+    indice = IndiceFatias(df, 'apolice')
+    assert list(indice.fatia(10.0)['valor']) == [0, 2]
+    assert list(indice.fatia(np.int32(20))['valor']) == [1]
+    assert indice.fatia(np.nan).empty and indice.fatia('10').empty
+    assert [10] not in indice
@@ -0,0 +1,33 @@
+import instrumentacao
+from instrumentacao import (etapa, execucao_rastreada, finalizar_execucao,
+                            iniciar_execucao, rastreado)
+
+
+@rastreado('dobro')
+def _dobro(valores):
+    return valores * 2
+
+
+def _executar():
+    iniciar_execucao('script')
+    with etapa('etapa'):
+        _dobro(3)
+    return finalizar_execucao()
+
+
+def test_rastreio_desligado_nao_abre_execucao(monkeypatch):
+    monkeypatch.setattr(instrumentacao, 'RASTREIO_ATIVO', False)
+    leituras = []
+    monkeypatch.setattr(instrumentacao, 'memoria_processo_mb', lambda: leituras.append(1))
+    assert _executar() is None
+    with execucao_rastreada('fragmento'):
+        _dobro(1)
+    assert instrumentacao.execucao_atual() is None
+    assert leituras == []
+
+
+def test_rastreio_ligado_registra_as_etapas(monkeypatch):
+    monkeypatch.setattr(instrumentacao, 'RASTREIO_ATIVO', True)
+    rastreio = _executar()
+    assert rastreio['execucao'] == 'script'
+    assert [(e['etapa'], e['nivel']) for e in rastreio['etapas']] == [('etapa', 0), ('dobro', 1)]
@@ -0,0 +1,116 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agregacoes import preparar_exibicao
+from carregamento import compactar_tipos, converter_datas, processar_abas
+from filtros import NIVEIS_FILTRO, HierarquiaFiltros
+from indices import construir_indices
+from motor_duckdb import FiltrosDuckDB, construir_indices_duckdb
+from sinistralidade import sinistros_por_ocorrencia
+
+
+def _comparavel(df):
+    """
+    Mesmos valores com tipos comparáveis: o DuckDB devolve textos em vez de
+    'category', inteiros de 64 bits, datas em microssegundos e um índice novo.
+    As colunas de texto são comparadas como texto, como nos filtros: o
+    preenchimento de nulos do pandas deixa o inteiro 0 onde o DuckDB põe '0'.
+    """
+    df = df.reset_index(drop=True)
+    for coluna in df.columns:
+        serie = df[coluna]
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object:
+            df[coluna] = serie.astype(object).where(serie.isna(), serie.astype(str))
+        elif pd.api.types.is_integer_dtype(serie):
+            df[coluna] = serie.astype(np.int64)
+        elif pd.api.types.is_datetime64_dtype(serie):
+            df[coluna] = serie.astype('datetime64[ns]')
+    return df
+
+
+def _iguais(obtido, esperado, **kwargs):
+    pd.testing.assert_frame_equal(_comparavel(obtido), _comparavel(esperado), **kwargs)
+
+
+@pytest.fixture(params=[False, True], ids=['reais', 'centavos'])
+def em_centavos(request):
+    return request.param
+
+
+@pytest.fixture
+def cenario(dados, dados_centavos, motores, em_centavos):
+    dados_exibicao, df_sinistros = dados_centavos if em_centavos else dados
+    return dados_exibicao, df_sinistros, motores[em_centavos]
+
+
+def test_apolices_iguais_a_processar_abas(cenario, em_centavos):
+    dados_exibicao, _, motor = cenario
+    _iguais(preparar_exibicao(motor.apolices), dados_exibicao, check_exact=em_centavos)
+    if em_centavos:
+        assert motor.apolices['Soma Prêmio Pago por Apolice'].dtype == np.int64
+
+
+def test_fatias_iguais_aos_indices(cenario, em_centavos):
+    dados_exibicao, df_sinistros, motor = cenario
+    esperados = construir_indices(dados_exibicao, df_sinistros)
+    obtidos = construir_indices_duckdb(dados_exibicao, motor)
+    for nome in ('sinistro_apolice', 'sinistro_cliente'):
+        coluna = esperados[nome].coluna
+        chaves = df_sinistros[coluna].unique()
+        for chave in [*df_sinistros[coluna].value_counts().index[:5], *chaves[::40]]:
+            assert chave in obtidos[nome]
+            _iguais(obtidos[nome].fatia(chave), esperados[nome].fatia(chave),
+                    check_exact=em_centavos, obj=f'{nome} {chave}')
+    assert 'inexistente' not in obtidos['sinistro_cliente']
+    assert obtidos['sinistro_cliente'].fatia('inexistente').empty
+
+
+def test_cascata_igual_a_hierarquia(cenario):
+    dados_exibicao, _, motor = cenario
+    esperada = HierarquiaFiltros(dados_exibicao)
+    obtida = FiltrosDuckDB(dados_exibicao, motor)
+    rng = np.random.default_rng(2)
+    for _ in range(10):
+        linhas_esperadas = linhas_obtidas = None
+        for coluna in NIVEIS_FILTRO:
+            opcoes = esperada.opcoes(coluna, linhas_esperadas)
+            assert obtida.opcoes(coluna, linhas_obtidas) == list(opcoes)
+            quantidade = rng.integers(0, min(3, len(opcoes)) + 1)
+            selecionados = list(rng.choice(np.array(opcoes, dtype=object), quantidade, replace=False))
+            linhas_esperadas = esperada.aplicar(coluna, selecionados, linhas_esperadas)
+            linhas_obtidas = obtida.aplicar(coluna, selecionados, linhas_obtidas)
+        pd.testing.assert_frame_equal(obtida.dados_filtrados(linhas_obtidas),
+                                      esperada.dados_filtrados(linhas_esperadas))
+
+
+def test_sinistros_por_ocorrencia_iguais(cenario, em_centavos):
+    _, df_sinistros, motor = cenario
+    chave = ['N° Apólice', 'Data Ocorrência']
+    esperado = sinistros_por_ocorrencia(df_sinistros).sort_values(chave)
+    obtido = motor.sinistros_por_ocorrencia('dt_ocorrencia').sort_values(chave)
+    _iguais(obtido, esperado, check_exact=em_centavos)
+    assert motor.sinistros_por_ocorrencia('inexistente') is None
+
+
+@pytest.mark.parametrize('em_centavos', [False, True], ids=['reais', 'centavos'])
+def test_regras_com_nulos_e_endossos_diferentes(abas, criar_motor, em_centavos):
+    aba_apolice_endosso, aba_sinistro = abas
+    # Endossos seguintes com outro corretor, nulos na primeira linha de
+    # algumas apólices, prêmio e componentes nulos e uma apólice só com sinistro
+    seguintes = aba_apolice_endosso['cd_apolice'].duplicated()
+    aba_apolice_endosso.loc[seguintes, 'nm_corretor'] = 'OUTRO CORRETOR'
+    primeiras = aba_apolice_endosso.index[~seguintes][::7]
+    aba_apolice_endosso.loc[primeiras, ['nm_cidade', 'dt_fim_vig_apo']] = None
+    aba_apolice_endosso.loc[aba_apolice_endosso.index[::11], 'vl_tarifario_pago'] = np.nan
+    aba_sinistro.loc[aba_sinistro.index[::9], ['vl_despesa_pago', 'Cobertura']] = None
+    aba_sinistro.loc[aba_sinistro.index[:3], 'cd_apolice'] = 99_999_999
+
+    motor = criar_motor((aba_apolice_endosso, aba_sinistro), em_centavos)
+    resultado_final, df_sinistros = processar_abas(
+        converter_datas(aba_apolice_endosso.copy()), aba_sinistro.copy(), em_centavos)
+    _iguais(motor.apolices, compactar_tipos(resultado_final), check_exact=em_centavos)
+    fatias = construir_indices_duckdb(motor.apolices, motor)['sinistro_apolice']
+    for chave in (99_999_999, *df_sinistros['N° Apólice'].unique()[::25]):
+        _iguais(fatias.fatia(chave), df_sinistros[df_sinistros['N° Apólice'] == chave],
+                check_exact=em_centavos)
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from paginacao import pagina, pagina_valida, paginada, total_paginas
+
+
+@pytest.fixture(scope='module')
+def tabela():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        'valor': np.round(rng.normal(0, 100, 253), 0),
+        'nome': rng.choice(['b', 'a', 'c', None], 253),
+    }, index=rng.permutation(1000)[:253])
+    df.loc[df.index[::17], 'valor'] = np.nan
+    return df
+
+
+@pytest.mark.parametrize('ordenar_por', [None, 'valor', 'nome'])
+@pytest.mark.parametrize('decrescente', [False, True])
+def test_paginas_iguais_a_ordenar_e_fatiar(tabela, ordenar_por, decrescente):
+    if ordenar_por is None:
+        ordenada = tabela
+    else:
+        ordenada = tabela.sort_values(ordenar_por, ascending=not decrescente,
+                                      kind='stable', na_position='last')
+    paginas = total_paginas(len(tabela), 50)
+    assert paginas == 6
+    for numero in range(1, paginas + 1):
+        pd.testing.assert_frame_equal(
+            pagina(tabela, numero, 50, ordenar_por, decrescente),
+            ordenada.iloc[(numero - 1) * 50:numero * 50])
+    assert len(pagina(tabela, paginas, 50, ordenar_por, decrescente)) == 3
+
+
+def test_empates_e_nulos_na_ordem_original():
+    df = pd.DataFrame({'v': [2, None, 1, 2, None, 1]})
+    assert list(pagina(df, 1, 10, 'v').index) == [2, 5, 0, 3, 1, 4]
+    assert list(pagina(df, 1, 10, 'v', decrescente=True).index) == [0, 3, 2, 5, 1, 4]
+
+
+def test_pagina_guardada_limitada_as_paginas_do_resultado():
+    assert pagina_valida(7, 250, 100) == 3
+    assert pagina_valida(2, 250, 100) == 2
+    assert pagina_valida(0, 250, 100) == 1
+    # Filtros que esvaziam o resultado deixam uma única página
+    assert pagina_valida(3, 0, 100) == 1
+    assert total_paginas(0, 100) == 1
+
+
+def test_paginacao_desligada_ou_tabela_pequena():
+    assert paginada(101, 100)
+    assert not paginada(100, 100)
+    # DASHBOARD_TAMANHO_PAGINA=0 exibe a tabela inteira
+    assert not paginada(10_000, 0)
@@ -0,0 +1,125 @@
+import pandas as pd
+import pytest
+
+from agregacoes import kpis_por_apolice, kpis_por_segurado, sinistro_por_cobertura
+from indices import construir_indices
+from relatorio import gerar_relatorio, salvar_relatorio
+
+
+def _amostra(chaves, tamanho=40):
+    chaves = list(chaves)
+    return chaves[::max(1, len(chaves) // tamanho)]
+
+
+def _painel(dados_filtrados, df_sinistro):
+    # As mesmas contas dos painéis da apólice e do segurado no Dashboard
+    total_premio = dados_filtrados['Soma Prêmio Pago por Apolice'].sum()
+    total_sinistro = dados_filtrados['Soma Sinistro Por Apolice'].sum()
+    return {
+        'Total Prêmio Pago': total_premio,
+        'Total Sinistro': total_sinistro,
+        '% Sinistro Total': total_sinistro / total_premio if total_premio != 0 else 0,
+        'Qtd Apólices': dados_filtrados['N° Apólice'].nunique(),
+        'Qtd Sinistros': df_sinistro['nr_sinistro'].nunique(),
+    }
+
+
+def _comparar(linha, esperado):
+    for coluna, valor in esperado.items():
+        if coluna in linha:
+            assert linha[coluna] == pytest.approx(valor, rel=1e-12, abs=1e-9), coluna
+
+
+def _cobertura(df):
+    return df.sort_values('Cobertura', ignore_index=True).astype({'Cobertura': object})
+
+
+def _cobertura_painel(df_sinistro):
+    # O quadro 'Sinistro Por Cobertura' do painel, conferido linha a linha
+    cobertura = _cobertura(sinistro_por_cobertura(df_sinistro))
+    for _, linha in cobertura.iterrows():
+        sinistros = df_sinistro[df_sinistro['Cobertura'] == linha['Cobertura']]
+        assert linha['Total Sinistro'] == pytest.approx(sinistros['Total Sinistro'].sum())
+        assert linha['Qtd Sinistros'] == sinistros['nr_sinistro'].nunique()
+    assert set(cobertura['Cobertura']) == set(df_sinistro['Cobertura'].dropna())
+    return cobertura
+
+
+@pytest.fixture(params=[False, True], ids=['reais', 'centavos'])
+def relatorio(request, dados, dados_centavos):
+    dados_exibicao, df_sinistros = dados_centavos if request.param else dados
+    indices = construir_indices(dados_exibicao, df_sinistros)
+    return indices, gerar_relatorio(dados_exibicao, df_sinistros)
+
+
+def test_kpis_por_apolice_como_no_painel(relatorio):
+    indices, tabelas = relatorio
+    kpis = tabelas['kpis_apolice'].set_index('N° Apólice')
+    dados_exibicao = indices['apolice'].dados
+    assert len(kpis) == dados_exibicao['N° Apólice'].nunique()
+    assert kpis.index.is_monotonic_increasing
+
+    com_sinistro = indices['sinistro_apolice'].dados['N° Apólice'].dropna().unique()
+    sem_sinistro = sorted(set(kpis.index) - set(com_sinistro))
+    assert sem_sinistro
+    cobertura = tabelas['cobertura_apolice']
+    for apolice in [*_amostra(sorted(com_sinistro)), *_amostra(sem_sinistro, 5)]:
+        dados_apolice = indices['apolice'].fatia(apolice)
+        sinistros_apolice = indices['sinistro_apolice'].fatia(apolice)
+        linha = kpis.loc[apolice]
+        _comparar(linha, _painel(dados_apolice, sinistros_apolice))
+        assert linha['Segurado'] == dados_apolice['nm_estipulante'].iloc[0]
+        pd.testing.assert_frame_equal(
+            _cobertura(cobertura[cobertura['N° Apólice'] == apolice].drop(columns='N° Apólice')),
+            _cobertura_painel(sinistros_apolice), check_dtype=False)
+
+
+def test_kpis_por_segurado_como_no_painel(relatorio):
+    indices, tabelas = relatorio
+    kpis = tabelas['kpis_segurado'].set_index('Segurado')
+    assert kpis.index.is_unique
+    assert len(kpis) == indices['estipulante'].dados['nm_estipulante'].nunique()
+
+    cobertura = tabelas['cobertura_segurado']
+    for segurado in _amostra(kpis.index):
+        sinistros_segurado = indices['sinistro_cliente'].fatia(segurado)
+        linha = kpis.loc[segurado]
+        _comparar(linha, _painel(indices['estipulante'].fatia(segurado), sinistros_segurado))
+        pd.testing.assert_frame_equal(
+            _cobertura(cobertura[cobertura['Segurado'] == segurado].drop(columns='Segurado')),
+            _cobertura_painel(sinistros_segurado), check_dtype=False)
+
+
+def test_percentual_zero_sem_premio():
+    dados_apolices = pd.DataFrame({
+        'N° Apólice': [2, 1, 3], 'nm_estipulante': ['B', 'A', 'A'],
+        'Soma Prêmio Pago por Apolice': [0.0, 100.0, 0.0],
+        'Soma Sinistro Por Apolice': [50.0, 30.0, 20.0]})
+    df_sinistro = pd.DataFrame({
+        'N° Apólice': [1, 1, 2], 'nm_cliente': ['A', 'A', 'B'],
+        'nr_sinistro': [7, 7, 8], 'Cobertura': ['x', 'y', 'x'],
+        'Total Sinistro': [10.0, 20.0, 50.0]})
+
+    apolices = kpis_por_apolice(dados_apolices, df_sinistro)
+    assert apolices['N° Apólice'].tolist() == [1, 2, 3]
+    assert apolices['% Sinistro Total'].tolist() == [0.3, 0, 0]
+    assert apolices['Qtd Sinistros'].tolist() == [1, 1, 0]
+
+    segurados = kpis_por_segurado(dados_apolices, df_sinistro).set_index('Segurado')
+    assert segurados.loc['A', '% Sinistro Total'] == 0.5
+    assert segurados.loc['B', '% Sinistro Total'] == 0
+    assert segurados['Qtd Apólices'].to_dict() == {'A': 2, 'B': 1}
+    assert segurados['Qtd Sinistros'].to_dict() == {'A': 1, 'B': 1}
+
+
+@pytest.mark.parametrize('formato', ['parquet', 'csv'])
+def test_salvar_relatorio(tmp_path, dados, formato):
+    tabelas = gerar_relatorio(*dados)
+    arquivos = salvar_relatorio(tabelas, tmp_path / 'relatorio', formato)
+    assert [p.rsplit('/', 1)[-1] for p in arquivos] == [f'{nome}.{formato}' for nome in tabelas]
+    ler = pd.read_parquet if formato == 'parquet' else pd.read_csv
+    lido = ler(arquivos[0])
+    assert list(lido.columns) == list(tabelas['kpis_apolice'].columns)
+    assert len(lido) == len(tabelas['kpis_apolice'])
+    with pytest.raises(ValueError):
+        salvar_relatorio(tabelas, tmp_path, 'xlsx')
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sinistralidade import (premio_ganho_acumulado, sinistralidade_por_periodo,
+                            sinistros_por_ocorrencia)
+
+
+def _ganho_forca_bruta(inicio, fim, premio, limites):
+    ganho = np.zeros(len(limites))
+    for i, f, p in zip(inicio, fim, premio):
+        dias = max(f - i, 1)
+        ganho += p * np.clip(limites - i, 0, dias) / dias
+    return ganho
+
+
+def test_premio_ganho_acumulado_igual_a_forca_bruta():
+    rng = np.random.default_rng(2)
+    inicio = rng.integers(0, 2_000, 500).astype(float)
+    # Inclui vigências sem duração e com fim antes do início
+    fim = inicio + rng.choice([-3, 0, 1, 180, 365], 500)
+    premio = rng.normal(1_000, 500, 500)
+    limites = np.arange(-30, 2_500, 17, dtype=float)
+    np.testing.assert_allclose(premio_ganho_acumulado(inicio, fim, premio, limites),
+                               _ganho_forca_bruta(inicio, fim, premio, limites),
+                               rtol=1e-9, atol=1e-6)
+
+
+@pytest.mark.parametrize('periodicidade', ['M', 'Q', 'Y'])
+def test_serie_igual_a_forca_bruta(dados, periodicidade):
+    dados_exibicao, df_sinistros = dados
+    apolices = dados_exibicao.iloc[::3]
+    ocorrencia = sinistros_por_ocorrencia(df_sinistros)
+    serie = sinistralidade_por_periodo(apolices, ocorrencia, periodicidade)
+
+    # Prêmio ganho: o prêmio de cada apólice dividido pelos dias de vigência
+    partes = []
+    for _, apolice in apolices.iterrows():
+        dias = pd.date_range(apolice['dt_ini_vig_apo'],
+                             apolice['dt_fim_vig_apo'] - pd.Timedelta(days=1))
+        partes.append(pd.Series(apolice['Soma Prêmio Pago por Apolice'] / len(dias),
+                                index=dias.to_period(periodicidade)))
+    esperado = pd.concat(partes).groupby(level=0).sum()
+    obtido = serie.set_index('Período')['Prêmio Ganho']
+    np.testing.assert_allclose(obtido.reindex(esperado.index), esperado, rtol=1e-9)
+    assert obtido.drop(esperado.index).eq(0).all()
+
+    # Sinistro ocorrido: pela data de ocorrência, só das apólices selecionadas
+    sinistros = df_sinistros[df_sinistros['N° Apólice'].isin(apolices['N° Apólice'])]
+    esperado = sinistros.groupby(
+        sinistros['dt_ocorrencia'].dt.to_period(periodicidade))['Total Sinistro'].sum()
+    obtido = serie.set_index('Período')['Sinistro Ocorrido']
+    pd.testing.assert_series_equal(obtido[obtido != 0], esperado[esperado != 0],
+                                   check_names=False, check_index_type=False)
+
+    razao = serie['Sinistro Ocorrido'] / serie['Prêmio Ganho']
+    esperado_razao = razao.where(serie['Prêmio Ganho'] != 0, 0).fillna(0)
+    np.testing.assert_allclose(serie['% Sinistralidade'], esperado_razao)
+
+
+def test_centavos_inteiros(dados_centavos):
+    dados_exibicao, df_sinistros = dados_centavos
+    serie = sinistralidade_por_periodo(
+        dados_exibicao, sinistros_por_ocorrencia(df_sinistros), 'Q', em_centavos=True)
+    assert serie['Prêmio Ganho'].dtype == np.int64
+    assert serie['Sinistro Ocorrido'].dtype == np.int64
+    assert serie['Sinistro Ocorrido'].sum() == df_sinistros['Total Sinistro'].sum()
+
+
+def test_sem_apolices():
+    vazio = pd.DataFrame({'N° Apólice': [], 'dt_ini_vig_apo': pd.to_datetime([]),
+                          'dt_fim_vig_apo': pd.to_datetime([]),
+                          'Soma Prêmio Pago por Apolice': []})
+    assert sinistralidade_por_periodo(vazio).empty
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from triangulos import (COLUNA_DATA_AVISO, COLUNA_DATA_OCORRENCIA, DIMENSOES_APOLICE,
+                        PERIODICIDADES_TRIANGULO, TriangulosSinistro, _conjuntos_coberturas,
+                        construir_triangulos)
+
+
+def _linhas(dados_exibicao, df_sinistros):
+    """
+    Linhas de sinistro com as duas datas, o pago, o incorrido e as dimensões
+    da apólice, calculados sem passar pelo módulo.
+    """
+    linhas = df_sinistros.merge(
+        dados_exibicao[['N° Apólice', *DIMENSOES_APOLICE]], on='N° Apólice', how='left')
+    linhas = linhas[linhas[COLUNA_DATA_OCORRENCIA].notna() & linhas[COLUNA_DATA_AVISO].notna()]
+    linhas['Pago'] = (linhas['vl_sinistro_pago'] + linhas['vl_despesa_pago']
+                      + linhas['vl_honorario_pago'] - linhas['vl_salvado_pago'])
+    return linhas
+
+
+def _filtros(linhas):
+    coberturas = sorted(linhas['Cobertura'].unique())
+    representantes = sorted(linhas['nm_representante'].unique())
+    return [
+        None,
+        {'Cobertura': coberturas[:1]},
+        # Sinistros com duas coberturas selecionadas contam uma vez
+        {'Cobertura': coberturas[:2], 'nm_representante': representantes[:5]},
+        {'nm_auto_utilizacao': sorted(linhas['nm_auto_utilizacao'].unique())[:1]},
+        {'Cobertura': ['INEXISTENTE']},
+    ]
+
+
+def _conferir(triangulos, linhas, periodicidade, filtros):
+    ocorrencia = linhas[COLUNA_DATA_OCORRENCIA].dt.to_period(periodicidade)
+    aviso = linhas[COLUNA_DATA_AVISO].dt.to_period(periodicidade)
+    origem = np.array([p.ordinal for p in ocorrencia])
+    atraso = np.maximum(np.array([p.ordinal for p in aviso]) - origem, 0)
+    ultimo = (origem + atraso).max()
+    selecionadas = np.ones(len(linhas), dtype=bool)
+    for coluna, valores in (filtros or {}).items():
+        selecionadas &= linhas[coluna].isin(valores).to_numpy()
+
+    resultado = triangulos.triangulos(periodicidade, filtros)
+    assert list(resultado['Pago'].index) == [
+        str(pd.Period(ordinal=o, freq=periodicidade))
+        for o in range(origem.min(), origem.max() + 1)]
+    pago, incorrido = linhas['Pago'].to_numpy(), linhas['Total Sinistro'].to_numpy()
+    sinistros = linhas['nr_sinistro'].to_numpy()
+    for rotulo in resultado['Pago'].index:
+        o = pd.Period(rotulo, freq=periodicidade).ordinal
+        for j in resultado['Pago'].columns:
+            celulas = {tipo: resultado[tipo].loc[rotulo, j] for tipo in resultado}
+            if o + j > ultimo:
+                assert all(np.isnan(v) for v in celulas.values())
+                continue
+            na_celula = selecionadas & (origem == o) & (atraso <= j)
+            assert celulas['Pago'] == pytest.approx(pago[na_celula].sum(), abs=1e-6)
+            assert celulas['Incorrido'] == pytest.approx(incorrido[na_celula].sum(), abs=1e-6)
+            assert celulas['Quantidade'] == len(np.unique(sinistros[na_celula]))
+
+
+@pytest.mark.parametrize('periodicidade', list(PERIODICIDADES_TRIANGULO.values()))
+@pytest.mark.parametrize('em_centavos', [False, True])
+def test_celulas_iguais_a_forca_bruta(dados, dados_centavos, em_centavos, periodicidade):
+    dados_exibicao, df_sinistros = dados_centavos if em_centavos else dados
+    linhas = _linhas(dados_exibicao, df_sinistros)
+    triangulos = construir_triangulos(df_sinistros, dados_exibicao)
+    for filtros in _filtros(linhas):
+        _conferir(triangulos, linhas, periodicidade, filtros)
+    if em_centavos:
+        assert triangulos.triangulos(periodicidade)['Pago'].stack().map(float.is_integer).all()
+
+
+def test_cache_normaliza_filtros(dados):
+    dados_exibicao, df_sinistros = dados
+    triangulos = construir_triangulos(df_sinistros, dados_exibicao)
+    coberturas = triangulos.opcoes('Cobertura')
+    primeiro = triangulos.triangulos('Q', {'Cobertura': coberturas[:2], 'nm_representante': []})
+    assert triangulos.triangulos('Q', {'Cobertura': coberturas[1::-1]}) is primeiro
+    assert triangulos.triangulos('Y', {'Cobertura': coberturas[:2]}) is not primeiro
+    assert triangulos.triangulos('Q', {}) is triangulos.triangulos('Q', None)
+
+
+@pytest.mark.parametrize('quantidade', [5, 70])
+def test_conjuntos_de_coberturas(quantidade):
+    # Acima de 62 coberturas os conjuntos não cabem numa máscara de bits
+    rng = np.random.default_rng(1)
+    linhas = pd.DataFrame({'nr_sinistro': rng.integers(0, 40, 300),
+                           'Cobertura': [f'C{i}' for i in rng.integers(0, quantidade, 300)]})
+    linhas = linhas.drop_duplicates()
+    esperado = {sinistro: frozenset(grupo) for sinistro, grupo in linhas.groupby('nr_sinistro')['Cobertura']}
+    assert _conjuntos_coberturas(linhas, ['nr_sinistro']).to_dict() == esperado
+
+
+def test_sem_datas(dados):
+    dados_exibicao, df_sinistros = dados
+    assert construir_triangulos(df_sinistros.drop(columns=[COLUNA_DATA_AVISO]), dados_exibicao) is None
+
+
+@pytest.mark.parametrize('em_centavos', [False, True])
+def test_celulas_duckdb_iguais_ao_pandas(dados, dados_centavos, motores, em_centavos):
+    dados_exibicao, df_sinistros = dados_centavos if em_centavos else dados
+    pandas = construir_triangulos(df_sinistros, dados_exibicao)
+    duckdb = TriangulosSinistro(*motores[em_centavos].celulas_triangulos(dados_exibicao))
+    for coluna in ('Cobertura', *DIMENSOES_APOLICE):
+        assert duckdb.opcoes(coluna) == pandas.opcoes(coluna)
+    for periodicidade in PERIODICIDADES_TRIANGULO.values():
+        for filtros in _filtros(_linhas(dados_exibicao, df_sinistros)):
+            esperado = pandas.triangulos(periodicidade, filtros)
+            obtido = duckdb.triangulos(periodicidade, filtros)
+            for tipo in esperado:
+                pd.testing.assert_frame_equal(obtido[tipo], esperado[tipo], check_exact=em_centavos)
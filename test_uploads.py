@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from carregamento import memoria_estrutura_mb, memoria_mb
+from cubo import CuboSinistralidade
+from filtros import HierarquiaFiltros
+from uploads import CacheLRU
+
+MB = 1024 * 1024
+
+
+def test_objetos_compartilhados_contados_uma_vez():
+    df = pd.DataFrame({'valor': np.arange(100_000, dtype=np.int64)})
+    base = np.arange(1_000_000, dtype=np.int64)
+    visoes = [base[i:i + 10] for i in range(0, 1_000, 10)]
+    assert memoria_estrutura_mb(df) == memoria_mb(df)
+    assert memoria_estrutura_mb([df, df, {'a': df}]) < memoria_mb(df) + 0.01
+    assert base.nbytes / MB < memoria_estrutura_mb(visoes) < base.nbytes / MB + 0.1
+
+
+def test_estruturas_derivadas_entram_na_estimativa(dados):
+    dados_exibicao, _ = dados
+    hierarquia = HierarquiaFiltros(dados_exibicao)
+    cubo = CuboSinistralidade(dados_exibicao)
+    so_dados = memoria_estrutura_mb(dados_exibicao)
+    completo = memoria_estrutura_mb((dados_exibicao, hierarquia, cubo))
+    # A hierarquia aponta para os mesmos dados, que não são contados de novo
+    assert completo == pytest.approx(memoria_estrutura_mb(hierarquia, cubo), abs=0.001)
+    assert completo > so_dados + memoria_estrutura_mb(cubo)
+
+
+def test_cache_descarta_pelo_tamanho_medido():
+    cache = CacheLRU(limite_mb=10, medir=lambda valor: valor['mb'])
+    for chave in 'abc':
+        cache.obter(chave, lambda: {'mb': 4})
+    assert len(cache) == 2 and cache.memoria_mb() == 8
+    cache.obter('b', lambda: {'mb': 4})
+    assert cache.acertos == 1
@@ -0,0 +1,264 @@
+"""
+Triângulos de desenvolvimento dos sinistros.
+
+A aba 'sinistro' é uma fotografia da posição atual de cada sinistro, sem o
+histórico de pagamentos; o desenvolvimento disponível nela é o do aviso.
+Cada sinistro entra na linha do período de ocorrência e na coluna do atraso
+(em períodos) entre a ocorrência e o aviso, e os triângulos acumulam ao
+longo do atraso:
+
+- Pago: soma dos componentes pagos (sinistro + despesa + honorário -
+  salvado), a mesma regra do 'Total Sinistro';
+- Incorrido: 'Total Sinistro' (pago + pendente);
+- Quantidade: sinistros distintos avisados.
+
+As células depois da diagonal (ocorrência + atraso além do último aviso da
+base) ficam vazias. Os valores são somados uma única vez por carga de dados
+em células (período de ocorrência, atraso e dimensões dos filtros), e só as
+células são mantidas; cada combinação de filtros e periodicidade é
+calculada sobre elas uma vez e guardada num cache LRU compartilhado pelas
+sessões.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import etapa, rastreado
+from sinistralidade import COLUNA_DATA_OCORRENCIA
+
+# Coluna da base de sinistros com a data de aviso do sinistro
+COLUNA_DATA_AVISO = os.environ.get('DASHBOARD_COLUNA_AVISO', 'dt_aviso')
+
+# Componentes pagos, na mesma regra do 'Total Sinistro' (o salvado é subtraído)
+COMPONENTES_PAGO = [
+    'vl_sinistro_pago', 'vl_despesa_pago', 'vl_honorario_pago', 'vl_salvado_pago'
+]
+
+TIPOS_TRIANGULO = ['Pago', 'Incorrido', 'Quantidade']
+
+# Coluna da base de sinistros com a cobertura (um sinistro pode ter várias)
+COLUNA_COBERTURA = 'Cobertura'
+
+# Dimensões dos filtros dos triângulos (rótulo exibido -> coluna). A
+# cobertura é da base de sinistros; as demais vêm da apólice do sinistro.
+DIMENSOES_TRIANGULO = {
+    'Cobertura': COLUNA_COBERTURA,
+    'Utilização': 'nm_auto_utilizacao',
+    'Representante': 'nm_representante',
+}
+DIMENSOES_APOLICE = [c for c in DIMENSOES_TRIANGULO.values() if c != COLUNA_COBERTURA]
+
+# Periodicidades dos períodos de ocorrência e de desenvolvimento
+PERIODICIDADES_TRIANGULO = {'Ano': 'Y', 'Trimestre': 'Q', 'Mês': 'M'}
+
+# Quantidade de combinações de filtros guardadas no cache
+TAMANHO_CACHE_TRIANGULOS = 128
+
+
+def _ordinais(datas, periodicidade):
+    """
+    Número ordinal do período de cada data (-1 onde a data é nula).
+    """
+    periodos = pd.DatetimeIndex(datas).to_period(periodicidade)
+    return np.where(periodos.isna(), -1, periodos.asi8)
+
+
+def _conjuntos_coberturas(linhas, chave):
+    """
+    Conjunto das coberturas (frozenset) de cada grupo 'chave' das linhas,
+    sem coberturas repetidas num grupo. Com até 62 coberturas distintas cada
+    conjunto é somado como máscara de bits, sem montar um frozenset por grupo.
+    """
+    codigos, coberturas = pd.factorize(linhas[COLUNA_COBERTURA], use_na_sentinel=False)
+    if len(coberturas) > 62:
+        return linhas.groupby(chave, dropna=False, observed=True)[COLUNA_COBERTURA].agg(frozenset)
+    coberturas = np.asarray(coberturas, dtype=object)
+    bits = linhas[chave].assign(**{COLUNA_COBERTURA: np.left_shift(1, codigos.astype(np.int64))})
+    mascaras = bits.groupby(chave, dropna=False, observed=True)[COLUNA_COBERTURA].sum()
+    conjuntos = {mascara: frozenset(coberturas[[k for k in range(len(coberturas)) if mascara >> k & 1]])
+                 for mascara in pd.unique(mascaras)}
+    return mascaras.map(conjuntos)
+
+
+def _celulas(linhas, periodicidade):
+    """
+    Células de uma periodicidade a partir das linhas de sinistro com as
+    dimensões e os períodos de ocorrência e de aviso (ordinais).
+    """
+    celula = ['origem', 'atraso', *DIMENSOES_APOLICE]
+    valores = linhas.groupby(celula + [COLUNA_COBERTURA], dropna=False, observed=True)[
+        ['Pago', 'Incorrido']].sum().reset_index()
+    # Cada sinistro conta uma vez por célula, com o conjunto das suas coberturas
+    sinistros = linhas[linhas['nr_sinistro'].notna()][
+        celula + ['nr_sinistro', COLUNA_COBERTURA]].drop_duplicates()
+    coberturas = _conjuntos_coberturas(sinistros, celula + ['nr_sinistro'])
+    quantidades = coberturas.reset_index().groupby(
+        celula + [COLUNA_COBERTURA], dropna=False, observed=True).size().reset_index(name='Quantidade')
+    return (valores.assign(periodicidade=periodicidade),
+            quantidades.assign(periodicidade=periodicidade))
+
+
+def celulas_triangulos(df_sinistro, dados_apolices):
+    """
+    Células dos triângulos, por periodicidade, período de ocorrência e
+    atraso do aviso (ordinais) e dimensões dos filtros. Retorna a tupla
+    (valores, quantidades):
+
+    - valores: Pago e Incorrido somados por célula e cobertura;
+    - quantidades: sinistros distintos por célula e conjunto das coberturas
+      de cada sinistro (frozenset), para que um sinistro com várias
+      coberturas conte uma vez quando mais de uma é selecionada.
+
+    Só entram as linhas com as datas de ocorrência e de aviso.
+    """
+    ocorrencia = pd.to_datetime(df_sinistro[COLUNA_DATA_OCORRENCIA], errors='coerce')
+    aviso = pd.to_datetime(df_sinistro[COLUNA_DATA_AVISO], errors='coerce')
+    validas = (ocorrencia.notna() & aviso.notna()).to_numpy()
+
+    pago = sum(df_sinistro[c] if c != 'vl_salvado_pago' else -df_sinistro[c]
+               for c in COMPONENTES_PAGO if c in df_sinistro.columns)
+    linhas = pd.DataFrame({
+        'nr_sinistro': df_sinistro['nr_sinistro'],
+        COLUNA_COBERTURA: df_sinistro[COLUNA_COBERTURA],
+        'Pago': pago,
+        'Incorrido': df_sinistro['Total Sinistro'],
+    })[validas]
+    por_apolice = dados_apolices.set_index('N° Apólice')
+    apolices = df_sinistro['N° Apólice'][validas]
+    for coluna in DIMENSOES_APOLICE:
+        # .array mantém o tipo 'category' das dimensões das apólices
+        linhas[coluna] = por_apolice[coluna].reindex(apolices).array
+
+    valores, quantidades = [], []
+    for periodicidade in PERIODICIDADES_TRIANGULO.values():
+        origem = _ordinais(ocorrencia[validas], periodicidade)
+        linhas['origem'] = origem
+        # Aviso registrado antes da ocorrência conta como atraso zero
+        linhas['atraso'] = np.maximum(_ordinais(aviso[validas], periodicidade) - origem, 0)
+        celulas = _celulas(linhas, periodicidade)
+        valores.append(celulas[0])
+        quantidades.append(celulas[1])
+    return (pd.concat(valores, ignore_index=True),
+            pd.concat(quantidades, ignore_index=True))
+
+
+class TriangulosSinistro:
+    """
+    Triângulos de desenvolvimento sobre as células de celulas_triangulos,
+    com os triângulos já calculados guardados por (periodicidade, filtros).
+    Só as células são mantidas, nenhuma linha da base de sinistros.
+    """
+
+    def __init__(self, valores, quantidades):
+        # Os conjuntos de coberturas viram códigos numa lista dos conjuntos
+        # distintos, que são poucos
+        codigos, self._conjuntos = pd.factorize(quantidades[COLUNA_COBERTURA])
+        quantidades = quantidades.assign(**{COLUNA_COBERTURA: codigos.astype(np.int32)})
+        valores = valores.astype({COLUNA_COBERTURA: 'category'})
+        self._valores = {p: df.drop(columns='periodicidade')
+                         for p, df in valores.groupby('periodicidade', sort=False)}
+        self._quantidades = {p: df.drop(columns='periodicidade')
+                             for p, df in quantidades.groupby('periodicidade', sort=False)}
+        self._cache = OrderedDict()
+        self._trava = threading.Lock()
+
+    def opcoes(self, coluna):
+        """
+        Valores distintos de uma dimensão dos filtros, ordenados.
+        """
+        valores = next(iter(self._valores.values()), pd.DataFrame({coluna: []}))
+        return sorted(pd.unique(valores[coluna].dropna()).tolist(), key=str)
+
+    @staticmethod
+    def _chave(periodicidade, filtros):
+        return (periodicidade, tuple(sorted(
+            (coluna, tuple(sorted(valores, key=str)))
+            for coluna, valores in (filtros or {}).items() if valores)))
+
+    def triangulos(self, periodicidade='Y', filtros=None):
+        """
+        Triângulos Pago, Incorrido e Quantidade dos sinistros que atendem aos
+        filtros ({coluna: valores selecionados}; sem valores = todos).
+        Retorna {tipo: DataFrame} com os períodos de ocorrência nas linhas e
+        o atraso, em períodos, nas colunas.
+        """
+        chave = self._chave(periodicidade, filtros)
+        with self._trava:
+            resultado = self._cache.get(chave)
+            if resultado is not None:
+                self._cache.move_to_end(chave)
+                return resultado
+
+        resultado = self._calcular(periodicidade, dict(chave[1]))
+        with self._trava:
+            self._cache[chave] = resultado
+            while len(self._cache) > TAMANHO_CACHE_TRIANGULOS:
+                self._cache.popitem(last=False)
+        return resultado
+
+    def _mascara(self, celulas, filtros, conjuntos=False):
+        mascara = np.ones(len(celulas), dtype=bool)
+        for coluna, selecionados in filtros.items():
+            if conjuntos and coluna == COLUNA_COBERTURA:
+                # Código do conjunto das coberturas do sinistro: basta uma
+                # cobertura selecionada
+                atende = np.array([not c.isdisjoint(selecionados) for c in self._conjuntos],
+                                  dtype=bool)
+                mascara &= atende[celulas[coluna].to_numpy()]
+            else:
+                mascara &= celulas[coluna].isin(selecionados).to_numpy()
+        return mascara
+
+    @rastreado('triangulos')
+    def _calcular(self, periodicidade, filtros):
+        valores = self._valores.get(periodicidade)
+        if valores is None:
+            return {tipo: pd.DataFrame() for tipo in TIPOS_TRIANGULO}
+        quantidades = self._quantidades[periodicidade]
+
+        # Eixos comuns a qualquer filtro: todos os períodos de ocorrência da
+        # base e a diagonal do último período de aviso
+        primeiro = int(valores['origem'].min())
+        ultimo = int((valores['origem'] + valores['atraso']).max())
+        origens = np.arange(primeiro, int(valores['origem'].max()) + 1)
+        atrasos = np.arange(0, ultimo - primeiro + 1)
+
+        agrupado = valores[self._mascara(valores, filtros)].groupby(['origem', 'atraso'])
+        celulas = {
+            'Pago': agrupado['Pago'].sum(),
+            'Incorrido': agrupado['Incorrido'].sum(),
+            'Quantidade': quantidades[self._mascara(quantidades, filtros, conjuntos=True)].groupby(
+                ['origem', 'atraso'])['Quantidade'].sum(),
+        }
+        futuro = origens[:, None] + atrasos[None, :] > ultimo
+        rotulos = pd.PeriodIndex.from_ordinals(origens, freq=periodicidade).astype(str)
+        resultado = {}
+        for tipo, valores in celulas.items():
+            triangulo = valores.unstack(fill_value=0).reindex(
+                index=origens, columns=atrasos, fill_value=0).cumsum(axis=1)
+            triangulo = triangulo.astype(np.float64).mask(futuro)
+            triangulo.index = pd.Index(rotulos, name='Ocorrência')
+            triangulo.columns = pd.Index(atrasos, name='Atraso')
+            resultado[tipo] = triangulo
+        return resultado
+
+
+def tem_datas_triangulos(df_sinistro):
+    """
+    Indica se a base de sinistros tem as datas de ocorrência e de aviso.
+    """
+    return {COLUNA_DATA_OCORRENCIA, COLUNA_DATA_AVISO} <= set(df_sinistro.columns)
+
+
+def construir_triangulos(df_sinistro, dados_apolices):
+    """
+    Triângulos dos sinistros, ou None se a base de sinistros não tiver as
+    datas de ocorrência e de aviso.
+    """
+    if not tem_datas_triangulos(df_sinistro):
+        return None
+    with etapa('TriangulosSinistro', df_sinistro):
+        return TriangulosSinistro(*celulas_triangulos(df_sinistro, dados_apolices))
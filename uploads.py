@@ -0,0 +1,151 @@
+"""
+Modo de upload da planilha (DASHBOARD_UPLOAD=1).
+
+Em vez de um caminho fixo, cada analista envia a planilha pelo
+st.file_uploader. O arquivo enviado é lido em blocos que, numa única
+passada, alimentam o hash SHA-256 do conteúdo e são gravados em disco num
+caminho derivado desse hash: o mesmo conteúdo sempre cai no mesmo arquivo e
+reaproveita o seu snapshot Parquet.
+
+Os dados processados ficam num cache LRU compartilhado por todas as
+sessões, indexado pelo hash do conteúdo: quando vários analistas enviam a
+mesma planilha ela é processada uma única vez (inclusive se os envios forem
+simultâneos) e servida a todos. Quando a memória estimada dos dados
+cacheados passa do orçamento, as versões usadas há mais tempo são
+descartadas.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from carregamento import TAMANHO_BLOCO_HASH, memoria_estrutura_mb
+
+# Com DASHBOARD_UPLOAD=1 a planilha é enviada pelo usuário
+MODO_UPLOAD = os.environ.get('DASHBOARD_UPLOAD', '0') == '1'
+
+# Diretório onde ficam as planilhas enviadas, nomeadas pelo hash do conteúdo
+DIRETORIO_UPLOAD = os.environ.get(
+    'DASHBOARD_DIRETORIO_UPLOAD',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.uploads'))
+
+# Orçamento de memória (MB) dos dados cacheados das planilhas enviadas
+LIMITE_CACHE_MB = float(os.environ.get('DASHBOARD_CACHE_MB', '2048'))
+
+
+def gravar_upload(arquivo, diretorio=DIRETORIO_UPLOAD):
+    """
+    Grava o arquivo enviado (um objeto com read, como o UploadedFile do
+    Streamlit) calculando o hash SHA-256 do conteúdo na mesma leitura em
+    blocos. O arquivo fica em '<diretorio>/<hash><extensão>'; se esse
+    arquivo já existe ele não é regravado, para manter o snapshot válido.
+    Retorna a tupla (hash, caminho).
+    """
+    extensao = os.path.splitext(getattr(arquivo, 'name', ''))[1].lower() or '.xlsx'
+    os.makedirs(diretorio, exist_ok=True)
+    temporario = os.path.join(
+        diretorio, f'upload.{os.getpid()}.{threading.get_ident()}.tmp')
+    sha = hashlib.sha256()
+    try:
+        arquivo.seek(0)
+        with open(temporario, 'wb') as destino:
+            for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_HASH), b''):
+                sha.update(bloco)
+                destino.write(bloco)
+        conteudo_hash = sha.hexdigest()
+        caminho = os.path.join(diretorio, conteudo_hash + extensao)
+        if not os.path.exists(caminho):
+            os.replace(temporario, caminho)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+    return conteudo_hash, caminho
+
+
+def memoria_versao_mb(versao):
+    """
+    Memória estimada (MB) de uma versão dos dados: todas as estruturas que
+    ela mantém (dados de exibição, índices, hierarquia dos filtros, cubo,
+    índice de busca, séries e triângulos), cada objeto contado uma vez. As
+    tabelas dentro do DuckDB não entram na estimativa.
+    """
+    return memoria_estrutura_mb(versao)
+
+
+class CacheLRU:
+    """
+    Cache LRU compartilhado entre as sessões, limitado por um orçamento de
+    memória em MB. Cada chave é construída uma única vez mesmo com pedidos
+    simultâneos: quem pede uma chave em construção espera por ela.
+
+    Uma versão descartada continua válida para as sessões que ainda a
+    referenciam; a memória é liberada quando a última delas deixa de usá-la.
+    """
+
+    def __init__(self, limite_mb=LIMITE_CACHE_MB, medir=memoria_versao_mb):
+        self.limite_mb = limite_mb
+        self._medir = medir
+        self._itens = OrderedDict()  # chave -> (valor, tamanho em MB)
+        self._construindo = {}       # chave -> trava da construção
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def __len__(self):
+        with self._trava:
+            return len(self._itens)
+
+    def memoria_mb(self):
+        with self._trava:
+            return sum(tamanho for _, tamanho in self._itens.values())
+
+    def _obter_existente(self, chave):
+        # Chamado com self._trava adquirida
+        if chave not in self._itens:
+            return None
+        self._itens.move_to_end(chave)
+        self.acertos += 1
+        return self._itens[chave][0]
+
+    def obter(self, chave, construir):
+        """
+        Retorna o valor da chave, chamando 'construir()' se ela não estiver
+        no cache. Exceções de 'construir' são propagadas e nada é guardado.
+        """
+        with self._trava:
+            valor = self._obter_existente(chave)
+            if valor is not None:
+                return valor
+            trava_chave = self._construindo.setdefault(chave, threading.Lock())
+
+        with trava_chave:
+            with self._trava:
+                # Outra sessão pode ter construído a chave enquanto esperávamos
+                valor = self._obter_existente(chave)
+                if valor is not None:
+                    return valor
+            try:
+                valor = construir()
+                tamanho = self._medir(valor)
+            except BaseException:
+                with self._trava:
+                    self._construindo.pop(chave, None)
+                raise
+            with self._trava:
+                self._construindo.pop(chave, None)
+                self.falhas += 1
+                self._itens[chave] = (valor, tamanho)
+                self._descartar_excedente()
+        return valor
+
+    def _descartar_excedente(self):
+        # Chamado com self._trava adquirida; a chave mais recente nunca é
+        # descartada, mesmo que sozinha passe do orçamento.
+        total = sum(tamanho for _, tamanho in self._itens.values())
+        while total > self.limite_mb and len(self._itens) > 1:
+            chave, (_, tamanho) = self._itens.popitem(last=False)
+            total -= tamanho
+            logging.info(
+                f"Cache de uploads: '{chave[:12]}' descartado ({tamanho:.1f} MB), "
+                f"{total:.1f} de {self.limite_mb:.0f} MB em uso")